@@ -0,0 +1,119 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+class StripedLocks:
+    """Conjunto fijo de ``asyncio.Lock`` repartidos por clave.
+
+    Cada usuario usa siempre el mismo lock (``user_id % stripes``), así la
+    memoria no crece con el número de usuarios; dos usuarios que comparten
+    lock simplemente se esperan entre sí.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+
+    def lock_for(self, user_id: int) -> asyncio.Lock:
+        return self._locks[int(user_id) % len(self._locks)]
+
+    def locks_for(self, user_ids: Iterable[int]) -> List[asyncio.Lock]:
+        """Locks distintos de varios usuarios, siempre en el mismo orden para no bloquearse entre sí"""
+        stripes = sorted({int(user_id) % len(self._locks) for user_id in user_ids})
+        return [self._locks[stripe] for stripe in stripes]
+
+
+class AsyncTimeTracker:
+    """Fachada async de TimeTracker que serializa las operaciones de cada usuario.
+
+    Cada mutación toma el lock del usuario, de modo que dos comandos sobre el
+    mismo usuario (o un comando y la verificación de milestones) se aplican uno
+    detrás de otro, mientras que los de usuarios distintos no se esperan. Las
+    operaciones compuestas (pausar y cancelar al llegar al límite, leer la
+    duración de la pausa y despausar) se hacen bajo un único lock y en una sola
+    escritura.
+
+    Las lecturas simples siguen haciéndose en ``time_tracker``: no esperan nada
+    y el event loop no las interrumpe. Para secuencias propias se puede usar
+    ``async with tracker.user_lock(user_id)`` y llamar al tracker dentro, o
+    ``await tracker.batch(user_ids, operation)`` para que sean atómicas.
+    """
+
+    def __init__(self, time_tracker, stripes: int = 64):
+        self.time_tracker = time_tracker
+        self._locks = StripedLocks(stripes)
+
+    def user_lock(self, user_id: int) -> asyncio.Lock:
+        """Lock del usuario (no es reentrante: no llamar a la fachada mientras se tiene)"""
+        return self._locks.lock_for(user_id)
+
+    def is_locked(self, user_id: int) -> bool:
+        """True si hay una operación en curso sobre el usuario (o sobre otro de su mismo lock)"""
+        return self.user_lock(user_id).locked()
+
+    async def batch(self, user_ids: Iterable[int], operation: Callable[..., T]) -> T:
+        """Ejecutar ``operation(time_tracker)`` como una transacción sobre varios usuarios.
+
+        Toma los locks de todos los usuarios y llama a ``operation`` dentro de
+        ``time_tracker.batch()``: sus mutaciones se escriben juntas y se
+        deshacen si lanza una excepción. ``operation`` es síncrona para que
+        ninguna otra corrutina quede dentro de la transacción.
+        """
+        async with AsyncExitStack() as stack:
+            for lock in self._locks.locks_for(user_ids):
+                await stack.enter_async_context(lock)
+            with self.time_tracker.batch():
+                return operation(self.time_tracker)
+
+    async def start_tracking(self, user_id: int, user_name: str) -> bool:
+        async with self.user_lock(user_id):
+            return self.time_tracker.start_tracking(user_id, user_name)
+
+    async def stop_tracking(self, user_id: int) -> bool:
+        async with self.user_lock(user_id):
+            return self.time_tracker.stop_tracking(user_id)
+
+    async def add_minutes(self, user_id: int, user_name: str, minutes: int) -> bool:
+        async with self.user_lock(user_id):
+            return self.time_tracker.add_minutes(user_id, user_name, minutes)
+
+    async def subtract_minutes(self, user_id: int, minutes: int) -> bool:
+        async with self.user_lock(user_id):
+            return self.time_tracker.subtract_minutes(user_id, minutes)
+
+    async def reset_user_time(self, user_id: int) -> bool:
+        async with self.user_lock(user_id):
+            return self.time_tracker.reset_user_time(user_id)
+
+    async def pause_and_enforce_limit(self, user_id: int, max_pauses: int = 3) -> Optional[Dict]:
+        """Pausar al usuario y cancelarlo si llega a ``max_pauses`` pausas.
+
+        Devuelve None si no había tiempo activo; si no, ``session_time``,
+        ``total_time``, ``pause_count`` y ``cancelled``.
+        """
+        tracker = self.time_tracker
+        async with self.user_lock(user_id):
+            with tracker.batch():
+                total_before = tracker.get_total_time(user_id)
+                if not tracker.pause_tracking(user_id):
+                    return None
+                total_after = tracker.get_total_time(user_id)
+                pause_count = tracker.get_pause_count(user_id)
+                cancelled = pause_count >= max_pauses
+                if cancelled:
+                    tracker.cancel_user_tracking(user_id)
+        return {
+            'session_time': total_after - total_before,
+            'total_time': total_after,
+            'pause_count': pause_count,
+            'cancelled': cancelled
+        }
+
+    async def resume_tracking(self, user_id: int) -> Optional[float]:
+        """Despausar al usuario; devuelve cuánto estuvo pausado (None si no estaba pausado)"""
+        async with self.user_lock(user_id):
+            paused_duration = self.time_tracker.get_paused_duration(user_id)
+            if not self.time_tracker.resume_tracking(user_id):
+                return None
+        return paused_duration
@@ -1,11 +1,25 @@
 import discord
 from discord.ext import commands
-import json
 import os
 from datetime import datetime, timedelta
 import asyncio
+import signal
+from typing import Optional
 from time_tracker import TimeTracker
 from gold_tracker import GoldTracker
+from async_time_tracker import AsyncTimeTracker
+from bot_config import BotConfig
+from guild_partitions import GuildPartition, GuildPartitions, partition_storage_names
+from command_sync import sync_command_tree
+from gold_expiry import EXPIRY, WARNING_DIGEST, GoldExpiryEngine
+from member_cache import MemberCache
+from milestone_scheduler import MilestoneScheduler
+from notification_outbox import NotificationOutbox, PersistentOutbox
+from paginator import PaginatedView
+from role_index import RoleIndex
+from sharding import ShardOwnership
+from storage import repository_from_config
+from user_resolver import UserResolver
 
 # Configuración del bot
 intents = discord.Intents.default()
@@ -13,51 +27,211 @@ intents.voice_states = True
 intents.guilds = True
 intents.members = True  # Necesario para acceder a información de miembros y roles
 
-bot = commands.Bot(command_prefix='!', intents=intents)
-time_tracker = TimeTracker()
-gold_tracker = GoldTracker()
-
-# ID del canal para notificaciones
-NOTIFICATION_CHANNEL_ID = 1382195219939852479
-PAUSE_NOTIFICATION_CHANNEL_ID = 1382065039774711819
-CANCELLATION_NOTIFICATION_CHANNEL_ID = 1382080464579203122
-
-# Rol especial para tiempo ilimitado (se carga desde config.json)
-UNLIMITED_TIME_ROLE_ID = None
-
-# Cargar configuración completa desde config.json
-config = {}
-try:
-    with open('config.json', 'r') as f:
-        config = json.load(f)
-    UNLIMITED_TIME_ROLE_ID = config.get('unlimited_time_role_id')
-    if UNLIMITED_TIME_ROLE_ID:
-        print(f"✅ Rol de tiempo ilimitado cargado desde config: ID {UNLIMITED_TIME_ROLE_ID}")
-except Exception as e:
-    print(f"⚠️ No se pudo cargar configuración del rol: {e}")
-    config = {}
-
-# Task para verificar milestones periódicamente
+# Configuración completa de config.json, cacheada en memoria (se recarga si el archivo cambia)
+config = BotConfig('config.json')
+if config.unlimited_time_role_id:
+    print(f"✅ Rol de tiempo ilimitado cargado desde config: ID {config.unlimited_time_role_id}")
+
+# Sharding opcional: AutoShardedBot abre una conexión al gateway por shard y, con SHARD_IDS,
+# varios procesos pueden repartirse los shards compartiendo el almacenamiento
+sharding_config = config.section('sharding')
+shard_ownership = ShardOwnership.from_config(sharding_config)
+# Carga perezosa de miembros: no descargar todos los miembros al arrancar ni guardarlos en la
+# caché de discord.py; los que hacen falta se piden bajo demanda (ver member_cache)
+member_cache_config = config.section('member_cache')
+LAZY_MEMBERS = member_cache_config.get('lazy_loading', False)
+member_options = {}
+if LAZY_MEMBERS:
+    member_options = {'chunk_guilds_at_startup': False, 'member_cache_flags': discord.MemberCacheFlags.none()}
+    print("👥 Carga perezosa de miembros activada")
+
+class PersistOnCloseMixin:
+    """Escribe los datos pendientes antes de cerrar la conexión, también al recibir SIGTERM"""
+
+    async def setup_hook(self):
+        await super().setup_hook()
+        try:
+            # discord.py no atiende SIGTERM: sin esto el gestor de procesos mataría el bot sin guardar
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    async def close(self):
+        if not self.is_closed():
+            try:
+                await shutdown_persistence()
+            except Exception as e:
+                print(f"❌ Error guardando datos al cerrar: {e}")
+        await super().close()
+
+class TimeTrackerBot(PersistOnCloseMixin, commands.Bot):
+    pass
+
+class ShardedTimeTrackerBot(PersistOnCloseMixin, commands.AutoShardedBot):
+    pass
+
+if sharding_config.get('enabled', False) or shard_ownership.shard_ids is not None:
+    bot = ShardedTimeTrackerBot(command_prefix='!', intents=intents, **shard_ownership.bot_options(), **member_options)
+    print(f"🧩 Modo sharding: shards {shard_ownership.shard_ids or 'todos'} de {shard_ownership.shard_count or 'auto'}")
+else:
+    bot = TimeTrackerBot(command_prefix='!', intents=intents, **member_options)
+
+# Trackers (el almacenamiento se elige en la sección "storage" de config.json)
+storage_config = config.get('storage', {})
+shard_config_error = shard_ownership.split_config_error(storage_config.get('mode', 'json'), config.get('primary_guild_id'))
+if shard_config_error:
+    print(f"❌ {shard_config_error}")
+    exit(1)
+time_tracking_config = config.get('time_tracking', {})
+WRITE_BEHIND = storage_config.get('write_behind', False)
+SAVE_INTERVAL_SECONDS = time_tracking_config.get('save_interval_minutes', 5) * 60
+# Las membresías Gold son globales: el rol se quita en cualquier servidor donde esté el miembro
+gold_tracker = GoldTracker(repository=repository_from_config(
+    storage_config, 'gold_memberships.json', 'gold_memberships', GoldTracker.INDEXED_FIELDS))
+
+# Índice rol → miembros para comprobar roles sin recorrer member.roles
+role_index = RoleIndex()
+
+# Resuelve usuarios para los listados sin una petición a la API por cada uno
+user_resolver = UserResolver(bot)
+
+# Miembros pedidos bajo demanda (en lotes) cuando el servidor no está completo en caché
+member_cache = MemberCache(
+    ttl=member_cache_config.get('ttl_seconds', 600),
+    max_size=member_cache_config.get('max_members', 5000),
+    batch_size=member_cache_config.get('query_batch_size', 100)
+)
+
+# Envía las notificaciones en segundo plano, agrupadas por canal
+outbox_config = config.get('notification_outbox', {})
+notification_outbox = NotificationOutbox(
+    bot.get_channel,
+    window=outbox_config.get('coalesce_window_seconds', 1.0),
+    min_interval=outbox_config.get('min_send_interval_seconds', 1.0)
+)
+
+def create_guild_partition(guild_id: int) -> GuildPartition:
+    """Abrir el almacenamiento de un servidor y crear su programador y su entrega de notificaciones"""
+    if config.get('primary_guild_id') is None:
+        # El primer servidor que se carga hereda los datos existentes (user_times.json);
+        # con los shards repartidos entre procesos debe venir configurado (ver split_config_error)
+        config.update(primary_guild_id=guild_id)
+        print(f"✅ Servidor principal configurado: {guild_id}")
+
+    data_file, table = partition_storage_names(guild_id, config.get('primary_guild_id'))
+    tracker = TimeTracker(repository=repository_from_config(
+        storage_config, data_file, table, TimeTracker.INDEXED_FIELDS))
+    return GuildPartition(
+        guild_id,
+        tracker,
+        # Programa la verificación de cada sesión activa para cuando cumpla 1 hora
+        MilestoneScheduler(tracker),
+        # Entrega (con reintentos) las notificaciones de milestones guardadas en los registros
+        PersistentOutbox(
+            tracker,
+            bot.get_channel,
+            base_delay=outbox_config.get('retry_base_seconds', 5),
+            max_delay=outbox_config.get('retry_max_seconds', 600),
+            min_interval=outbox_config.get('min_send_interval_seconds', 1.0),
+            max_attempts=outbox_config.get('max_attempts', 10),
+            wait_ready=bot.wait_until_ready
+        ),
+        config=config.for_guild(guild_id),
+        # Serializa los comandos y verificaciones sobre un mismo usuario
+        async_tracker=AsyncTimeTracker(tracker)
+    )
+
+def start_partition_tasks(partition: GuildPartition):
+    """Arrancar el programador y la entrega de notificaciones de un servidor"""
+    if partition.tasks or milestone_check_task is None:
+        # Si aún no arrancaron las verificaciones periódicas, start_periodic_checks los iniciará
+        return
+    # Al cargar entrega primero lo que quedó pendiente antes del reinicio
+    partition.tasks.append(bot.loop.create_task(partition.notification_delivery.run()))
+    partition.tasks.append(bot.loop.create_task(partition.milestone_scheduler.run(
+        lambda user_id: check_user_milestone(user_id, partition.guild_id))))
+    print(f'Programador y entrega de notificaciones iniciados para el servidor {partition.guild_id}')
+
+# Estado de seguimiento por servidor, cargado la primera vez que se usa
+partitions = GuildPartitions(create_guild_partition, on_load=start_partition_tasks)
+
+def get_partition(guild_id: Optional[int] = None) -> GuildPartition:
+    """Partición de un servidor (la del servidor principal si no se indica)"""
+    if guild_id is None:
+        guild_id = config.get('primary_guild_id')
+    if guild_id is None:
+        if not bot.guilds:
+            raise LookupError("El bot no está en ningún servidor")
+        guild_id = bot.guilds[0].id
+    return partitions.get(guild_id)
+
+def get_tracker(guild_id: Optional[int] = None) -> TimeTracker:
+    return get_partition(guild_id).time_tracker
+
+def warm_partitions(guilds=None):
+    """Cargar al arrancar los servidores que ya tienen datos; el resto se carga al usarse"""
+    guilds = bot.guilds if guilds is None else guilds
+    if config.get('primary_guild_id') is None and guilds:
+        # Sin servidor principal configurado, el primero hereda los datos existentes
+        partitions.get(guilds[0].id)
+    primary_guild_id = config.get('primary_guild_id')
+    configured = {int(guild_id) for guild_id in config.section('guilds')}
+    for guild in guilds:
+        data_file, _ = partition_storage_names(guild.id, primary_guild_id)
+        # En SQLite/PostgreSQL no se sabe sin consultar si hay datos: se cargan todos
+        has_data = storage_config.get('mode', 'json') in ('sqlite', 'postgres') or os.path.exists(data_file)
+        if guild.id == primary_guild_id or guild.id in configured or has_data:
+            partitions.get(guild.id)
+
+# Task para verificar milestones perdidos periódicamente
 milestone_check_task = None
+# Motor de expiración automática de membresías Gold y su task
+gold_expiry_engine = None
+gold_expiry_task = None
+# Task para el mantenimiento del almacenamiento (compactar diarios) en segundo plano
+storage_maintenance_task = None
+# Task para escribir a disco los cambios pendientes (modo write-behind)
+flush_task = None
+# Evita que un flush y una compactación escriban los archivos a la vez
+persistence_lock = asyncio.Lock()
 
 @bot.event
 async def on_ready():
     print(f'{bot.user} se ha conectado a Discord!')
 
-    # Verificar que el canal de notificaciones existe
-    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-    if channel:
-        if hasattr(channel, 'name'):
-            print(f'Canal de notificaciones encontrado: {channel.name} (ID: {channel.id})')
+    # Indexar los roles de los miembros en caché (los eventos de miembros lo mantienen al día).
+    # Con carga perezosa los servidores no están completos y se usa member.roles
+    indexed = [guild for guild in bot.guilds if guild.chunked]
+    for guild in indexed:
+        role_index.build(guild)
+    print(f'Índice de roles construido para {len(indexed)} de {len(bot.guilds)} servidor(es)')
+
+    # Cargar los datos de los servidores que ya tienen tiempos guardados
+    warm_partitions()
+    print(f'Datos cargados para {len(partitions)} de {len(bot.guilds)} servidor(es)')
+
+    # Verificar que el canal de notificaciones de cada servidor cargado existe
+    for partition in partitions:
+        channel_id = partition.config.channel('milestones')
+        channel = bot.get_channel(channel_id) if channel_id else None
+        if channel:
+            print(f'Canal de notificaciones encontrado: {getattr(channel, "name", channel.id)} (ID: {channel.id})')
         else:
-            print(f'Canal de notificaciones encontrado (ID: {channel.id})')
-    else:
-        print(f'⚠️ Canal de notificaciones no encontrado con ID: {NOTIFICATION_CHANNEL_ID}')
+            print(f'⚠️ Canal de notificaciones no encontrado para el servidor {partition.guild_id} (ID: {channel_id})')
 
     try:
-        # Sincronización con límite de rate
-        synced = await bot.tree.sync()
-        print(f'Sincronizados {len(synced)} comando(s) slash')
+        # Sincronizar solo si el árbol de comandos cambió (on_ready también se dispara al reconectar)
+        commands_config = config.section('commands')
+        dev_guild_id = commands_config.get('dev_guild_id')
+        synced = await sync_command_tree(
+            bot.tree,
+            commands_config.get('sync_hash_file', 'command_tree_hash.json'),
+            guild=discord.Object(id=dev_guild_id) if dev_guild_id else None
+        )
+        if synced is None:
+            print('Comandos slash sin cambios; se omite la sincronización')
+        else:
+            print(f'Sincronizados {len(synced)} comando(s) slash' + (f' en el servidor {dev_guild_id}' if dev_guild_id else ''))
 
         # Listar todos los comandos registrados
         commands = [cmd.name for cmd in bot.tree.get_commands()]
@@ -89,7 +263,7 @@ def is_admin():
     async def predicate(interaction: discord.Interaction) -> bool:
         # Verificar si el usuario es el dueño del servidor o tiene permisos de administrador
         if hasattr(interaction, 'guild') and interaction.guild:
-            member = interaction.guild.get_member(interaction.user.id)
+            member = interaction_member(interaction)
             if member:
                 # Verificar permisos de administrador
                 if member.guild_permissions.administrator:
@@ -103,53 +277,72 @@ def is_admin():
         return False
     return discord.app_commands.check(predicate)
 
-def load_config():
-    """Cargar configuración desde config.json"""
-    try:
-        with open('config.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-    except Exception as e:
-        print(f"Error cargando configuración: {e}")
-        return {}
-
-def has_command_permission_role(member: discord.Member) -> bool:
-    """Verificar si el usuario tiene el rol autorizado para usar comandos"""
-    config = load_config()
-    command_role_id = config.get('command_permission_role_id')
+def interaction_member(interaction: discord.Interaction) -> Optional[discord.Member]:
+    """Miembro que usó el comando (viene en la interacción aunque no esté en caché)"""
+    if isinstance(interaction.user, discord.Member):
+        return interaction.user
+    return interaction.guild.get_member(interaction.user.id) if interaction.guild else None
 
-    if command_role_id is None:
+def member_has_role(member: discord.Member, role_id) -> bool:
+    """Verificar un rol con el índice de roles (o member.roles si el servidor aún no está indexado)"""
+    if role_id is None:
         return False
 
+    if role_index.is_built(member.guild.id):
+        return role_index.has_role(member.id, role_id)
+
     for role in member.roles:
-        if role.id == command_role_id:
+        if role.id == role_id:
             return True
     return False
 
+def has_command_permission_role(member: discord.Member) -> bool:
+    """Verificar si el usuario tiene el rol autorizado para usar comandos"""
+    return member_has_role(member, config.for_guild(member.guild.id).command_permission_role_id)
+
 def can_use_mi_tiempo(member: discord.Member) -> bool:
     """Verificar si el usuario tiene el rol autorizado para usar /mi_tiempo"""
-    config = load_config()
-    mi_tiempo_role_id = config.get('mi_tiempo_role_id')
+    return member_has_role(member, config.for_guild(member.guild.id).mi_tiempo_role_id)
 
-    if mi_tiempo_role_id is None:
-        return False
+def has_unlimited_time_role(member: discord.Member) -> bool:
+    """Verificar si el usuario tiene el rol de tiempo ilimitado"""
+    return member_has_role(member, config.for_guild(member.guild.id).unlimited_time_role_id)
 
-    for role in member.roles:
-        if role.id == mi_tiempo_role_id:
-            return True
+@bot.event
+async def on_member_join(member: discord.Member):
+    # Solo se indexan los servidores completos; con carga perezosa se consulta member.roles
+    if role_index.is_built(member.guild.id):
+        role_index.update_member(member)
 
-    return False
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    if before.roles != after.roles and role_index.is_built(after.guild.id):
+        role_index.update_member(after)
 
-def has_unlimited_time_role(member: discord.Member) -> bool:
-    """Verificar si el usuario tiene el rol de tiempo ilimitado"""
-    if UNLIMITED_TIME_ROLE_ID is None:
-        return False
+@bot.event
+async def on_raw_member_remove(payload: discord.RawMemberRemoveEvent):
+    # El evento raw llega aunque el miembro no esté en la caché de discord.py
+    role_index.remove_member(payload.guild_id, payload.user.id)
+    member_cache.remove(payload.guild_id, payload.user.id)
 
-    for role in member.roles:
-        if role.id == UNLIMITED_TIME_ROLE_ID:
-            return True
-    return False
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    role_index.remove_role(role.id)
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    if guild.chunked:
+        role_index.build(guild)
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    role_index.forget_guild(guild.id)
+    member_cache.forget_guild(guild.id)
+    # Liberar la partición del servidor después de escribir sus cambios pendientes
+    partition = partitions.unload(guild.id)
+    if partition is not None:
+        async with persistence_lock:
+            partition.time_tracker.flush()
 
 def calculate_credits(total_seconds: float, has_special_role: bool = False) -> int:
     """Calcular créditos basado en el tiempo total"""
@@ -182,77 +375,57 @@ def calculate_credits(total_seconds: float, has_special_role: bool = False) -> i
 @discord.app_commands.describe(usuario="El usuario para quien iniciar el seguimiento de tiempo")
 @is_admin()
 async def iniciar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
+    partition = get_partition(interaction.guild_id)
+    time_tracker = partition.time_tracker
     if usuario.bot:
         await interaction.response.send_message("❌ No se puede rastrear el tiempo de bots.")
         return
 
     # Verificar si el usuario tiene el rol de tiempo ilimitado
     has_unlimited_role = has_unlimited_time_role(usuario)
+    limit_hours = partition.config.time_limit_hours(has_unlimited_role)
 
-    # Verificar límites según el rol del usuario
-    total_time = time_tracker.get_total_time(usuario.id)
-    total_hours = total_time / 3600
+    # Comprobar límites e iniciar sin que otro comando sobre el mismo usuario se intercale
+    async with partition.async_tracker.user_lock(usuario.id):
+        # Verificar el límite del servidor según el rol del usuario (2 horas sin rol especial, 4 con él)
+        total_time = time_tracker.get_total_time(usuario.id)
+        user_data = time_tracker.get_user_data(usuario.id)
 
-    if not has_unlimited_role:
-        # Usuarios sin rol especial: límite de 2 horas
-        if total_hours >= 2.0:
+        if total_time / 3600 >= limit_hours:
             formatted_time = time_tracker.format_time_human(total_time)
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 2 horas (Tiempo actual: {formatted_time}). "
+            response = (
+                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de {limit_hours:g} horas (Tiempo actual: {formatted_time}). "
                 f"No se puede iniciar más seguimiento."
             )
-            return
-    else:
-        # Usuarios con rol especial: límite de 4 horas
-        if total_hours >= 4.0:
-            formatted_time = time_tracker.format_time_human(total_time)
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 4 horas (Tiempo actual: {formatted_time}). "
-                f"No se puede iniciar más seguimiento.", 
-
-            )
-            return
-
-    # Verificar si el usuario tiene tiempo pausado
-    user_data = time_tracker.get_user_data(usuario.id)
-    if user_data and user_data.get('is_paused', False):
-        await interaction.response.send_message(
-            f"⚠️ {usuario.mention} tiene tiempo pausado. Usa `/despausar_tiempo` para continuar el tiempo.",
-
-        )
-        return
+        elif user_data and user_data.get('is_paused', False):
+            # El usuario tiene tiempo pausado
+            response = f"⚠️ {usuario.mention} tiene tiempo pausado. Usa `/despausar_tiempo` para continuar el tiempo."
+        elif time_tracker.start_tracking(usuario.id, usuario.display_name):
+            response = f"⏰ El tiempo de {usuario.mention} ha sido iniciado por {interaction.user.mention}"
+        else:
+            response = f"⚠️ El tiempo de {usuario.mention} ya está activo"
 
-    success = time_tracker.start_tracking(usuario.id, usuario.display_name)
-    if success:
-        await interaction.response.send_message(f"⏰ El tiempo de {usuario.mention} ha sido iniciado por {interaction.user.mention}")
-    else:
-        await interaction.response.send_message(f"⚠️ El tiempo de {usuario.mention} ya está activo")
+    await interaction.response.send_message(response)
 
 @bot.tree.command(name="pausar_tiempo", description="Pausar el tiempo de un usuario")
 @discord.app_commands.describe(usuario="El usuario para quien pausar el tiempo")
 @is_admin()
 async def pausar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
-    # Obtener datos antes de pausar para mostrar tiempo de sesión actual
-    user_data = time_tracker.get_user_data(usuario.id)
-    total_time_before = time_tracker.get_total_time(usuario.id)
+    partition = get_partition(interaction.guild_id)
+    time_tracker = partition.time_tracker
 
-    success = time_tracker.pause_tracking(usuario.id)
-    if success:
-        # Obtener tiempo total después de pausar (incluye la sesión que se acaba de pausar)
-        total_time_after = time_tracker.get_total_time(usuario.id)
-        session_time = total_time_after - total_time_before
-
-        # Obtener número de pausas
-        pause_count = time_tracker.get_pause_count(usuario.id)
+    # Pausar y, si alcanzó 3 pausas, cancelar automáticamente en una sola operación del usuario
+    result = await partition.async_tracker.pause_and_enforce_limit(usuario.id, max_pauses=3)
+    if result is not None:
+        # El tiempo total incluye la sesión que se acaba de pausar
+        total_time_after = result['total_time']
+        session_time = result['session_time']
+        pause_count = result['pause_count']
 
         formatted_total_time = time_tracker.format_time_human(total_time_after)
         formatted_session_time = time_tracker.format_time_human(session_time) if session_time > 0 else "0 Segundos"
 
-        # Verificar si alcanzó 3 pausas para cancelación automática
-        if pause_count >= 3:
-            # Cancelar automáticamente el tiempo del usuario
-            time_tracker.cancel_user_tracking(usuario.id)
-
+        if result['cancelled']:
             # Respuesta del comando (efímera para el admin)
             await interaction.response.send_message(
                 f"⏸️ El tiempo de {usuario.mention} ha sido pausado\n"
@@ -264,7 +437,7 @@ async def pausar_tiempo(interaction: discord.Interaction, usuario: discord.Membe
             )
 
             # Enviar notificación de cancelación automática
-            await send_auto_cancellation_notification(usuario.mention, formatted_total_time, interaction.user.mention, pause_count)
+            await send_auto_cancellation_notification(interaction.guild_id, usuario.mention, formatted_total_time, interaction.user.mention, pause_count)
         else:
             # Respuesta del comando normal (efímera para el admin)
             await interaction.response.send_message(
@@ -276,7 +449,7 @@ async def pausar_tiempo(interaction: discord.Interaction, usuario: discord.Membe
             )
 
             # Enviar notificación de pausa al canal específico con conteo de pausas
-            await send_pause_notification(usuario.mention, total_time_after, interaction.user.mention, formatted_session_time, pause_count)
+            await send_pause_notification(interaction.guild_id, usuario.mention, total_time_after, interaction.user.mention, formatted_session_time, pause_count)
 
     else:
         await interaction.response.send_message(f"⚠️ No hay tiempo activo para {usuario.mention}")
@@ -285,11 +458,11 @@ async def pausar_tiempo(interaction: discord.Interaction, usuario: discord.Membe
 @discord.app_commands.describe(usuario="El usuario para quien despausar el tiempo")
 @is_admin()
 async def despausar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
-    # Obtener duración pausada antes de despausar
-    paused_duration = time_tracker.get_paused_duration(usuario.id)
-
-    success = time_tracker.resume_tracking(usuario.id)
-    if success:
+    partition = get_partition(interaction.guild_id)
+    time_tracker = partition.time_tracker
+    # Despausar y obtener la duración pausada sin que otro comando se intercale
+    paused_duration = await partition.async_tracker.resume_tracking(usuario.id)
+    if paused_duration is not None:
         # Obtener tiempo total después de despausar
         total_time = time_tracker.get_total_time(usuario.id)
         formatted_paused_duration = time_tracker.format_time_human(paused_duration) if paused_duration > 0 else "0 Segundos"
@@ -303,7 +476,7 @@ async def despausar_tiempo(interaction: discord.Interaction, usuario: discord.Me
         )
 
         # Enviar notificación de despausa al canal específico
-        await send_unpause_notification(usuario.mention, total_time, interaction.user.mention, formatted_paused_duration)
+        await send_unpause_notification(interaction.guild_id, usuario.mention, total_time, interaction.user.mention, formatted_paused_duration)
     else:
         await interaction.response.send_message(f"⚠️ No se puede despausar - {usuario.mention} no tiene tiempo pausado")
 
@@ -314,11 +487,13 @@ async def despausar_tiempo(interaction: discord.Interaction, usuario: discord.Me
 )
 @is_admin()
 async def sumar_minutos(interaction: discord.Interaction, usuario: discord.Member, minutos: int):
+    partition = get_partition(interaction.guild_id)
+    time_tracker = partition.time_tracker
     if minutos <= 0:
         await interaction.response.send_message("❌ La cantidad de minutos debe ser positiva")
         return
 
-    success = time_tracker.add_minutes(usuario.id, usuario.display_name, minutos)
+    success = await partition.async_tracker.add_minutes(usuario.id, usuario.display_name, minutos)
     if success:
         total_time = time_tracker.get_total_time(usuario.id)
         formatted_time = time_tracker.format_time_human(total_time)
@@ -327,7 +502,7 @@ async def sumar_minutos(interaction: discord.Interaction, usuario: discord.Membe
             f"⏱️ Tiempo total: {formatted_time}"
         )
         # Verificar milestone después de sumar tiempo
-        await check_time_milestone(usuario.id, usuario.display_name)
+        await check_time_milestone(usuario.id, usuario.display_name, interaction.guild_id)
     else:
         await interaction.response.send_message(f"❌ Error al sumar tiempo para {usuario.mention}")
 
@@ -338,11 +513,13 @@ async def sumar_minutos(interaction: discord.Interaction, usuario: discord.Membe
 )
 @is_admin()
 async def restar_minutos(interaction: discord.Interaction, usuario: discord.Member, minutos: int):
+    partition = get_partition(interaction.guild_id)
+    time_tracker = partition.time_tracker
     if minutos <= 0:
         await interaction.response.send_message("❌ La cantidad de minutos debe ser positiva")
         return
 
-    success = time_tracker.subtract_minutes(usuario.id, minutos)
+    success = await partition.async_tracker.subtract_minutes(usuario.id, minutos)
     if success:
         total_time = time_tracker.get_total_time(usuario.id)
         formatted_time = time_tracker.format_time_human(total_time)
@@ -354,70 +531,88 @@ async def restar_minutos(interaction: discord.Interaction, usuario: discord.Memb
         await interaction.response.send_message(f"❌ Error al restar tiempo para {usuario.mention}")
 
 @bot.tree.command(name="ver_tiempos", description="Ver todos los tiempos registrados")
+@discord.app_commands.describe(estado="Mostrar solo usuarios activos, pausados o todos (por defecto)")
+@discord.app_commands.choices(estado=[
+    discord.app_commands.Choice(name="Todos", value="todos"),
+    discord.app_commands.Choice(name="Activos", value="activos"),
+    discord.app_commands.Choice(name="Pausados", value="pausados")
+])
 @is_admin()
-async def ver_tiempos(interaction: discord.Interaction):
-    tracked_users = time_tracker.get_all_tracked_users()
+async def ver_tiempos(interaction: discord.Interaction, estado: str = "todos"):
+    time_tracker = get_tracker(interaction.guild_id)
+    # Los filtros por estado usan los índices del tracker en lugar de copiar todos los usuarios
+    if estado == "activos":
+        tracked_users = dict(time_tracker.iter_active())
+    elif estado == "pausados":
+        tracked_users = dict(time_tracker.iter_paused())
+    else:
+        tracked_users = time_tracker.get_all_tracked_users()
 
     if not tracked_users:
         await interaction.response.send_message("📊 No hay usuarios con tiempo registrado")
         return
 
-    # Crear lista de texto simple
-    user_list = []
-    for user_id, data in tracked_users.items():
-        try:
-            # Obtener el usuario real de Discord para hacer mención
-            user = await bot.fetch_user(int(user_id))
-            user_mention = user.mention
-
-            # Verificar si tiene rol especial
-            member = interaction.guild.get_member(int(user_id)) if interaction.guild else None
-            has_special_role = member and has_unlimited_time_role(member) if member else False
-        except:
-            # Si no se puede obtener el usuario, usar el nombre guardado
-            user_name = data.get('name', f'Usuario {user_id}')
-            user_mention = f"**{user_name}**"
-            has_special_role = False
-
-        total_time = time_tracker.get_total_time(int(user_id))
-        formatted_time = time_tracker.format_time_human(total_time)
-
-        status = "🟢 Activo" if data.get('is_active', False) else "🔴 Inactivo"
-        if data.get('is_paused', False):
-            # Verificar si es usuario con rol especial que completó 4 horas
-            total_hours = total_time / 3600
-            if has_special_role and total_hours >= 4.0:
-                status = "✅ Terminado"
+    # Ordenar una sola vez por tiempo total; cada página se renderiza al pedirla
+    await interaction.response.defer()
+    totals = {user_id: time_tracker.get_total_time(int(user_id)) for user_id in tracked_users}
+    ordered_ids = sorted(tracked_users, key=lambda user_id: totals[user_id], reverse=True)
+
+    async def render_page(start: int, end: int) -> discord.Embed:
+        page_ids = ordered_ids[start:end]
+        # Miembros de la página en un solo lote; los que ya no están en el servidor se resuelven como usuarios
+        members = await member_cache.fetch_many(interaction.guild, page_ids) if interaction.guild else {}
+        users = await user_resolver.resolve_many(
+            [user_id for user_id in page_ids if members.get(int(user_id)) is None], interaction.guild)
+        users.update((member_id, member) for member_id, member in members.items() if member is not None)
+        user_list = []
+        for user_id in page_ids:
+            data = tracked_users[user_id]
+            user = users.get(int(user_id))
+            if user is not None:
+                user_mention = user.mention
+
+                # Verificar si tiene rol especial
+                member = members.get(int(user_id))
+                has_special_role = has_unlimited_time_role(member) if member else False
             else:
-                status = "⏸️ Pausado"
+                # Si no se puede obtener el usuario, usar el nombre guardado
+                user_name = data.get('name', f'Usuario {user_id}')
+                user_mention = f"**{user_name}**"
+                has_special_role = False
 
-        # Agregar créditos para todos los usuarios
-        credits = calculate_credits(total_time, has_special_role)
-        credit_info = f" 💰 {credits} Créditos" if credits > 0 else ""
+            total_time = totals[user_id]
+            formatted_time = time_tracker.format_time_human(total_time)
 
-        user_list.append(f"📌 {user_mention} - ⏱️ {formatted_time}{credit_info} {status}")
+            status = "🟢 Activo" if data.get('is_active', False) else "🔴 Inactivo"
+            if data.get('is_paused', False):
+                # Verificar si es usuario con rol especial que completó 4 horas
+                total_hours = total_time / 3600
+                if has_special_role and total_hours >= 4.0:
+                    status = "✅ Terminado"
+                else:
+                    status = "⏸️ Pausado"
 
-    # Crear mensaje con lista vertical
-    message = "⏰ **Tiempos Registrados:**\n\n" + "\n".join(user_list)
+            # Agregar créditos para todos los usuarios
+            credits = calculate_credits(total_time, has_special_role)
+            credit_info = f" 💰 {credits} Créditos" if credits > 0 else ""
 
-    # Si el mensaje es muy largo, usar embed
-    if len(message) > 2000:
-        embed = discord.Embed(
+            user_list.append(f"📌 {user_mention} - ⏱️ {formatted_time}{credit_info} {status}")
+
+        return discord.Embed(
             title="⏰ Tiempos Registrados",
             description="\n".join(user_list),
             color=discord.Color.blue(),
             timestamp=datetime.now()
         )
-        embed.set_footer(text="Actualizado")
-        await interaction.response.send_message(embed=embed)
-    else:
-        await interaction.response.send_message(message)
+
+    view = PaginatedView(len(ordered_ids), render_page, page_size=20, author_id=interaction.user.id)
+    await view.send(interaction)
 
 @bot.tree.command(name="reiniciar_tiempo", description="Reiniciar el tiempo de un usuario a cero")
 @discord.app_commands.describe(usuario="El usuario cuyo tiempo se reiniciará")
 @is_admin()
 async def reiniciar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
-    success = time_tracker.reset_user_time(usuario.id)
+    success = await get_partition(interaction.guild_id).async_tracker.reset_user_time(usuario.id)
     if success:
         await interaction.response.send_message(f"🔄 Tiempo reiniciado para {usuario.mention} por {interaction.user.mention}")
     else:
@@ -426,6 +621,7 @@ async def reiniciar_tiempo(interaction: discord.Interaction, usuario: discord.Me
 @bot.tree.command(name="reiniciar_todos_tiempos", description="Reiniciar todos los tiempos de todos los usuarios")
 @is_admin()
 async def reiniciar_todos_tiempos(interaction: discord.Interaction):
+    time_tracker = get_tracker(interaction.guild_id)
     usuarios_reiniciados = time_tracker.reset_all_user_times()
     if usuarios_reiniciados > 0:
         await interaction.response.send_message(f"🔄 Tiempos reiniciados para {usuarios_reiniciados} usuario(s)")
@@ -435,6 +631,7 @@ async def reiniciar_todos_tiempos(interaction: discord.Interaction):
 @bot.tree.command(name="limpiar_base_datos", description="ELIMINAR COMPLETAMENTE todos los usuarios registrados de la base de datos")
 @is_admin()
 async def limpiar_base_datos(interaction: discord.Interaction):
+    time_tracker = get_tracker(interaction.guild_id)
     # Obtener conteo actual de usuarios antes de limpiar
     tracked_users = time_tracker.get_all_tracked_users()
     user_count = len(tracked_users)
@@ -478,6 +675,7 @@ async def limpiar_base_datos(interaction: discord.Interaction):
 @discord.app_commands.describe(confirmar="Escribe 'SI' para confirmar la eliminación completa")
 @is_admin()
 async def limpiar_base_datos_confirmar(interaction: discord.Interaction, confirmar: str):
+    time_tracker = get_tracker(interaction.guild_id)
     if confirmar.upper() != "SI":
         await interaction.response.send_message("❌ Operación cancelada. Debes escribir 'SI' para confirmar")
         return
@@ -524,13 +722,16 @@ async def limpiar_base_datos_confirmar(interaction: discord.Interaction, confirm
 @discord.app_commands.describe(usuario="El usuario cuyo tiempo se cancelará por completo")
 @is_admin()
 async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
-    # Obtener el tiempo antes de cancelar
-    total_time = time_tracker.get_total_time(usuario.id)
-    user_data = time_tracker.get_user_data(usuario.id)
+    partition = get_partition(interaction.guild_id)
+    time_tracker = partition.time_tracker
+    # Leer el tiempo y cancelar sin que otro comando sobre el usuario se intercale
+    async with partition.async_tracker.user_lock(usuario.id):
+        total_time = time_tracker.get_total_time(usuario.id)
+        user_data = time_tracker.get_user_data(usuario.id)
+        success = user_data is not None and time_tracker.cancel_user_tracking(usuario.id)
 
     if user_data:
         formatted_time = time_tracker.format_time_human(total_time)
-        success = time_tracker.cancel_user_tracking(usuario.id)
         if success:
             await interaction.response.send_message(
                 f"🗑️ El tiempo de {usuario.mention} ha sido cancelado\n"
@@ -539,7 +740,7 @@ async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Mem
 
             )
             # Enviar notificación al canal de cancelaciones con tiempo cancelado
-            await send_cancellation_notification(usuario.mention, interaction.user.mention, formatted_time)
+            await send_cancellation_notification(interaction.guild_id, usuario.mention, interaction.user.mention, formatted_time)
         else:
             await interaction.response.send_message(f"❌ Error al cancelar el tiempo para {usuario.mention}")
     else:
@@ -549,46 +750,47 @@ async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Mem
 @discord.app_commands.describe(canal="El canal donde se enviarán las notificaciones de tiempo completado")
 @is_admin()
 async def configurar_canal_tiempos(interaction: discord.Interaction, canal: discord.TextChannel):
-    global NOTIFICATION_CHANNEL_ID
-    NOTIFICATION_CHANNEL_ID = canal.id
+    # Guardar configuración del servidor en config.json
+    if config.for_guild(interaction.guild_id).set_channel("milestones", canal.id):
+        print(f"✅ Canal de tiempos configurado y guardado: {canal.name} (ID: {canal.id})")
+    else:
+        print("❌ Error guardando configuración del canal de tiempos")
+
     await interaction.response.send_message(f"🎯 Canal de notificaciones de tiempo configurado: {canal.mention}")
 
 @bot.tree.command(name="configurar_canal_pausas", description="Configurar el canal donde se enviarán las notificaciones de pausas")
 @discord.app_commands.describe(canal="El canal donde se enviarán las notificaciones de pausas")
 @is_admin()
 async def configurar_canal_pausas(interaction: discord.Interaction, canal: discord.TextChannel):
-    global PAUSE_NOTIFICATION_CHANNEL_ID
-    PAUSE_NOTIFICATION_CHANNEL_ID = canal.id
+    # Guardar configuración del servidor en config.json
+    if config.for_guild(interaction.guild_id).set_channel("pauses", canal.id):
+        print(f"✅ Canal de pausas configurado y guardado: {canal.name} (ID: {canal.id})")
+    else:
+        print("❌ Error guardando configuración del canal de pausas")
+
     await interaction.response.send_message(f"⏸️ Canal de notificaciones de pausas configurado: {canal.mention}")
 
 @bot.tree.command(name="configurar_canal_cancelaciones", description="Configurar el canal donde se enviarán las notificaciones de cancelaciones")
 @discord.app_commands.describe(canal="El canal donde se enviarán las notificaciones de cancelaciones")
 @is_admin()
 async def configurar_canal_cancelaciones(interaction: discord.Interaction, canal: discord.TextChannel):
-    global CANCELLATION_NOTIFICATION_CHANNEL_ID
-    CANCELLATION_NOTIFICATION_CHANNEL_ID = canal.id
+    # Guardar configuración del servidor en config.json
+    if config.for_guild(interaction.guild_id).set_channel("cancellations", canal.id):
+        print(f"✅ Canal de cancelaciones configurado y guardado: {canal.name} (ID: {canal.id})")
+    else:
+        print("❌ Error guardando configuración del canal de cancelaciones")
+
     await interaction.response.send_message(f"🗑️ Canal de notificaciones de cancelaciones configurado: {canal.mention}")
 
 @bot.tree.command(name="configurar_rol_tiempo_ilimitado", description="Configurar el rol que permite tiempo ilimitado y múltiples notificaciones")
 @discord.app_commands.describe(rol="El rol que tendrá acceso a tiempo ilimitado con notificaciones cada hora")
 @is_admin()
 async def configurar_rol_tiempo_ilimitado(interaction: discord.Interaction, rol: discord.Role):
-    global UNLIMITED_TIME_ROLE_ID
-    UNLIMITED_TIME_ROLE_ID = rol.id
-
-    # Guardar configuración en config.json
-    try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-
-        config['unlimited_time_role_id'] = rol.id
-
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=2)
-
+    # Guardar configuración del servidor en config.json
+    if config.for_guild(interaction.guild_id).update(unlimited_time_role_id=rol.id):
         print(f"✅ Rol de tiempo ilimitado configurado y guardado: {rol.name} (ID: {rol.id})")
-    except Exception as e:
-        print(f"❌ Error guardando configuración del rol: {e}")
+    else:
+        print("❌ Error guardando configuración del rol")
 
     await interaction.response.send_message(f"⏳ Rol de tiempo ilimitado configurado: {rol.mention}\nLos usuarios con este rol recibirán notificaciones a las 1, 2, 3 y 4 horas sin detenerse automáticamente.")
 
@@ -596,42 +798,35 @@ async def configurar_rol_tiempo_ilimitado(interaction: discord.Interaction, rol:
 @discord.app_commands.describe(canal="El canal donde se enviarán las notificaciones cuando alguien sea despausado")
 @is_admin()
 async def configurar_canal_despausados(interaction: discord.Interaction, canal: discord.TextChannel):
-    # Guardar configuración en config.json
-    try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-
-        if "notification_channels" not in config:
-            config["notification_channels"] = {}
-
-        config["notification_channels"]["unpause"] = canal.id
-
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=2)
-
+    # Guardar configuración del servidor en config.json
+    if config.for_guild(interaction.guild_id).set_channel("unpause", canal.id):
         print(f"✅ Canal de despausados configurado y guardado: {canal.name} (ID: {canal.id})")
-    except Exception as e:
-        print(f"❌ Error guardando configuración del canal de despausados: {e}")
+    else:
+        print("❌ Error guardando configuración del canal de despausados")
 
     await interaction.response.send_message(f"▶️ Canal de notificaciones de despausados configurado: {canal.mention}")
 
+@bot.tree.command(name="configurar_canal_gold", description="Configurar el canal donde se enviarán los avisos de expiración Gold")
+@discord.app_commands.describe(canal="El canal donde se avisará de membresías Gold por expirar o expiradas")
+@is_admin()
+async def configurar_canal_gold(interaction: discord.Interaction, canal: discord.TextChannel):
+    # Guardar configuración en config.json (el canal Gold es global, como las membresías)
+    if config.set_channel("gold", canal.id):
+        print(f"✅ Canal Gold configurado y guardado: {canal.name} (ID: {canal.id})")
+    else:
+        print("❌ Error guardando configuración del canal Gold")
+
+    await interaction.response.send_message(f"🥇 Canal de notificaciones Gold configurado: {canal.mention}")
+
 @bot.tree.command(name="configurar_permisos_comandos", description="Configurar qué rol puede usar todos los comandos del bot")
 @discord.app_commands.describe(rol="El rol que tendrá permisos para usar todos los comandos del bot")
 @is_admin()
 async def configurar_permisos_comandos(interaction: discord.Interaction, rol: discord.Role):
-    # Guardar configuración en config.json
-    try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-
-        config['command_permission_role_id'] = rol.id
-
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=2)
-
+    # Guardar configuración del servidor en config.json
+    if config.for_guild(interaction.guild_id).update(command_permission_role_id=rol.id):
         print(f"✅ Rol de permisos de comandos configurado y guardado: {rol.name} (ID: {rol.id})")
-    except Exception as e:
-        print(f"❌ Error guardando configuración del rol de permisos: {e}")
+    else:
+        print("❌ Error guardando configuración del rol de permisos")
 
     await interaction.response.send_message(f"🔐 Rol de permisos configurado: {rol.mention}\nLos usuarios con este rol ahora pueden usar todos los comandos del bot.")
 
@@ -639,85 +834,87 @@ async def configurar_permisos_comandos(interaction: discord.Interaction, rol: di
 @discord.app_commands.describe(rol="El rol que podrá usar el comando /mi_tiempo")
 @is_admin()
 async def configurar_mi_tiempo(interaction: discord.Interaction, rol: discord.Role):
-    # Cargar configuración actual
-    try:
-        config = load_config()
-
-        # Configurar el rol de /mi_tiempo
-        config['mi_tiempo_role_id'] = rol.id
-
-        # Guardar configuración
-        with open('config.json', 'w') as f:
-            json.dump(config, f, indent=2)
-
+    # Configurar el rol de /mi_tiempo del servidor y guardar
+    if config.for_guild(interaction.guild_id).update(mi_tiempo_role_id=rol.id):
         print(f"✅ Rol de /mi_tiempo configurado: {rol.name} (ID: {rol.id})")
         await interaction.response.send_message(f"✅ Rol configurado: {rol.mention}\nLos usuarios con este rol ahora pueden usar el comando `/mi_tiempo`.")
-
-    except Exception as e:
-        print(f"❌ Error configurando rol de /mi_tiempo: {e}")
+    else:
+        print("❌ Error configurando rol de /mi_tiempo")
         await interaction.response.send_message("❌ Error al configurar el rol. Intenta de nuevo.")
 
-async def send_auto_cancellation_notification(user_mention: str, total_time: str, cancelled_by: str, pause_count: int):
+@bot.tree.command(name="recargar_config", description="Volver a leer config.json sin reiniciar el bot")
+@is_admin()
+async def recargar_config(interaction: discord.Interaction):
+    if config.reload():
+        print("♻️ Configuración recargada manualmente")
+        await interaction.response.send_message("♻️ Configuración recargada desde config.json")
+    else:
+        await interaction.response.send_message("❌ config.json no es válido; se mantiene la configuración anterior.")
+
+async def send_auto_cancellation_notification(guild_id: int, user_mention: str, total_time: str, cancelled_by: str, pause_count: int):
     """Enviar notificación cuando un usuario es cancelado automáticamente por 3 pausas"""
-    channel = bot.get_channel(CANCELLATION_NOTIFICATION_CHANNEL_ID)
+    channel_id = config.for_guild(guild_id).channel('cancellations')
+    channel = bot.get_channel(channel_id) if channel_id else None
     if channel:
         try:
             message = f"🚫 **CANCELACIÓN AUTOMÁTICA**\n{user_mention} ha sido cancelado automáticamente por exceder el límite de pausas\n**Tiempo total perdido:** {total_time}\n**Pausas alcanzadas:** {pause_count}/3\n**Última pausa ejecutada por:** {cancelled_by}"
-            await channel.send(message)
-            print(f"✅ Notificación de cancelación automática enviada para {user_mention}")
+            notification_outbox.enqueue(channel.id, message)
+            print(f"✅ Notificación de cancelación automática encolada para {user_mention}")
         except Exception as e:
             print(f"❌ Error enviando notificación de cancelación automática: {e}")
     else:
-        print(f"❌ No se pudo encontrar el canal de cancelaciones con ID: {CANCELLATION_NOTIFICATION_CHANNEL_ID}")
+        print(f"❌ No se pudo encontrar el canal de cancelaciones con ID: {channel_id}")
 
-async def send_cancellation_notification(user_mention: str, cancelled_by: str, cancelled_time: str = ""):
+async def send_cancellation_notification(guild_id: int, user_mention: str, cancelled_by: str, cancelled_time: str = ""):
     """Enviar notificación cuando un usuario es cancelado"""
-    channel = bot.get_channel(CANCELLATION_NOTIFICATION_CHANNEL_ID)
+    channel_id = config.for_guild(guild_id).channel('cancellations')
+    channel = bot.get_channel(channel_id) if channel_id else None
     if channel:
         try:
             if cancelled_time:
                 message = f"🗑️ El seguimiento de tiempo de {user_mention} ha sido cancelado\n**Tiempo cancelado:** {cancelled_time}\n**Cancelado por:** {cancelled_by}"
             else:
                 message = f"🗑️ El seguimiento de tiempo de {user_mention} ha sido cancelado por {cancelled_by}"
-            await channel.send(message)
-            print(f"✅ Notificación de cancelación enviada para {user_mention}")
+            notification_outbox.enqueue(channel.id, message)
+            print(f"✅ Notificación de cancelación encolada para {user_mention}")
         except Exception as e:
             print(f"❌ Error enviando notificación de cancelación: {e}")
     else:
-        print(f"❌ No se pudo encontrar el canal de cancelaciones con ID: {CANCELLATION_NOTIFICATION_CHANNEL_ID}")
+        print(f"❌ No se pudo encontrar el canal de cancelaciones con ID: {channel_id}")
 
-async def send_pause_notification(user_mention: str, total_time: float, paused_by: str, session_time: str = "", pause_count: int = 0):
+async def send_pause_notification(guild_id: int, user_mention: str, total_time: float, paused_by: str, session_time: str = "", pause_count: int = 0):
     """Enviar notificación cuando un usuario es pausado"""
-    channel = bot.get_channel(PAUSE_NOTIFICATION_CHANNEL_ID)
+    channel_id = config.for_guild(guild_id).channel('pauses')
+    channel = bot.get_channel(channel_id) if channel_id else None
     if channel:
         try:
-            formatted_total_time = time_tracker.format_time_human(total_time)
+            formatted_total_time = get_tracker(guild_id).format_time_human(total_time)
             pause_text = f"pausa" if pause_count == 1 else f"pausas"
             if session_time and session_time != "0 Segundos":
                 message = f"⏸️ El tiempo de {user_mention} ha sido pausado\n**Tiempo de sesión pausado:** {session_time}\n**Tiempo total acumulado:** {formatted_total_time}\n**Pausado por:** {paused_by}\n📊 **{user_mention} lleva {pause_count} {pause_text}**"
             else:
                 message = f"⏸️ El tiempo de {user_mention} ha sido pausado por {paused_by}\n**Tiempo total acumulado:** {formatted_total_time}\n📊 **{user_mention} lleva {pause_count} {pause_text}**"
-            await channel.send(message)
-            print(f"✅ Notificación de pausa enviada para {user_mention}")
+            notification_outbox.enqueue(channel.id, message)
+            print(f"✅ Notificación de pausa encolada para {user_mention}")
         except Exception as e:
             print(f"❌ Error enviando notificación de pausa: {e}")
     else:
-        print(f"❌ No se pudo encontrar el canal de pausas con ID: {PAUSE_NOTIFICATION_CHANNEL_ID}")
+        print(f"❌ No se pudo encontrar el canal de pausas con ID: {channel_id}")
 
-async def send_unpause_notification(user_mention: str, total_time: float, unpaused_by: str, paused_duration: str = ""):
+async def send_unpause_notification(guild_id: int, user_mention: str, total_time: float, unpaused_by: str, paused_duration: str = ""):
     """Enviar notificación cuando un usuario es despausado"""
-    channel_id = config.get("notification_channels", {}).get("unpause")
+    channel_id = config.for_guild(guild_id).channel('unpause')
     if channel_id:
         channel = bot.get_channel(channel_id)
         if channel:
             try:
-                formatted_total_time = time_tracker.format_time_human(total_time)
+                formatted_total_time = get_tracker(guild_id).format_time_human(total_time)
                 if paused_duration:
                     message = f"▶️ El tiempo de {user_mention} ha sido despausado\n**Tiempo total acumulado:** {formatted_total_time}\n**Tiempo pausado:** {paused_duration}\n**Despausado por:** {unpaused_by}"
                 else:
                     message = f"▶️ {user_mention} ha sido despausado por {unpaused_by}. Tiempo acumulado: {formatted_total_time}"
-                await channel.send(message)
-                print(f"✅ Notificación de despausa enviada para {user_mention}")
+                notification_outbox.enqueue(channel.id, message)
+                print(f"✅ Notificación de despausa encolada para {user_mention}")
             except Exception as e:
                 print(f"❌ Error enviando notificación de despausa: {e}")
         else:
@@ -725,35 +922,107 @@ async def send_unpause_notification(user_mention: str, total_time: float, unpaus
     else:
         print("❌ Canal de despausas no configurado")
 
-async def check_time_milestone(user_id: int, user_name: str):
+# Filas por página del resumen Gold y máximo de embeds por mensaje de Discord
+GOLD_DIGEST_PAGE_SIZE = 20
+EMBEDS_PER_MESSAGE = 10
+
+def build_gold_digest_embeds(memberships: list) -> list:
+    """Crear las páginas (embeds) del resumen de membresías Gold por expirar"""
+    lines = [
+        f"• <@{membership['user_id']}> ({membership['role_name']}) — expira en "
+        f"{gold_tracker.format_time_remaining(membership['expiry_date'])}"
+        for membership in memberships
+    ]
+    pages = [lines[i:i + GOLD_DIGEST_PAGE_SIZE] for i in range(0, len(lines), GOLD_DIGEST_PAGE_SIZE)]
+
+    embeds = []
+    for page_number, page in enumerate(pages, start=1):
+        embed = discord.Embed(
+            title=f"⏰ Membresías Gold por expirar ({len(memberships)})",
+            description="\n".join(page),
+            color=discord.Color.gold(),
+            timestamp=datetime.now()
+        )
+        embed.set_footer(text=f"Página {page_number}/{len(pages)}")
+        embeds.append(embed)
+    return embeds
+
+async def send_gold_notification(kind: str, membership):
+    """Enviar al canal Gold el aviso de expiración próxima, el resumen de avisos o la membresía expirada"""
+    channel_id = config.get("notification_channels", {}).get("gold")
+    if not channel_id:
+        print("❌ Canal de notificaciones Gold no configurado")
+        return
+
+    channel = bot.get_channel(channel_id)
+    if not channel:
+        print(f"❌ No se pudo encontrar el canal Gold con ID: {channel_id}")
+        return
+
+    try:
+        if kind == WARNING_DIGEST:
+            # Un solo mensaje con todas las páginas (o varios si superan el límite de embeds)
+            embeds = build_gold_digest_embeds(membership)
+            for i in range(0, len(embeds), EMBEDS_PER_MESSAGE):
+                await channel.send(embeds=embeds[i:i + EMBEDS_PER_MESSAGE])
+            print(f"✅ Resumen Gold enviado con {len(membership)} membresías por expirar")
+            return
+
+        user_mention = f"<@{membership['user_id']}>"
+        if kind == EXPIRY:
+            message = f"⌛ La membresía Gold de {user_mention} ({membership['role_name']}) ha expirado y el rol fue removido."
+        else:
+            time_remaining = gold_tracker.format_time_remaining(membership['expiry_date'])
+            message = f"⏰ La membresía Gold de {user_mention} ({membership['role_name']}) expira en {time_remaining}."
+        notification_outbox.enqueue(channel.id, message)
+        print(f"✅ Notificación Gold ({kind}) encolada para {membership['username']}")
+    except Exception as e:
+        print(f"❌ Error enviando notificación Gold: {e}")
+
+async def remove_expired_gold_role(user_id: int, role_id: int):
+    """Quitar el rol Gold de un miembro cuya membresía expiró"""
+    for guild in bot.guilds:
+        role = guild.get_role(role_id)
+        member = await member_cache.fetch(guild, user_id) if role else None
+        if role and member and role in member.roles:
+            await member.remove_roles(role, reason="Membresía Gold expirada")
+            print(f"🚫 Rol Gold {role.name} removido de {member.display_name}")
+
+async def check_time_milestone(user_id: int, user_name: str, guild_id: Optional[int] = None):
     """Verificar si el usuario ha alcanzado milestones de tiempo y enviar notificaciones"""
-    user_data = time_tracker.get_user_data(user_id)
-    if not user_data:
+    partition = get_partition(guild_id)
+    time_tracker = partition.time_tracker
+    if not time_tracker.get_user_data(user_id):
         return
 
     # Obtener el miembro para verificar roles
-    guild = bot.guilds[0] if bot.guilds else None
-    member = guild.get_member(user_id) if guild else None
+    guild = bot.get_guild(partition.guild_id)
+    member = await member_cache.fetch(guild, user_id) if guild else None
     has_unlimited_role = member and has_unlimited_time_role(member)
 
-    # Solo verificar si el usuario está activo o pausado (pero no completamente detenido)
-    if not user_data.get('is_active', False):
+    # Aplicar el milestone sin que un comando sobre el mismo usuario se intercale; marcar,
+    # guardar la notificación y detener se escriben juntos y, si algo falla, no queda a medias
+    async with partition.async_tracker.user_lock(user_id):
+        with time_tracker.batch():
+            apply_time_milestone(partition, user_id, user_name, has_unlimited_role)
+
+def apply_time_milestone(partition: GuildPartition, user_id: int, user_name: str, has_unlimited_role: bool):
+    """Marcar el milestone alcanzado, guardar su notificación y detener el seguimiento"""
+    time_tracker = partition.time_tracker
+    notification_channel_id = partition.config.channel('milestones')
+    user_data = time_tracker.get_user_data(user_id)
+    if not user_data:
         return
 
-    # Calcular tiempo de la sesión actual
-    if not user_data.get('last_start'):
+    # Solo verificar si el usuario está activo o pausado (pero no completamente detenido)
+    if not user_data.is_active:
         return
 
-    session_start = datetime.fromisoformat(user_data['last_start'])
+    # Calcular tiempo de la sesión actual (hasta la pausa si está pausado)
+    if user_data.last_start is None:
+        return
 
-    # Si está pausado, calcular tiempo hasta la pausa
-    if user_data.get('is_paused', False) and user_data.get('pause_start'):
-        pause_start = datetime.fromisoformat(user_data['pause_start'])
-        session_time = (pause_start - session_start).total_seconds()
-    else:
-        # Si está activo, calcular tiempo hasta ahora
-        current_time = datetime.now()
-        session_time = (current_time - session_start).total_seconds()
+    session_time = time_tracker.get_session_time(user_id)
 
     # Solo proceder si la sesión actual ha alcanzado 1 hora
     if session_time < 3600:
@@ -761,75 +1030,54 @@ async def check_time_milestone(user_id: int, user_name: str):
 
     total_time = time_tracker.get_total_time(user_id)
     print(f"Verificando milestone para {user_name}: sesión {session_time}s, total {total_time}s")
-    print(f"  Estado: activo={user_data.get('is_active')}, pausado={user_data.get('is_paused')}")
-
-    # Asegurar que existe el campo notified_milestones
-    if 'notified_milestones' not in user_data:
-        user_data['notified_milestones'] = []
-        time_tracker.save_data()
-
-    notified_milestones = user_data.get('notified_milestones', [])
+    print(f"  Estado: activo={user_data.is_active}, pausado={user_data.is_paused}")
 
     # Calcular cuántas horas totales tiene el usuario
     total_hours = int(total_time // 3600)
-    hour_milestone = total_hours * 3600
 
     # Verificar si hay milestones perdidos (usuario tiene tiempo acumulado pero sin notificaciones)
-    missing_milestones = []
-    for h in range(1, total_hours + 1):
-        milestone = h * 3600
-        if milestone not in notified_milestones:
-            missing_milestones.append((milestone, h))
+    hours_to_notify = user_data.highest_pending_milestone(total_hours)
 
     # Si hay milestones perdidos, notificar el más reciente
-    if missing_milestones:
-        milestone_to_notify, hours_to_notify = missing_milestones[-1]
+    if hours_to_notify is not None:
         print(f"Detectado milestone perdido: {hours_to_notify} hora(s) para {user_name}")
 
-        # Marcar TODOS los milestones perdidos como notificados
-        for milestone, _ in missing_milestones:
-            if milestone not in notified_milestones:
-                notified_milestones.append(milestone)
-        user_data['notified_milestones'] = notified_milestones
-        time_tracker.save_data()
+        user_mention = f"<@{user_id}>"
+        formatted_time = time_tracker.format_time_human(total_time)
+        if hours_to_notify == 1:
+            message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
+        else:
+            message = f"🎉 {user_mention} ha completado {hours_to_notify} Horas! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
+
+        # Marcar TODOS los milestones perdidos como notificados y guardar la notificación
+        # pendiente en la misma escritura, para que un fallo al enviar no la pierda
+        user_data.mark_milestones_through(total_hours)
+        time_tracker.queue_notification(user_id, notification_channel_id, message)
+        time_tracker.save_user(user_id)
 
         # Detener el seguimiento después de completar 1 hora de sesión
         time_tracker.stop_tracking(user_id)
-
-        # Enviar notificación del milestone más alto
-        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if channel:
-            try:
-                user_mention = f"<@{user_id}>"
-                formatted_time = time_tracker.format_time_human(total_time)
-
-                if hours_to_notify == 1:
-                    message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
-                else:
-                    message = f"🎉 {user_mention} ha completado {hours_to_notify} Horas! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
-
-                await channel.send(message)
-                print(f"✅ Notificación enviada: {user_name} completó {hours_to_notify} hora(s)")
-                print(f"Seguimiento detenido automáticamente para {user_name}")
-                return
-            except Exception as e:
-                print(f"❌ Error enviando notificación: {e}")
-        else:
-            print(f"❌ No se pudo encontrar el canal con ID: {NOTIFICATION_CHANNEL_ID}")
+        print(f"✅ Notificación guardada para entrega: {user_name} completó {hours_to_notify} hora(s)")
+        print(f"Seguimiento detenido automáticamente para {user_name}")
 
     # Verificar si ya se notificó este milestone específico
-    elif hour_milestone not in notified_milestones:
+    elif not user_data.is_milestone_notified(total_hours):
         print(f"Enviando notificación de {total_hours} Hora(s) para {user_name}...")
 
-        # Marcar este milestone como notificado
-        notified_milestones.append(hour_milestone)
-        user_data['notified_milestones'] = notified_milestones
-        time_tracker.save_data()
+        user_mention = f"<@{user_id}>"
+        formatted_time = time_tracker.format_time_human(total_time)
+        if total_hours == 1:
+            if not has_unlimited_role:
+                message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
+            else:
+                message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento pausado automáticamente."
+        else:
+            message = f"🎉 {user_mention} ha completado {total_hours} Horas! Tiempo acumulado: {formatted_time} - Seguimiento pausado automáticamente."
 
-        # Verificar roles del usuario
-        guild = bot.guilds[0] if bot.guilds else None
-        member = guild.get_member(user_id) if guild else None
-        has_unlimited_role = member and has_unlimited_time_role(member)
+        # Marcar este milestone (y los anteriores) como notificados junto con la notificación pendiente
+        user_data.mark_milestones_through(total_hours)
+        time_tracker.queue_notification(user_id, notification_channel_id, message)
+        time_tracker.save_user(user_id)
 
         # Detener seguimiento para usuarios sin rol especial, pausar para usuarios con rol especial
         if not has_unlimited_role:
@@ -842,73 +1090,72 @@ async def check_time_milestone(user_id: int, user_name: str):
             user_data = time_tracker.get_user_data(user_id)
             if user_data:
                 user_data['milestone_completed'] = True
-                time_tracker.save_data()
+                time_tracker.save_user(user_id)
             print(f"Seguimiento detenido automáticamente para {user_name} (milestone {int(total_hours)} hora(s) completado - rol especial)")
 
-        # Enviar notificación
-        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if channel:
-            try:
-                user_mention = f"<@{user_id}>"
-                formatted_time = time_tracker.format_time_human(total_time)
-
-                if total_hours == 1:
-                    if not has_unlimited_role:
-                        message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
-                    else:
-                        message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento pausado automáticamente."
-                else:
-                    message = f"🎉 {user_mention} ha completado {total_hours} Horas! Tiempo acumulado: {formatted_time} - Seguimiento pausado automáticamente."
-
-                await channel.send(message)
-                print(f"✅ Notificación enviada: {user_name} completó {total_hours} hora(s)")
-            except Exception as e:
-                print(f"❌ Error enviando notificación: {e}")
-        else:
-            print(f"❌ No se pudo encontrar el canal con ID: {NOTIFICATION_CHANNEL_ID}")
+        print(f"✅ Notificación guardada para entrega: {user_name} completó {total_hours} hora(s)")
     else:
         print(f"{user_name} ya fue notificado del milestone {total_hours} hora(s)")
 
-async def check_missing_milestones():
-    """Verificar y notificar milestones perdidos para todos los usuarios"""
+async def check_missing_milestones(partition: GuildPartition):
+    """Verificar y notificar milestones perdidos de los usuarios de un servidor cuyo total cambió"""
+    time_tracker = partition.time_tracker
+    notification_channel_id = partition.config.channel('milestones')
+    guild = bot.get_guild(partition.guild_id)
+    candidates = set()
     try:
-        tracked_users = time_tracker.get_all_tracked_users()
+        # Solo los usuarios modificados desde la última pasada y los que tienen sesión corriendo
+        # (su total crece sin mutaciones); los demás no pueden tener milestones nuevos
+        candidates = time_tracker.take_changed_totals()
+        candidates.update(user_id_str for user_id_str, _ in time_tracker.iter_active())
+
+        # Pedir en lotes solo los miembros con milestones pendientes (el servidor puede no estar en caché)
+        pending = []
+        for user_id_str in candidates:
+            data = time_tracker.get_user_data(int(user_id_str))
+            if data is not None and data.highest_pending_milestone(int(time_tracker.get_total_time(int(user_id_str)) // 3600)) is not None:
+                pending.append(int(user_id_str))
+        try:
+            members = await member_cache.fetch_many(guild, pending) if guild and pending else {}
+        except Exception as e:
+            # Sin saber quién sigue en el servidor no se limpia a nadie: reintentar en la próxima pasada
+            time_tracker.mark_totals_changed(candidates)
+            print(f"⚠️ No se pudieron obtener los miembros del servidor {partition.guild_id}: {e}")
+            return
+
+        # Todos los cambios de la pasada (y sus notificaciones) se persisten en una sola escritura;
+        # si la pasada falla se deshacen todos (ver el except)
+        with time_tracker.batch():
+            for user_id_str in candidates:
+                data = time_tracker.get_user_data(int(user_id_str))
+                if data is None:
+                    continue
+
+                user_id = int(user_id_str)
+                user_name = data.get('name', f'Usuario {user_id}')
+                total_time = time_tracker.get_total_time(user_id)
 
-        for user_id_str, data in tracked_users.items():
-            user_id = int(user_id_str)
-            user_name = data.get('name', f'Usuario {user_id}')
-            total_time = time_tracker.get_total_time(user_id)
-
-            # Asegurar que existe el campo notified_milestones
-            if 'notified_milestones' not in data:
-                data['notified_milestones'] = []
-                time_tracker.save_data()
-
-            notified_milestones = data.get('notified_milestones', [])
-            total_hours = int(total_time // 3600)
-
-            # Verificar milestones perdidos
-            missing_milestones = []
-            for h in range(1, total_hours + 1):
-                milestone = h * 3600
-                if milestone not in notified_milestones:
-                    missing_milestones.append((milestone, h))
-
-            # Notificar milestone más alto perdido (solo una vez)
-            if missing_milestones:
-                milestone_to_notify, hours_to_notify = missing_milestones[-1]
+                total_hours = int(total_time // 3600)
+
+                # Verificar milestones perdidos (consulta O(1) sobre high-water mark + bitset)
+                hours_to_notify = data.highest_pending_milestone(total_hours)
+                if hours_to_notify is None:
+                    continue
+                if (guild is not None and user_id not in members) or partition.async_tracker.is_locked(user_id):
+                    # Llegó a un milestone mientras se pedían los miembros, o hay un comando en curso
+                    # sobre el usuario: se revisa en la próxima pasada
+                    time_tracker.mark_totals_changed([user_id_str])
+                    continue
+
+                # Notificar milestone más alto perdido (solo una vez)
                 print(f"Detectado milestone perdido: {hours_to_notify} hora(s) para {user_name} (total: {total_time}s)")
 
                 # Marcar todos los milestones perdidos como notificados
-                for milestone, _ in missing_milestones:
-                    if milestone not in notified_milestones:
-                        notified_milestones.append(milestone)
-                data['notified_milestones'] = notified_milestones
-                time_tracker.save_data()
+                data.mark_milestones_through(total_hours)
+                time_tracker.save_user(user_id)
 
                 # Verificar roles del usuario
-                guild = bot.guilds[0] if bot.guilds else None
-                member = guild.get_member(user_id) if guild else None
+                member = members.get(user_id)
                 has_unlimited_role = False
 
                 if member:
@@ -920,76 +1167,151 @@ async def check_missing_milestones():
                     time_tracker.cancel_user_tracking(user_id)
                     continue
 
-
                 # Detener seguimiento para todos los usuarios en milestones
                 if hours_to_notify >= 1:
                     time_tracker.stop_tracking(user_id)
                     # Marcar como milestone completado para usuarios con rol especial
                     if has_unlimited_role:
-                        user_data = time_tracker.get_user_data(user_id)
-                        if user_data:
-                            user_data['milestone_completed'] = True
-                            time_tracker.save_data()
+                        data = time_tracker.get_user_data(user_id) or data
+                        data['milestone_completed'] = True
+                        time_tracker.save_user(user_id)
                         print(f"Seguimiento detenido automáticamente para {user_name} (milestone {hours_to_notify} hora(s) completado - rol especial)")
                     else:
                         print(f"Seguimiento detenido automáticamente para {user_name} (sin rol especial)")
 
-                # Enviar notificación
-                channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-                if channel:
-                    try:
-                        user_mention = f"<@{user_id}>"
-                        formatted_time = time_tracker.format_time_human(total_time)
-
-                        if hours_to_notify == 1:
-                            message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
-                        else:
-                            message = f"🎉 {user_mention} ha completado {hours_to_notify} Horas! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
-
-                        await channel.send(message)
-                        print(f"✅ Notificación de milestone perdido enviada: {user_name} - {hours_to_notify} hora(s)")
-                    except Exception as e:
-                        print(f"❌ Error enviando notificación de milestone perdido: {e}")
+                user_mention = f"<@{user_id}>"
+                formatted_time = time_tracker.format_time_human(total_time)
+                if hours_to_notify == 1:
+                    message = f"🎉 {user_mention} ha completado 1 Hora! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
+                else:
+                    message = f"🎉 {user_mention} ha completado {hours_to_notify} Horas! Tiempo acumulado: {formatted_time} - Seguimiento detenido automáticamente."
 
-                # Marcar que este usuario ya fue procesado en esta verificación para evitar duplicados
+                # Marcar que este usuario ya fue procesado en esta verificación para evitar duplicados,
+                # con la notificación pendiente en la misma escritura
+                data = time_tracker.get_user_data(user_id) or data
                 data['last_milestone_check'] = total_time
-                time_tracker.save_data()
+                time_tracker.queue_notification(user_id, notification_channel_id, message)
+                time_tracker.save_user(user_id)
+                print(f"✅ Notificación de milestone perdido guardada para entrega: {user_name} - {hours_to_notify} hora(s)")
 
     except Exception as e:
+        # La pasada se deshizo: volver a revisar todos sus candidatos, también los que no llegó a visitar
+        time_tracker.mark_totals_changed(candidates)
         print(f"❌ Error verificando milestones perdidos: {e}")
 
-async def periodic_milestone_check():
-    """Verificar milestones periódicamente para usuarios activos"""
-    milestone_check_count = 0
+async def check_user_milestone(user_id: int, guild_id: int):
+    """Verificar el milestone de un usuario cuando vence su sesión (llamado por el programador del servidor)"""
+    user_data = get_tracker(guild_id).get_user_data(user_id)
+    if user_data:
+        await check_time_milestone(user_id, user_data.name or f'Usuario {user_id}', guild_id)
 
+async def periodic_milestone_check():
+    """Verificar milestones perdidos cada minuto (las sesiones de 1 hora las vigila el programador de cada servidor)"""
     while True:
         try:
-            await asyncio.sleep(5)  # Verificar cada 5 segundos
-            milestone_check_count += 1
-
-            # Verificar milestones perdidos cada 12 ciclos (cada minuto)
-            if milestone_check_count % 12 == 1:
-                await check_missing_milestones()
-
-            # Verificar usuarios activos para sesiones de 1 hora
-            tracked_users = time_tracker.get_all_tracked_users()
-            for user_id_str, data in tracked_users.items():
-                if data.get('is_active', False) and not data.get('is_paused', False):
-                    user_id = int(user_id_str)
-                    user_name = data.get('name', f'Usuario {user_id}')
-                    await check_time_milestone(user_id, user_name)
+            for partition in partitions:
+                await check_missing_milestones(partition)
+                if partition.time_tracker.repository.shared:
+                    # Otros procesos pueden haber iniciado o detenido sesiones: re-sincronizar el programador
+                    partition.milestone_scheduler.rebuild()
+            await asyncio.sleep(60)
 
         except Exception as e:
             print(f"Error en verificación periódica de milestones: {e}")
             await asyncio.sleep(10)
 
+async def periodic_storage_maintenance():
+    """Compactar los diarios cuando crecen, escribiendo el snapshot fuera del event loop"""
+    while True:
+        try:
+            await asyncio.sleep(60)
+
+            # Serializar en el loop (donde se modifican los datos) y escribir en un hilo
+            async with persistence_lock:
+                for tracker in all_trackers():
+                    writer = tracker.repository.prepare_maintenance()
+                    if writer is not None and await asyncio.to_thread(writer):
+                        print(f"🗜️ Almacenamiento compactado ({type(tracker).__name__})")
+
+        except Exception as e:
+            print(f"Error en el mantenimiento del almacenamiento: {e}")
+
+def owns_gold_membership(membership: dict) -> bool:
+    """True si la membresía Gold es de un servidor de los shards de este proceso.
+
+    Las membresías anteriores al sharding no guardan servidor: las atiende el
+    proceso del servidor principal.
+    """
+    guild_id = membership.get('guild_id') or config.get('primary_guild_id')
+    if guild_id is None:
+        return shard_ownership.owns_shard(0)
+    return shard_ownership.owns_guild(guild_id)
+
+def all_trackers() -> list:
+    """Trackers de todos los servidores cargados más el de Gold"""
+    return [partition.time_tracker for partition in partitions] + [gold_tracker]
+
+async def flush_trackers():
+    """Escribir los cambios pendientes de todos los trackers en un hilo de trabajo"""
+    async with persistence_lock:
+        for tracker in all_trackers():
+            # La serialización ocurre en el loop; solo la escritura a disco va al hilo
+            writer = tracker.prepare_flush()
+            if writer is not None:
+                await asyncio.to_thread(writer)
+
+# Tiempo máximo para enviar las notificaciones en cola al cerrar el bot
+SHUTDOWN_DRAIN_SECONDS = 10
+
+async def shutdown_persistence():
+    """Al cerrar el bot: enviar las notificaciones en cola y escribir los cambios pendientes del modo write-behind"""
+    try:
+        await asyncio.wait_for(notification_outbox.drain(), SHUTDOWN_DRAIN_SECONDS)
+    except asyncio.TimeoutError:
+        print("⚠️ No se pudieron enviar todas las notificaciones en cola antes de cerrar")
+    notification_outbox.close()
+    await flush_trackers()
+    print("💾 Datos pendientes guardados")
+
+async def periodic_flush():
+    """Escribir los datos como máximo una vez por intervalo configurado"""
+    while True:
+        try:
+            await asyncio.sleep(SAVE_INTERVAL_SECONDS)
+            await flush_trackers()
+        except Exception as e:
+            print(f"Error escribiendo datos pendientes: {e}")
+
 # Iniciar la verificación periódica después de definir la función
 async def start_periodic_checks():
     """Iniciar la verificación periódica de milestones"""
-    global milestone_check_task
+    global milestone_check_task, storage_maintenance_task, flush_task
+    global gold_expiry_engine, gold_expiry_task
     if milestone_check_task is None:
         milestone_check_task = bot.loop.create_task(periodic_milestone_check())
         print('Task de verificación de milestones iniciado')
+    # Programador y entrega de notificaciones de los servidores ya cargados (los demás al cargarse)
+    for partition in partitions:
+        start_partition_tasks(partition)
+    if gold_expiry_task is None:
+        gold_expiry_config = config.get('gold_expiry', {})
+        gold_expiry_engine = GoldExpiryEngine(
+            gold_tracker,
+            notify=send_gold_notification,
+            remove_role=remove_expired_gold_role,
+            warning_days=gold_expiry_config.get('warning_days', 3),
+            removals_per_second=gold_expiry_config.get('role_removals_per_second', 1),
+            digest_hour=gold_expiry_config.get('digest_hour', 9) if gold_expiry_config.get('digest', False) else None,
+            owns=owns_gold_membership
+        )
+        gold_expiry_task = bot.loop.create_task(gold_expiry_engine.run())
+        print('Motor de expiración Gold iniciado')
+    if storage_maintenance_task is None and storage_config.get('mode') == 'journal':
+        storage_maintenance_task = bot.loop.create_task(periodic_storage_maintenance())
+        print('Task de compactación del diario iniciado')
+    if flush_task is None and WRITE_BEHIND:
+        flush_task = bot.loop.create_task(periodic_flush())
+        print(f'Task de escritura diferida iniciado (cada {SAVE_INTERVAL_SECONDS // 60} minuto(s))')
 
 # Agregar la inicialización al final del archivo
 @bot.event
@@ -997,10 +1319,19 @@ async def on_connect():
     """Evento que se ejecuta cuando el bot se conecta"""
     await start_periodic_checks()
 
+@bot.event
+async def on_shard_ready(shard_id: int):
+    """Cada shard carga los datos de sus servidores cuando recibe su lista de servidores"""
+    guilds = [guild for guild in bot.guilds if guild.shard_id == shard_id]
+    # Sus programadores arrancan sin esperar a que estén listos los demás shards (on_ready)
+    warm_partitions(guilds)
+    print(f'Shard {shard_id} listo con {len(guilds)} servidor(es)')
+
 @bot.tree.command(name="saber_tiempo", description="Ver estadísticas detalladas de un usuario")
 @discord.app_commands.describe(usuario="El usuario del que ver estadísticas")
 @is_admin()
 async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.Member):
+    time_tracker = get_tracker(interaction.guild_id)
     user_data = time_tracker.get_user_data(usuario.id)
 
     if not user_data:
@@ -1063,8 +1394,9 @@ async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.
 
 @bot.tree.command(name="mi_tiempo", description="Ver tu propio tiempo acumulado")
 async def mi_tiempo(interaction: discord.Interaction):
+    time_tracker = get_tracker(interaction.guild_id)
     # El decorator ya verificó los permisos, por lo que este código es seguro ejecutar
-    member = interaction.guild.get_member(interaction.user.id)
+    member = interaction_member(interaction)
 
     user_data = time_tracker.get_user_data(interaction.user.id)
 
@@ -1097,8 +1429,8 @@ async def mi_tiempo(interaction: discord.Interaction):
 
     embed.add_field(name="📍 Estado", value=status, inline=True)
 
-    if user_data.get('last_start'):
-        last_start = datetime.fromisoformat(user_data['last_start'])
+    if user_data.last_start is not None:
+        last_start = datetime.fromtimestamp(user_data.last_start)
         embed.add_field(
             name="🕐 Última Sesión Iniciada", 
             value=last_start.strftime("%d/%m/%Y %H:%M:%S"), 
@@ -1144,7 +1476,8 @@ async def dar_gold(interaction: discord.Interaction, usuario: discord.Member, ro
         username=usuario.display_name,
         role_id=rol.id,
         role_name=rol.name,
-        granted_by=interaction.user.id
+        granted_by=interaction.user.id,
+        guild_id=interaction.guild_id
     )
 
     if success:
@@ -1209,6 +1542,9 @@ async def ver_gold(interaction: discord.Interaction):
         await interaction.response.send_message("📊 No hay membresías Gold activas")
         return
 
+    await interaction.response.defer()
+    users = await user_resolver.resolve_many(active_memberships.keys(), interaction.guild)
+
     embed = discord.Embed(
         title="🥇 Membresías Gold Activas",
         color=discord.Color.gold(),
@@ -1216,12 +1552,8 @@ async def ver_gold(interaction: discord.Interaction):
     )
 
     for user_id_str, data in active_memberships.items():
-        user_id = int(user_id_str)
-        try:
-            user = await bot.fetch_user(user_id)
-            user_mention = user.mention
-        except:
-            user_mention = f"**{data['username']}**"
+        user = users.get(int(user_id_str))
+        user_mention = user.mention if user is not None else f"**{data['username']}**"
 
         days_remaining = data.get('days_remaining', 0)
         expiry_date = datetime.fromisoformat(data['expiry_date'])
@@ -1237,7 +1569,7 @@ async def ver_gold(interaction: discord.Interaction):
         )
 
     embed.set_footer(text=f"Total: {len(active_memberships)} membresías activas")
-    await interaction.response.send_message(embed=embed)
+    await interaction.followup.send(embed=embed)
 
 @bot.tree.command(name="verificar_gold", description="Verificar el estado de membresía Gold de un usuario")
 @discord.app_commands.describe(usuario="El usuario a verificar")
@@ -1366,4 +1698,11 @@ if __name__ == "__main__":
         print("🛑 Bot detenido por el usuario")
     except Exception as e:
         print(f"❌ Error al iniciar el bot: {e}")
-        print("   Revisa la configuración y vuelve a intentar")
\ No newline at end of file
+        print("   Revisa la configuración y vuelve a intentar")
+    finally:
+        # Escribir los cambios pendientes del modo write-behind antes de salir
+        trackers = all_trackers()
+        if any(tracker.is_dirty() for tracker in trackers):
+            for tracker in trackers:
+                tracker.flush()
+            print("💾 Datos pendientes guardados")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+from snapshot_io import write_atomic
+
+class BotConfig:
+    """Configuración de ``config.json`` cargada una vez y cacheada en memoria.
+
+    Las lecturas no abren el archivo: como mucho cada ``check_interval``
+    segundos se compara su fecha de modificación y solo se vuelve a leer si
+    cambió (por ejemplo al editarlo a mano). ``update``/``set_channel`` guardan
+    con un reemplazo atómico, así que una caída a mitad de escritura nunca deja
+    el archivo truncado.
+
+    Admite ``config.get(...)`` y ``config['clave']`` como el dict anterior.
+    """
+
+    def __init__(self, path: str = 'config.json', check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._data: Dict = {}
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.reload()
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        """Leer de nuevo el archivo; si no es válido se conserva la configuración anterior"""
+        self._checked_at = time.monotonic()
+        mtime = self._file_mtime()
+        try:
+            with open(self.path, 'r') as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+        except Exception as e:
+            print(f"Error cargando configuración: {e}")
+            return False
+        self._mtime = mtime
+        return True
+
+    def refresh(self):
+        """Recargar solo si el archivo cambió desde la última lectura"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if self._file_mtime() != self._mtime:
+            if self.reload():
+                print("♻️ Configuración recargada desde disco")
+
+    @property
+    def data(self) -> Dict:
+        self.refresh()
+        return self._data
+
+    def save(self) -> bool:
+        """Guardar la configuración actual de forma atómica"""
+        try:
+            write_atomic(self.path, json.dumps(self._data, indent=2))
+        except OSError as e:
+            print(f"❌ Error guardando configuración: {e}")
+            return False
+        self._mtime = self._file_mtime()
+        return True
+
+    def update(self, **values) -> bool:
+        """Cambiar claves de primer nivel y guardar"""
+        self.refresh()
+        self._data.update(values)
+        return self.save()
+
+    def set_channel(self, name: str, channel_id: int, guild_id: Optional[int] = None) -> bool:
+        """Configurar un canal de notificaciones (global o de un servidor) y guardar"""
+        self.refresh()
+        target = self._data if guild_id is None else self._guild_section(guild_id)
+        target.setdefault('notification_channels', {})[name] = channel_id
+        return self.save()
+
+    def update_guild(self, guild_id: int, **values) -> bool:
+        """Cambiar claves de la configuración de un servidor y guardar"""
+        self.refresh()
+        self._guild_section(guild_id).update(values)
+        return self.save()
+
+    def _guild_section(self, guild_id: int) -> Dict:
+        return self._data.setdefault('guilds', {}).setdefault(str(guild_id), {})
+
+    def for_guild(self, guild_id: int) -> 'GuildConfig':
+        """Vista de la configuración de un servidor"""
+        return GuildConfig(self, guild_id)
+
+    def section(self, name: str) -> Dict:
+        """Sección de la configuración (``{}`` si no existe)"""
+        return self.data.get(name) or {}
+
+    def channel(self, name: str) -> Optional[int]:
+        return self.section('notification_channels').get(name)
+
+    @property
+    def command_permission_role_id(self) -> Optional[int]:
+        return self.data.get('command_permission_role_id')
+
+    @property
+    def mi_tiempo_role_id(self) -> Optional[int]:
+        return self.data.get('mi_tiempo_role_id')
+
+    @property
+    def unlimited_time_role_id(self) -> Optional[int]:
+        return self.data.get('unlimited_time_role_id')
+
+    # --- Acceso tipo dict ---
+
+    def get(self, key: str, default=None):
+        return self.data.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.data[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def __bool__(self) -> bool:
+        return bool(self.data)
+
+
+class GuildConfig:
+    """Configuración de un servidor: ``guilds.<id>`` en config.json, con la global como respaldo.
+
+    Solo se guardan en el servidor las claves que difieren (canales, roles,
+    límites); el resto se lee de la configuración global, así un bot con un
+    único servidor sigue funcionando sin sección ``guilds``.
+    """
+
+    def __init__(self, config: BotConfig, guild_id: int):
+        self.config = config
+        self.guild_id = guild_id
+
+    def _overrides(self) -> Dict:
+        return self.config.section('guilds').get(str(self.guild_id)) or {}
+
+    def get(self, key: str, default=None):
+        overrides = self._overrides()
+        if key in overrides:
+            return overrides[key]
+        return self.config.get(key, default)
+
+    def channel(self, name: str) -> Optional[int]:
+        channel_id = (self._overrides().get('notification_channels') or {}).get(name)
+        return channel_id if channel_id is not None else self.config.channel(name)
+
+    def set_channel(self, name: str, channel_id: int) -> bool:
+        return self.config.set_channel(name, channel_id, guild_id=self.guild_id)
+
+    def update(self, **values) -> bool:
+        return self.config.update_guild(self.guild_id, **values)
+
+    @property
+    def command_permission_role_id(self) -> Optional[int]:
+        return self.get('command_permission_role_id')
+
+    @property
+    def mi_tiempo_role_id(self) -> Optional[int]:
+        return self.get('mi_tiempo_role_id')
+
+    @property
+    def unlimited_time_role_id(self) -> Optional[int]:
+        return self.get('unlimited_time_role_id')
+
+    def time_limit_hours(self, has_unlimited_role: bool) -> float:
+        """Horas máximas acumulables según el rol del usuario"""
+        limits = self.get('time_limits') or {}
+        if has_unlimited_role:
+            return limits.get('unlimited_hours', 4)
+        return limits.get('default_hours', 2)
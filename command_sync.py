@@ -0,0 +1,49 @@
+import hashlib
+import json
+from typing import Dict, List, Optional
+from snapshot_io import write_atomic
+
+def command_tree_hash(tree, guild=None) -> str:
+    """Hash estable de los comandos registrados (nombre, descripción, opciones, permisos...)"""
+    commands = sorted(
+        (command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+        key=lambda payload: (payload.get('type', 1), payload['name'])
+    )
+    payload = json.dumps(commands, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _load_hashes(path: str) -> Dict[str, str]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"⚠️ No se pudo leer {path}: {e}")
+        return {}
+
+async def sync_command_tree(tree, hash_file: str, guild=None, force: bool = False) -> Optional[List]:
+    """Sincronizar los comandos slash solo si cambiaron desde la última sincronización.
+
+    El hash del árbol se guarda en ``hash_file`` por ámbito (global o por
+    servidor). Con ``guild`` los comandos globales se copian a ese servidor y se
+    sincronizan solo allí, lo que se propaga al instante (útil en desarrollo).
+    Devuelve los comandos sincronizados, o None si no hubo que sincronizar.
+    Borrar ``hash_file`` (o ``force=True``) fuerza la sincronización.
+    """
+    if guild is not None:
+        tree.copy_global_to(guild=guild)
+    scope = 'global' if guild is None else str(guild.id)
+    current = command_tree_hash(tree, guild)
+
+    hashes = _load_hashes(hash_file)
+    if not force and hashes.get(scope) == current:
+        return None
+
+    synced = await tree.sync(guild=guild)
+    hashes[scope] = current
+    try:
+        write_atomic(hash_file, json.dumps(hashes, indent=2))
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el hash de comandos en {hash_file}: {e}")
+    return synced
@@ -0,0 +1,222 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Tipos de evento del heap de expiración
+WARNING = 'warning'
+EXPIRY = 'expiry'
+# Notificación que agrupa todos los avisos de una misma ejecución (modo resumen)
+WARNING_DIGEST = 'warning_digest'
+
+class GoldExpiryEngine:
+    """Motor de expiración automática de membresías Gold.
+
+    Mantiene un min-heap con el próximo aviso (``warning_days`` antes de
+    expirar) y la expiración de cada membresía activa, y duerme hasta el evento
+    más próximo en lugar de recorrer todas las membresías periódicamente. Se
+    re-programa cuando GoldTracker notifica un cambio.
+
+    Al vencer un aviso se marca la membresía como notificada; al expirar se
+    desactiva y el rol se encola para quitarlo respetando ``removals_per_second``.
+    Marcar/desactivar antes de notificar garantiza que cada membresía se
+    notifique una sola vez, incluso tras un reinicio. La membresía desactivada
+    queda con ``role_removed`` en False hasta que se quita el rol, así que
+    ``rebuild`` vuelve a encolar las que quedaron en la cola al reiniciar.
+
+    En modo resumen (``digest_hour`` no es None) los avisos se retrasan hasta la
+    siguiente ``digest_hour`` del día, de modo que todos los de un mismo día
+    vencen juntos y se notifican como una única lista (``WARNING_DIGEST``).
+
+    ``owns`` limita el motor a las membresías que atiende este proceso (por
+    ejemplo las de los servidores de sus shards); las demás no se programan.
+    """
+
+    def __init__(self, gold_tracker, notify: Callable[[str, Dict], Awaitable[None]],
+                 remove_role: Callable[[int, int], Awaitable[None]],
+                 warning_days: int = 3, removals_per_second: float = 1.0,
+                 digest_hour: Optional[int] = None, owns: Optional[Callable[[Dict], bool]] = None):
+        self.gold_tracker = gold_tracker
+        self.owns = owns
+        self.digest_hour = digest_hour
+        self.notify = notify
+        self.remove_role = remove_role
+        self.warning_seconds = warning_days * 86400
+        self.removal_interval = 1.0 / removals_per_second if removals_per_second > 0 else 0.0
+        self._heap = []
+        # Expiración (epoch) programada para cada usuario; invalida entradas obsoletas del heap
+        self._expiry: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._removals: Optional[asyncio.Queue] = None
+        # Usuarios en la cola de roles por quitar (para no encolarlos dos veces)
+        self._queued_removals = set()
+        gold_tracker.add_listener(self.rearm)
+        self.rebuild()
+
+    def rearm(self, user_id_str: Optional[str]):
+        """Recalcular los eventos de una membresía (o de todas si es None)"""
+        if user_id_str is None:
+            self.rebuild()
+            return
+
+        data = self.gold_tracker.data.get(user_id_str)
+        if data is None or not data.get('is_active', False) or not self._owns(data):
+            self._expiry.pop(user_id_str, None)
+            return
+        self._schedule(user_id_str, data)
+
+    def _owns(self, data: Dict) -> bool:
+        return self.owns is None or self.owns(data)
+
+    def _schedule(self, user_id_str: str, data: Dict):
+        expiry = datetime.fromisoformat(data['expiry_date']).timestamp()
+        if self._expiry.get(user_id_str) == expiry:
+            return
+        self._expiry[user_id_str] = expiry
+        if not data.get('notified_expiry', False):
+            self._push(self._warning_time(expiry - self.warning_seconds), user_id_str, WARNING, expiry)
+        self._push(expiry, user_id_str, EXPIRY, expiry)
+
+    def _warning_time(self, due: float) -> float:
+        """Instante del aviso: en modo resumen, la siguiente hora de resumen"""
+        if self.digest_hour is None:
+            return due
+        due_date = datetime.fromtimestamp(due)
+        digest = due_date.replace(hour=self.digest_hour, minute=0, second=0, microsecond=0)
+        if digest < due_date:
+            digest += timedelta(days=1)
+        return digest.timestamp()
+
+    def _push(self, due: float, user_id_str: str, kind: str, expiry: float):
+        heapq.heappush(self._heap, (due, user_id_str, kind, expiry))
+        if self._heap[0][0] == due:
+            # Nuevo evento más próximo: despertar al bucle para que ajuste la espera
+            self._wakeup.set()
+
+    def rebuild(self):
+        """Reconstruir el heap a partir de las membresías activas y encolar los roles pendientes de quitar"""
+        self._heap = []
+        self._expiry = {}
+        for user_id_str, data in self.gold_tracker.get_active_records().items():
+            if self._owns(data):
+                self._schedule(user_id_str, data)
+        for user_id_str, data in self.gold_tracker.get_pending_role_removals().items():
+            if self._owns(data):
+                self._queue_removal(int(user_id_str), data['role_id'])
+        self._wakeup.set()
+
+    def next_due(self) -> Optional[float]:
+        """Instante del próximo evento vigente"""
+        while self._heap:
+            due, user_id_str, _, expiry = self._heap[0]
+            if self._expiry.get(user_id_str) == expiry:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> List[tuple]:
+        """Sacar los eventos vencidos como ``(tipo, user_id)``"""
+        events = []
+        while True:
+            due = self.next_due()
+            if due is None or due > now:
+                return events
+            _, user_id_str, kind, _ = heapq.heappop(self._heap)
+            if kind == EXPIRY:
+                # Tras la expiración no queda nada programado para esta membresía
+                self._expiry.pop(user_id_str, None)
+            events.append((kind, user_id_str))
+
+    def process_due(self, now: Optional[float] = None) -> List[tuple]:
+        """Aplicar los eventos vencidos y devolver las notificaciones ``(tipo, membresía)``.
+
+        En modo resumen los avisos de la pasada se devuelven como una sola
+        notificación ``(WARNING_DIGEST, [membresías])``, marcados con una única
+        escritura.
+        """
+        now = time.time() if now is None else now
+        notifications = []
+        warnings = []
+        for kind, user_id_str in self.pop_due(now):
+            data = self.gold_tracker.get_user_gold_data(int(user_id_str))
+            if data is None or not data.get('is_active', False):
+                continue
+
+            expiry_date = datetime.fromisoformat(data['expiry_date'])
+            membership = dict(data, user_id=int(user_id_str), expiry_date=expiry_date)
+
+            if kind == WARNING:
+                if data.get('notified_expiry', False) or now >= expiry_date.timestamp():
+                    continue
+                membership['days_remaining'] = int((expiry_date.timestamp() - now) // 86400)
+                warnings.append(membership)
+            elif now >= expiry_date.timestamp():
+                self.gold_tracker.deactivate_membership(int(user_id_str))
+                self._queue_removal(int(user_id_str), data['role_id'])
+                notifications.append((EXPIRY, membership))
+
+        if warnings:
+            # Marcar todos los avisos de la pasada con una sola escritura antes de notificar
+            self.gold_tracker.mark_expiry_notified_many(
+                {membership['user_id']: membership['days_remaining'] for membership in warnings})
+            if self.digest_hour is None:
+                notifications.extend((WARNING, membership) for membership in warnings)
+            else:
+                warnings.sort(key=lambda membership: membership['expiry_date'])
+                notifications.append((WARNING_DIGEST, warnings))
+        return notifications
+
+    def _queue_removal(self, user_id: int, role_id: int):
+        if user_id in self._queued_removals:
+            return
+        if self._removals is None:
+            self._removals = asyncio.Queue()
+        self._queued_removals.add(user_id)
+        self._removals.put_nowait((user_id, role_id))
+
+    async def _removal_worker(self):
+        """Quitar roles de la cola con un ritmo limitado para respetar los límites de Discord"""
+        if self._removals is None:
+            self._removals = asyncio.Queue()
+        while True:
+            user_id, role_id = await self._removals.get()
+            try:
+                data = self.gold_tracker.get_user_gold_data(user_id)
+                # Si se renovó o se eliminó mientras esperaba en la cola, el rol ya no se quita
+                if data is not None and not data.get('is_active', False) and data.get('role_removed') is False:
+                    await self.remove_role(user_id, role_id)
+                    # Solo después de quitarlo deja de estar pendiente; si falla se reintenta al reiniciar
+                    self.gold_tracker.mark_role_removed(user_id)
+            except Exception as e:
+                print(f"❌ Error removiendo rol Gold de {user_id}: {e}")
+            finally:
+                self._queued_removals.discard(user_id)
+                self._removals.task_done()
+            await asyncio.sleep(self.removal_interval)
+
+    async def run(self):
+        """Esperar cada evento de expiración y procesarlo"""
+        worker = asyncio.create_task(self._removal_worker())
+        try:
+            while True:
+                try:
+                    # Limpiar antes de calcular la espera para no perder un re-programado
+                    self._wakeup.clear()
+                    due = self.next_due()
+                    timeout = None if due is None else max(0.0, due - time.time())
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+
+                    for kind, membership in self.process_due():
+                        await self.notify(kind, membership)
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Error en el motor de expiración Gold: {e}")
+                    await asyncio.sleep(60)
+        finally:
+            worker.cancel()
@@ -1,37 +1,89 @@
-
-import json
-import os
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Callable, Dict, Optional
+from storage import Repository, create_repository
 
 class GoldTracker:
-    def __init__(self, data_file: str = 'gold_memberships.json'):
+    # Campos del registro que los backends con índices (SQLite/PostgreSQL) guardan como columnas
+    INDEXED_FIELDS = {'is_active': 'BOOLEAN', 'expiry_date': 'TEXT'}
+
+    def __init__(self, data_file: str = 'gold_memberships.json', storage_mode: str = 'json',
+                 journal_compact_threshold: int = 500, write_behind: bool = False,
+                 snapshot_generations: int = 3, sqlite_path: Optional[str] = None,
+                 postgres_dsn: Optional[str] = None, postgres_pool_size: int = 5,
+                 repository: Optional[Repository] = None):
         self.data_file = data_file
-        self.data = self.load_data()
+        self.storage_mode = storage_mode
+        if repository is None:
+            repository = create_repository(
+                storage_mode, data_file, 'gold_memberships', self.INDEXED_FIELDS,
+                write_behind=write_behind,
+                snapshot_generations=snapshot_generations,
+                journal_compact_threshold=journal_compact_threshold,
+                sqlite_path=sqlite_path,
+                postgres_dsn=postgres_dsn,
+                postgres_pool_size=postgres_pool_size
+            )
+        # El repositorio decide cómo y cuándo se persisten las membresías
+        self.repository = repository
+        # Funciones a notificar cuando cambia una membresía (None: cambiaron todas)
+        self._listeners = []
+        self.load_data()
+    
+    @property
+    def data(self) -> Dict:
+        return self.repository.data
+    
+    @data.setter
+    def data(self, value: Dict):
+        self.repository.data = value
+    
+    @property
+    def write_behind(self) -> bool:
+        return self.repository.write_behind
     
     def load_data(self) -> Dict:
-        """Cargar datos de membresías desde el archivo JSON"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error al cargar datos de membresías Gold: {e}")
-            return {}
+        """Cargar datos de membresías desde el almacenamiento configurado"""
+        return self.repository.load()
+    
+    def add_listener(self, callback: Callable[[Optional[str]], None]):
+        """Registrar una función que recibe el ID del usuario modificado (o None si cambiaron todos)"""
+        self._listeners.append(callback)
+    
+    def _notify(self, user_id_str: Optional[str]):
+        for callback in self._listeners:
+            callback(user_id_str)
     
     def save_data(self) -> bool:
-        """Guardar datos de membresías al archivo JSON"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-            return True
-        except IOError as e:
-            print(f"Error al guardar datos de membresías Gold: {e}")
-            return False
+        """Guardar todas las membresías"""
+        success = self.repository.save_all()
+        self._notify(None)
+        return success
+    
+    def save_user(self, user_id: int) -> bool:
+        """Persistir la membresía de un usuario (en modo JSON reescribe el archivo)"""
+        success = self.repository.batch_update([str(user_id)])
+        self._notify(str(user_id))
+        return success
+    
+    def get_active_records(self) -> Dict:
+        """Registros marcados como activos, sin filtrar por fecha (por índice en SQLite/PostgreSQL)"""
+        return self.repository.scan(lambda data: data.get('is_active', False), index={'is_active': True})
+    
+    def is_dirty(self) -> bool:
+        """Indicar si hay cambios pendientes de escribir"""
+        return self.repository.is_dirty()
     
-    def grant_gold(self, user_id: int, username: str, role_id: int, role_name: str, granted_by: int) -> bool:
-        """Otorgar membresía Gold a un usuario"""
+    def prepare_flush(self) -> Optional[Callable[[], bool]]:
+        """Tomar los cambios pendientes; devuelve la escritura a ejecutar fuera del event loop"""
+        return self.repository.prepare_flush()
+    
+    def flush(self) -> bool:
+        """Escribir de inmediato los cambios pendientes"""
+        return self.repository.flush()
+    
+    def grant_gold(self, user_id: int, username: str, role_id: int, role_name: str, granted_by: int,
+                   guild_id: Optional[int] = None) -> bool:
+        """Otorgar membresía Gold a un usuario (``guild_id``: servidor donde se otorgó el rol)"""
         user_id_str = str(user_id)
         current_time = datetime.now()
         expiry_time = current_time + timedelta(days=30)
@@ -45,10 +97,11 @@ class GoldTracker:
             'granted_by': granted_by,
             'is_active': True,
             'notified_expiry': False,
-            'days_remaining_when_notified': None
+            'days_remaining_when_notified': None,
+            'guild_id': guild_id
         }
         
-        return self.save_data()
+        return self.save_user(user_id)
     
     def remove_gold(self, user_id: int) -> bool:
         """Remover membresía Gold de un usuario"""
@@ -59,12 +112,11 @@ class GoldTracker:
         
         # Eliminar completamente el registro del usuario
         del self.data[user_id_str]
-        return self.save_data()
+        return self.save_user(user_id)
     
     def get_user_gold_data(self, user_id: int) -> Optional[Dict]:
         """Obtener datos de membresía Gold de un usuario"""
-        user_id_str = str(user_id)
-        return self.data.get(user_id_str)
+        return self.repository.get(str(user_id))
     
     def is_gold_active(self, user_id: int) -> bool:
         """Verificar si la membresía Gold del usuario está activa"""
@@ -82,10 +134,7 @@ class GoldTracker:
         current_time = datetime.now()
         threshold_time = current_time + timedelta(days=days_ahead)
         
-        for user_id_str, data in self.data.items():
-            if not data.get('is_active', False):
-                continue
-            
+        for user_id_str, data in self.get_active_records().items():
             expiry_date = datetime.fromisoformat(data['expiry_date'])
             
             # Si expira dentro del rango y aún no se ha notificado
@@ -107,10 +156,7 @@ class GoldTracker:
         expired = []
         current_time = datetime.now()
         
-        for user_id_str, data in self.data.items():
-            if not data.get('is_active', False):
-                continue
-            
+        for user_id_str, data in self.get_active_records().items():
             expiry_date = datetime.fromisoformat(data['expiry_date'])
             
             if current_time >= expiry_date:
@@ -134,7 +180,19 @@ class GoldTracker:
         
         self.data[user_id_str]['notified_expiry'] = True
         self.data[user_id_str]['days_remaining_when_notified'] = days_remaining
-        return self.save_data()
+        return self.save_user(user_id)
+    
+    def mark_expiry_notified_many(self, days_remaining_by_user: Dict[int, int]) -> bool:
+        """Marcar varias membresías como notificadas con una sola escritura"""
+        user_ids = [str(user_id) for user_id in days_remaining_by_user if str(user_id) in self.data]
+        for user_id_str in user_ids:
+            self.data[user_id_str]['notified_expiry'] = True
+            self.data[user_id_str]['days_remaining_when_notified'] = days_remaining_by_user[int(user_id_str)]
+        
+        success = self.repository.batch_update(user_ids)
+        for user_id_str in user_ids:
+            self._notify(user_id_str)
+        return success
     
     def deactivate_membership(self, user_id: int) -> bool:
         """Desactivar membresía (marcar como expirada)"""
@@ -144,17 +202,33 @@ class GoldTracker:
             return False
         
         self.data[user_id_str]['is_active'] = False
-        return self.save_data()
+        # Quitar el rol queda pendiente hasta mark_role_removed(), también tras un reinicio
+        self.data[user_id_str]['role_removed'] = False
+        return self.save_user(user_id)
+    
+    def mark_role_removed(self, user_id: int) -> bool:
+        """Registrar que ya se quitó el rol de una membresía expirada"""
+        user_id_str = str(user_id)
+        
+        if user_id_str not in self.data:
+            return False
+        
+        self.data[user_id_str]['role_removed'] = True
+        return self.save_user(user_id)
+    
+    def get_pending_role_removals(self) -> Dict:
+        """Membresías expiradas a las que todavía no se les quitó el rol"""
+        return self.repository.scan(
+            lambda data: not data.get('is_active', False) and data.get('role_removed') is False,
+            index={'is_active': False}
+        )
     
     def get_all_active_memberships(self) -> Dict:
         """Obtener todas las membresías activas"""
         active = {}
         current_time = datetime.now()
         
-        for user_id_str, data in self.data.items():
-            if not data.get('is_active', False):
-                continue
-            
+        for user_id_str, data in self.get_active_records().items():
             expiry_date = datetime.fromisoformat(data['expiry_date'])
             if current_time < expiry_date:
                 active[user_id_str] = data.copy()
@@ -184,22 +258,24 @@ class GoldTracker:
     
     def cleanup_expired_memberships(self) -> int:
         """Limpiar membresías expiradas del sistema (opcional)"""
-        expired_count = 0
         current_time = datetime.now()
-        users_to_remove = []
         
-        for user_id_str, data in self.data.items():
-            expiry_date = datetime.fromisoformat(data['expiry_date'])
-            
-            # Remover membresías expiradas hace más de 7 días
-            if (current_time - expiry_date).days > 7:
-                users_to_remove.append(user_id_str)
-                expired_count += 1
+        # Remover membresías expiradas hace más de 7 días
+        cutoff = (current_time - timedelta(days=8)).isoformat()
+        # Las que aún tienen el rol pendiente de quitar se conservan hasta quitarlo
+        expired = self.repository.scan(
+            lambda data: (current_time - datetime.fromisoformat(data['expiry_date'])).days > 7
+            and data.get('role_removed') is not False,
+            index={'expiry_date': ('<=', cutoff)}
+        )
+        users_to_remove = list(expired)
         
         for user_id_str in users_to_remove:
-            del self.data[user_id_str]
+            self.data.pop(user_id_str, None)
         
         if users_to_remove:
-            self.save_data()
+            self.repository.batch_update(users_to_remove)
+            for user_id_str in users_to_remove:
+                self._notify(user_id_str)
         
-        return expired_count
+        return len(users_to_remove)
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+def partition_storage_names(guild_id: int, primary_guild_id: Optional[int],
+                            data_file: str = 'user_times.json', table: str = 'user_times') -> Tuple[str, str]:
+    """Archivo y tabla donde se guardan los tiempos de un servidor.
+
+    El servidor principal conserva los nombres de siempre (``user_times.json``,
+    tabla ``user_times``) para no migrar los datos existentes; los demás usan
+    ``user_times.<id>.json`` y la tabla ``user_times_<id>``.
+    """
+    if guild_id == primary_guild_id:
+        return data_file, table
+    base, extension = data_file.rsplit('.', 1) if '.' in data_file else (data_file, 'json')
+    return f'{base}.{guild_id}.{extension}', f'{table}_{guild_id}'
+
+
+class GuildPartition:
+    """Estado de seguimiento de un servidor: su tracker (y su fachada async con
+    locks por usuario), su programador de milestones y la entrega de sus
+    notificaciones, más los tasks que los ejecutan"""
+
+    def __init__(self, guild_id: int, time_tracker, milestone_scheduler, notification_delivery, config=None,
+                 async_tracker=None):
+        self.guild_id = guild_id
+        self.time_tracker = time_tracker
+        self.async_tracker = async_tracker
+        self.milestone_scheduler = milestone_scheduler
+        self.notification_delivery = notification_delivery
+        self.config = config
+        self.tasks: List[asyncio.Task] = []
+
+    def stop(self):
+        """Cancelar los tasks del servidor"""
+        for task in self.tasks:
+            task.cancel()
+        self.tasks.clear()
+
+
+class GuildPartitions:
+    """Registro de particiones por servidor, cargadas la primera vez que se usan.
+
+    ``factory(guild_id)`` crea la partición (abre su almacenamiento y construye
+    sus índices); hasta entonces un servidor no ocupa memoria ni lee disco.
+    ``on_load`` se llama con cada partición nueva, por ejemplo para arrancar
+    sus tasks.
+    """
+
+    def __init__(self, factory: Callable[[int], GuildPartition],
+                 on_load: Optional[Callable[[GuildPartition], None]] = None):
+        self.factory = factory
+        self.on_load = on_load
+        self._partitions: Dict[int, GuildPartition] = {}
+
+    def get(self, guild_id: int) -> GuildPartition:
+        """Partición del servidor, cargándola si es la primera vez"""
+        partition = self._partitions.get(guild_id)
+        if partition is None:
+            partition = self._partitions[guild_id] = self.factory(guild_id)
+            print(f"📂 Datos del servidor {guild_id} cargados")
+            if self.on_load is not None:
+                self.on_load(partition)
+        return partition
+
+    def loaded(self) -> List[GuildPartition]:
+        """Particiones cargadas (copia, para poder cargar otras mientras se recorre)"""
+        return list(self._partitions.values())
+
+    def unload(self, guild_id: int) -> Optional[GuildPartition]:
+        """Quitar la partición del registro y detener sus tasks; quien llama la persiste"""
+        partition = self._partitions.pop(guild_id, None)
+        if partition is not None:
+            partition.stop()
+        return partition
+
+    def __iter__(self) -> Iterator[GuildPartition]:
+        return iter(self.loaded())
+
+    def __len__(self) -> int:
+        return len(self._partitions)
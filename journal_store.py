@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+from snapshot_io import load_snapshot, write_snapshot
+
+
+class JournalStore:
+    """Almacenamiento en modo diario: snapshot JSON + registro de eventos de solo-anexado.
+
+    Cada mutación se escribe como una línea compacta en ``<archivo>.log``. Al
+    arrancar se reconstruye el estado cargando el snapshot y reproduciendo el
+    registro. La compactación vuelca el estado completo a un snapshot nuevo y
+    descarta el registro ya incorporado.
+    """
+
+    def __init__(self, snapshot_file: str, compact_threshold: int = 500, snapshot_generations: int = 3):
+        self.snapshot_file = snapshot_file
+        self.snapshot_generations = snapshot_generations
+        self.log_file = f"{snapshot_file}.log"
+        # Registro rotado durante una compactación en curso (o interrumpida)
+        self.rotated_log_file = f"{self.log_file}.old"
+        self.compact_threshold = compact_threshold
+        self.records_since_compact = 0
+        self._lock = threading.Lock()
+        self._log_handle = None
+
+    def load(self) -> Dict:
+        """Reconstruir el estado a partir del snapshot y el registro de eventos"""
+        data = load_snapshot(self.snapshot_file, self.snapshot_generations)
+
+        # Primero el registro rotado (si una compactación no terminó) y luego el actual
+        replayed = self._replay(self.rotated_log_file, data)
+        replayed += self._replay(self.log_file, data)
+        self.records_since_compact = replayed
+        return data
+
+    def _replay(self, path: str, data: Dict) -> int:
+        """Aplicar los eventos de un archivo de registro sobre los datos en memoria"""
+        if not os.path.exists(path):
+            return 0
+
+        applied = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # Una línea truncada solo puede ser la última escrita antes de un corte
+                    print(f"⚠️ Evento ilegible en {path}:{line_number}, se ignora")
+                    continue
+                self._apply(event, data)
+                applied += 1
+        return applied
+
+    @staticmethod
+    def _apply(event: Dict, data: Dict):
+        """Aplicar un evento individual"""
+        op = event.get('op')
+        if op == 'put':
+            data[event['id']] = event['data']
+        elif op == 'del':
+            data.pop(event['id'], None)
+        elif op == 'clear':
+            data.clear()
+
+    @staticmethod
+    def encode_event(event: Dict) -> str:
+        """Serializar un evento como línea compacta"""
+        return json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+
+    def append_lines(self, lines: List[str]) -> bool:
+        """Anexar eventos ya serializados al registro (seguro desde un hilo de trabajo)"""
+        if not lines:
+            return True
+        try:
+            with self._lock:
+                if self._log_handle is None:
+                    self._log_handle = open(self.log_file, 'a', encoding='utf-8')
+                    if self._ends_with_partial_line():
+                        # No pegar el evento nuevo a una línea truncada por un corte
+                        self._log_handle.write('\n')
+                self._log_handle.write(''.join(line + '\n' for line in lines))
+                self._log_handle.flush()
+                self.records_since_compact += len(lines)
+            return True
+        except IOError as e:
+            print(f"Error al escribir en el diario: {e}")
+            return False
+
+    def _ends_with_partial_line(self) -> bool:
+        """Verificar si el registro termina sin salto de línea"""
+        try:
+            with open(self.log_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b'\n'
+        except IOError:
+            return False
+
+    def needs_compaction(self) -> bool:
+        """Indicar si el registro ha crecido lo suficiente para compactarlo"""
+        return self.records_since_compact >= self.compact_threshold
+
+    def prepare_compaction(self, data: Dict) -> Optional[str]:
+        """Serializar el estado actual y rotar el registro.
+
+        Debe llamarse desde el mismo hilo que modifica ``data``. Devuelve el
+        contenido del snapshot para escribirlo después con ``write_compaction``,
+        que sí puede ejecutarse en un hilo de trabajo.
+        """
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        try:
+            with self._lock:
+                if self._log_handle is not None:
+                    self._log_handle.close()
+                    self._log_handle = None
+                if os.path.exists(self.log_file):
+                    if os.path.exists(self.rotated_log_file):
+                        # Una compactación anterior no terminó: conservar ambos registros en orden
+                        with open(self.rotated_log_file, 'a', encoding='utf-8') as dst, \
+                                open(self.log_file, 'r', encoding='utf-8') as src:
+                            dst.write(src.read())
+                        os.remove(self.log_file)
+                    else:
+                        os.replace(self.log_file, self.rotated_log_file)
+                self.records_since_compact = 0
+            return payload
+        except IOError as e:
+            print(f"Error al rotar el diario: {e}")
+            return None
+
+    def write_compaction(self, payload: str) -> bool:
+        """Escribir el snapshot preparado y descartar el registro rotado"""
+        try:
+            write_snapshot(self.snapshot_file, payload, self.snapshot_generations)
+            if os.path.exists(self.rotated_log_file):
+                os.remove(self.rotated_log_file)
+            return True
+        except IOError as e:
+            print(f"Error al compactar el diario: {e}")
+            return False
+
+    def close(self):
+        """Cerrar el archivo de registro abierto"""
+        with self._lock:
+            if self._log_handle is not None:
+                self._log_handle.close()
+                self._log_handle = None
@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+class MemberCache:
+    """Caché LRU acotada de miembros pedidos bajo demanda.
+
+    Sirve para arrancar sin descargar todos los miembros de cada servidor
+    (``chunk_guilds_at_startup=False`` y ``MemberCacheFlags.none()``): cuando
+    hace falta un miembro se busca en la caché de discord.py, después en esta
+    LRU (con caducidad ``ttl`` para no arrastrar roles desactualizados) y los
+    que faltan se piden con ``guild.query_members`` en lotes de
+    ``batch_size``. Los que no están en el servidor se recuerdan como None.
+
+    Si el servidor ya está completamente en caché (``guild.chunked``) se confía
+    en ella y nunca se llama a la API.
+    """
+
+    def __init__(self, ttl: float = 600, max_size: int = 5000, batch_size: int = 100):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self._cache: 'OrderedDict[Tuple[int, int], tuple]' = OrderedDict()
+
+    def _from_cache(self, guild, member_id: int):
+        """Buscar un miembro sin llamar a la API; devuelve ``(encontrado, miembro)``"""
+        member = guild.get_member(member_id)
+        if member is not None or getattr(guild, 'chunked', False):
+            return True, member
+
+        key = (guild.id, member_id)
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        expires, member = entry
+        if expires <= time.monotonic():
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, member
+
+    def _remember(self, guild_id: int, member_id: int, member):
+        key = (guild_id, member_id)
+        self._cache[key] = (time.monotonic() + self.ttl, member)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def fetch(self, guild, member_id: int):
+        """Obtener un miembro (None si no está en el servidor)"""
+        return (await self.fetch_many(guild, [member_id]))[int(member_id)]
+
+    async def fetch_many(self, guild, member_ids: Iterable[int]) -> Dict[int, Optional[object]]:
+        """Obtener varios miembros pidiendo los que faltan en lotes.
+
+        Un error de la API se propaga en lugar de tratar a los miembros como
+        ausentes, para que quien llama no los confunda con miembros que salieron.
+        """
+        resolved = {}
+        missing = []
+        for member_id in member_ids:
+            member_id = int(member_id)
+            if member_id in resolved:
+                continue
+            found, member = self._from_cache(guild, member_id)
+            resolved[member_id] = member
+            if not found:
+                missing.append(member_id)
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            members = await guild.query_members(user_ids=batch, limit=len(batch), presences=False, cache=False)
+            fetched = {member.id: member for member in members}
+            for member_id in batch:
+                member = fetched.get(member_id)
+                self._remember(guild.id, member_id, member)
+                resolved[member_id] = member
+        return resolved
+
+    def remove(self, guild_id: int, member_id: int):
+        """Olvidar un miembro (por ejemplo al salir del servidor)"""
+        self._cache.pop((guild_id, member_id), None)
+
+    def forget_guild(self, guild_id: int):
+        """Olvidar todos los miembros de un servidor"""
+        for key in [key for key in self._cache if key[0] == guild_id]:
+            del self._cache[key]
+
+    def __len__(self) -> int:
+        return len(self._cache)
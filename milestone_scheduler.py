@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+class MilestoneScheduler:
+    """Programa la verificación de milestones por fecha límite en lugar de sondear.
+
+    Mantiene un min-heap de ``(vencimiento, user_id)`` con el instante en que la
+    sesión de cada usuario activo alcanza ``session_limit`` segundos. Se
+    re-programa cuando el tracker notifica un cambio (inicio, pausa, reanudación,
+    minutos agregados...) y ``run()`` duerme hasta el vencimiento más próximo.
+
+    Las entradas obsoletas del heap no se eliminan al re-programar: se descartan
+    al salir si no coinciden con el vencimiento vigente en ``_due``.
+    """
+
+    def __init__(self, time_tracker, session_limit: float = 3600, retry_interval: float = 5):
+        self.time_tracker = time_tracker
+        self.session_limit = session_limit
+        # Espera antes de volver a verificar a un usuario que sigue activo tras su verificación
+        self.retry_interval = retry_interval
+        self._heap = []
+        self._due: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        time_tracker.add_listener(self.rearm)
+        self.rebuild()
+
+    def _due_time(self, record) -> Optional[float]:
+        """Instante en que vence la sesión actual, o None si no está corriendo"""
+        if record is None or not record.is_active or record.is_paused or record.last_start is None:
+            return None
+        return record.last_start + self.session_limit
+
+    def _schedule(self, user_id_str: str, due: float):
+        self._due[user_id_str] = due
+        heapq.heappush(self._heap, (due, user_id_str))
+        if self._heap[0] == (due, user_id_str):
+            # Nuevo vencimiento más próximo: despertar al bucle para que ajuste la espera
+            self._wakeup.set()
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._compact()
+
+    def _compact(self):
+        """Descartar las entradas obsoletas del heap"""
+        self._heap = [(due, user_id_str) for user_id_str, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def rearm(self, user_id_str: Optional[str], not_before: float = 0):
+        """Recalcular el vencimiento de un usuario (o de todos si es None)"""
+        if user_id_str is None:
+            self.rebuild()
+            return
+
+        due = self._due_time(self.time_tracker.data.get(user_id_str))
+        if due is None:
+            self._due.pop(user_id_str, None)
+        else:
+            self._schedule(user_id_str, max(due, not_before))
+
+    def rebuild(self):
+        """Reconstruir el heap a partir de los usuarios activos"""
+        self._due = {}
+        for user_id_str, record in self.time_tracker.iter_active():
+            due = self._due_time(record)
+            if due is not None:
+                self._due[user_id_str] = due
+        self._compact()
+        self._wakeup.set()
+
+    def next_deadline(self) -> Optional[float]:
+        """Vencimiento vigente más próximo"""
+        while self._heap:
+            due, user_id_str = self._heap[0]
+            if self._due.get(user_id_str) == due:
+                return due
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: float) -> List[str]:
+        """Sacar los usuarios cuyo vencimiento ya llegó"""
+        ready = []
+        while True:
+            due = self.next_deadline()
+            if due is None or due > now:
+                return ready
+            _, user_id_str = heapq.heappop(self._heap)
+            del self._due[user_id_str]
+            ready.append(user_id_str)
+
+    async def run(self, callback: Callable[[int], Awaitable[None]]):
+        """Esperar cada vencimiento y ejecutar ``callback(user_id)``"""
+        while True:
+            try:
+                # Limpiar antes de calcular la espera para no perder un re-programado
+                self._wakeup.clear()
+                deadline = self.next_deadline()
+                timeout = None if deadline is None else max(0.0, deadline - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                for user_id_str in self.pop_due(time.time()):
+                    try:
+                        await callback(int(user_id_str))
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        # Un error (por ejemplo de la API de Discord) no debe dejar sin programar a nadie
+                        print(f"Error verificando el milestone de {user_id_str}: {e}")
+                    finally:
+                        # Si el usuario sigue corriendo (ya notificado o tras un error), reintentar más tarde
+                        self.rearm(user_id_str, not_before=time.time() + self.retry_interval)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error en el programador de milestones: {e}")
+                await asyncio.sleep(self.retry_interval)
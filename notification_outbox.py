@@ -0,0 +1,202 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Límite de caracteres de un mensaje de Discord
+MESSAGE_LIMIT = 2000
+
+def _group_messages(messages: List[str], limit: int = MESSAGE_LIMIT) -> List[List[int]]:
+    """Agrupar índices de mensajes consecutivos cuyo texto unido no supera ``limit``"""
+    groups = []
+    length = 0
+    for index, message in enumerate(messages):
+        if groups and length + 2 + len(message) <= limit:
+            groups[-1].append(index)
+            length += 2 + len(message)
+        else:
+            groups.append([index])
+            length = len(message)
+    return groups
+
+class NotificationOutbox:
+    """Cola asíncrona de notificaciones, una por canal.
+
+    ``enqueue`` no espera a Discord: deja el mensaje en la cola del canal y
+    vuelve de inmediato, así los comandos y el programador de milestones nunca
+    se bloquean enviando. Un worker por canal espera ``window`` segundos tras el
+    primer mensaje, junta todos los que llegaron en ese tiempo en mensajes de
+    varias líneas (hasta ``MESSAGE_LIMIT`` caracteres) y los envía dejando al
+    menos ``min_interval`` segundos entre envíos al mismo canal para no agotar
+    su bucket de rate limit.
+    """
+
+    def __init__(self, get_channel: Callable[[int], object], window: float = 1.0,
+                 min_interval: float = 1.0):
+        self.get_channel = get_channel
+        self.window = window
+        self.min_interval = min_interval
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._next_send: Dict[int, float] = {}
+
+    def enqueue(self, channel_id: int, message: str):
+        """Encolar un mensaje para el canal (debe llamarse desde el event loop)"""
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = asyncio.Queue()
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.get_running_loop().create_task(self._worker(channel_id))
+        queue.put_nowait(message)
+
+    @staticmethod
+    def coalesce(messages: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+        """Unir mensajes en bloques que no superen ``limit`` caracteres"""
+        return ["\n\n".join(messages[index] for index in group) for group in _group_messages(messages, limit)]
+
+    async def _send(self, channel_id: int, content: str):
+        wait = self._next_send.get(channel_id, 0) - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._next_send[channel_id] = time.monotonic() + self.min_interval
+
+        channel = self.get_channel(channel_id)
+        if not channel:
+            print(f"❌ No se pudo encontrar el canal con ID: {channel_id}")
+            return
+        try:
+            await channel.send(content)
+        except Exception as e:
+            print(f"❌ Error enviando notificaciones al canal {channel_id}: {e}")
+
+    async def _worker(self, channel_id: int):
+        queue = self._queues[channel_id]
+        while True:
+            messages = [await queue.get()]
+            try:
+                # Dar tiempo a que lleguen más mensajes para enviarlos juntos
+                await asyncio.sleep(self.window)
+                while not queue.empty():
+                    messages.append(queue.get_nowait())
+                for chunk in self.coalesce(messages):
+                    await self._send(channel_id, chunk)
+            finally:
+                for _ in messages:
+                    queue.task_done()
+
+    async def drain(self):
+        """Esperar a que se envíen todos los mensajes encolados"""
+        for queue in list(self._queues.values()):
+            await queue.join()
+
+    def close(self):
+        """Detener los workers (los mensajes pendientes se descartan)"""
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+
+
+class PersistentOutbox:
+    """Entrega las notificaciones guardadas en los registros del TimeTracker.
+
+    Las entradas se escriben con ``TimeTracker.queue_notification`` en la misma
+    escritura que el cambio de estado que las produjo, así que un fallo de
+    Discord o un reinicio no las pierde: ``run()`` entrega al arrancar todo lo
+    pendiente y reintenta los fallos con espera exponencial (``base_delay``
+    duplicado por intento, hasta ``max_delay``). Cada entrada se borra después
+    de enviarse, o se descarta tras ``max_attempts`` intentos fallidos o si su
+    canal ya no existe, para que no se reintente para siempre.
+
+    ``wait_ready`` (por ejemplo ``bot.wait_until_ready``) se espera antes de la
+    primera entrega: hasta entonces la caché de canales está vacía.
+    """
+
+    def __init__(self, time_tracker, get_channel: Callable[[int], object], base_delay: float = 5,
+                 max_delay: float = 600, min_interval: float = 1.0, max_attempts: int = 10,
+                 wait_ready: Optional[Callable[[], Awaitable[None]]] = None):
+        self.time_tracker = time_tracker
+        self.get_channel = get_channel
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.wait_ready = wait_ready
+        self._wakeup = asyncio.Event()
+        time_tracker.add_listener(self._on_change)
+
+    def _on_change(self, user_id_str: Optional[str]):
+        record = self.time_tracker.data.get(user_id_str) if user_id_str is not None else None
+        if user_id_str is None or (record is not None and record.get('outbox')):
+            self._wakeup.set()
+
+    def next_attempt(self) -> Optional[float]:
+        """Instante del próximo intento de entrega pendiente"""
+        attempts = [entry['next_attempt'] for _, entry in self.time_tracker.iter_pending_notifications()]
+        return min(attempts) if attempts else None
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.max_delay, self.base_delay * 2 ** attempts)
+
+    async def deliver_due(self, now: Optional[float] = None) -> int:
+        """Enviar las notificaciones vencidas agrupadas por canal; devuelve cuántas se entregaron"""
+        now = time.time() if now is None else now
+        by_channel: Dict[int, List[tuple]] = {}
+        for user_id_str, entry in self.time_tracker.iter_pending_notifications():
+            if entry['next_attempt'] <= now:
+                by_channel.setdefault(entry['channel_id'], []).append((user_id_str, entry))
+
+        delivered, failed, dropped = [], [], []
+        for channel_id, items in by_channel.items():
+            channel = self.get_channel(channel_id) if channel_id is not None else None
+            if not channel:
+                print(f"⚠️ Canal {channel_id} no encontrado: se descartan {len(items)} notificación(es)")
+                dropped.extend(items)
+                continue
+            items.sort(key=lambda item: item[1]['next_attempt'])
+            messages = [entry['message'] for _, entry in items]
+            for position, group in enumerate(_group_messages(messages)):
+                if position and self.min_interval:
+                    # Espaciar los envíos al mismo canal para respetar su rate limit
+                    await asyncio.sleep(self.min_interval)
+                batch = [items[index] for index in group]
+                try:
+                    await channel.send("\n\n".join(messages[index] for index in group))
+                    delivered.extend(batch)
+                except Exception as e:
+                    print(f"❌ Error entregando notificaciones al canal {channel_id}: {e}")
+                    for item in batch:
+                        (dropped if item[1]['attempts'] + 1 >= self.max_attempts else failed).append(item)
+
+        if dropped:
+            print(f"⚠️ {len(dropped)} notificación(es) descartada(s) tras {self.max_attempts} intentos o sin canal")
+
+        # Registrar el resultado de toda la pasada en una sola escritura
+        with self.time_tracker.batch():
+            for user_id_str, entry in delivered + dropped:
+                self.time_tracker.complete_notification(user_id_str, entry['id'])
+            for user_id_str, entry in failed:
+                self.time_tracker.retry_notification(
+                    user_id_str, entry['id'], time.time() + self._backoff(entry['attempts']))
+        return len(delivered)
+
+    async def run(self):
+        """Entregar lo pendiente al arrancar y después cada notificación nueva o reintento"""
+        if self.wait_ready is not None:
+            await self.wait_ready()
+        while True:
+            try:
+                # Limpiar antes de calcular la espera para no perder una notificación nueva
+                self._wakeup.clear()
+                await self.deliver_due()
+                due = self.next_attempt()
+                timeout = None if due is None else max(0.0, due - time.time())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error en la entrega de notificaciones: {e}")
+                await asyncio.sleep(self.base_delay)
@@ -0,0 +1,77 @@
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+import discord
+
+class PaginatedView(discord.ui.View):
+    """Vista con botones para recorrer un listado por páginas.
+
+    Solo se renderiza la página pedida (``render_page(start, end)`` devuelve el
+    embed de los elementos ``start:end``), y cada página renderizada se guarda
+    ``cache_ttl`` segundos para que ir y volver no repita el trabajo. Así el
+    primer mensaje sale rápido y ningún embed supera los límites de Discord.
+    """
+
+    def __init__(self, item_count: int, render_page: Callable[[int, int], Awaitable[discord.Embed]],
+                 page_size: int = 20, cache_ttl: float = 60, author_id: Optional[int] = None,
+                 timeout: float = 180):
+        super().__init__(timeout=timeout)
+        self.item_count = item_count
+        self.render_page = render_page
+        self.page_size = page_size
+        self.cache_ttl = cache_ttl
+        self.author_id = author_id
+        self.page = 0
+        self._pages: Dict[int, tuple] = {}
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.item_count // self.page_size))
+
+    async def get_page(self, page: int) -> discord.Embed:
+        """Embed de una página, desde la caché si sigue vigente"""
+        cached = self._pages.get(page)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+
+        start = page * self.page_size
+        embed = await self.render_page(start, min(start + self.page_size, self.item_count))
+        embed.set_footer(text=f"Página {page + 1}/{self.page_count} • {self.item_count} registros")
+        self._pages[page] = (time.monotonic() + self.cache_ttl, embed)
+        return embed
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def send(self, interaction: discord.Interaction):
+        """Enviar la primera página como respuesta (ya diferida) a la interacción"""
+        embed = await self.get_page(self.page)
+        self._update_buttons()
+        if self.page_count == 1:
+            await interaction.followup.send(embed=embed)
+            self.stop()
+        else:
+            await interaction.followup.send(embed=embed, view=self)
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        # Responder antes de renderizar: una página que pide miembros puede pasar de los 3 segundos
+        await interaction.response.defer()
+        self.page = max(0, min(page, self.page_count - 1))
+        embed = await self.get_page(self.page)
+        self._update_buttons()
+        await interaction.edit_original_response(embed=embed, view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.author_id is not None and interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Solo quien ejecutó el comando puede cambiar de página", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀️ Anterior", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Siguiente ▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
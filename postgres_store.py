@@ -0,0 +1,179 @@
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import psycopg2
+    from psycopg2.extras import Json
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError:
+    psycopg2 = None
+
+class PostgresStore:
+    """Almacenamiento compartido en PostgreSQL con un pool de conexiones acotado.
+
+    Cada registro ocupa una fila (registro completo en JSONB más columnas
+    indexadas). Varias instancias del bot pueden usar la misma base de datos:
+    las mutaciones que leen y escriben el mismo registro se hacen dentro de
+    ``locked()``, que bloquea la fila con ``SELECT ... FOR UPDATE``.
+    """
+
+    def __init__(self, dsn: str, table: str, columns: Dict[str, str],
+                 min_connections: int = 1, max_connections: int = 5):
+        if psycopg2 is None:
+            raise RuntimeError("psycopg2 no está instalado; instala psycopg2-binary para usar PostgreSQL")
+
+        self.table = table
+        self.columns = columns
+        self._pool = ThreadedConnectionPool(min_connections, max_connections, dsn)
+        # El pool lanza error si se agota; el semáforo hace esperar en su lugar
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._prepared = weakref.WeakSet()
+        self._create_schema()
+
+    @contextmanager
+    def _connection(self):
+        """Tomar una conexión del pool (con las sentencias preparadas) y devolverla al terminar"""
+        with self._slots:
+            conn = self._pool.getconn()
+            try:
+                if conn not in self._prepared:
+                    self._prepare(conn)
+                yield conn
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._pool.putconn(conn)
+
+    def _create_schema(self):
+        column_defs = ''.join(f', {name} {sql_type}' for name, sql_type in self.columns.items())
+        conn = self._pool.getconn()
+        try:
+            with conn, conn.cursor() as cur:
+                cur.execute(f'CREATE TABLE IF NOT EXISTS {self.table} '
+                            f'(user_id TEXT PRIMARY KEY{column_defs}, record JSONB NOT NULL)')
+                for name in self.columns:
+                    cur.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_{name} ON {self.table} ({name})')
+        finally:
+            self._pool.putconn(conn)
+
+    def _prepare(self, conn):
+        """Preparar las sentencias de las mutaciones frecuentes en esta conexión"""
+        names = list(self.columns)
+        types = ', '.join(['text'] + [self.columns[name].lower() for name in names] + ['jsonb'])
+        placeholders = ', '.join(f'${i}' for i in range(1, len(names) + 3))
+        updates = ', '.join(f'{name} = EXCLUDED.{name}' for name in names + ['record'])
+        with conn.cursor() as cur:
+            cur.execute(f'PREPARE {self.table}_upsert ({types}) AS '
+                        f'INSERT INTO {self.table} (user_id, {", ".join(names)}, record) VALUES ({placeholders}) '
+                        f'ON CONFLICT (user_id) DO UPDATE SET {updates}')
+            cur.execute(f'PREPARE {self.table}_delete (text) AS DELETE FROM {self.table} WHERE user_id = $1')
+            cur.execute(f'PREPARE {self.table}_get (text) AS SELECT record FROM {self.table} WHERE user_id = $1')
+            cur.execute(f'PREPARE {self.table}_lock (text) AS '
+                        f'SELECT record FROM {self.table} WHERE user_id = $1 FOR UPDATE')
+        conn.commit()
+        self._prepared.add(conn)
+
+    def _upsert(self, cur, key: str, record: Dict):
+        values = [key] + [record.get(name) for name in self.columns] + [Json(record)]
+        placeholders = ', '.join(['%s'] * len(values))
+        cur.execute(f'EXECUTE {self.table}_upsert ({placeholders})', values)
+
+    def load(self) -> Dict:
+        """Cargar todos los registros"""
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(f'SELECT user_id, record FROM {self.table}')
+            rows = cur.fetchall()
+            conn.commit()
+        return {user_id: record for user_id, record in rows}
+
+    def is_empty(self) -> bool:
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(f'SELECT 1 FROM {self.table} LIMIT 1')
+            empty = cur.fetchone() is None
+            conn.commit()
+        return empty
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Leer la versión más reciente de un registro"""
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(f'EXECUTE {self.table}_get (%s)', (key,))
+            row = cur.fetchone()
+            conn.commit()
+        return row[0] if row else None
+
+    def write_rows(self, records: Dict, deleted_keys: List[str]) -> bool:
+        """Guardar y eliminar varios registros en una única transacción"""
+        try:
+            with self._connection() as conn:
+                with conn, conn.cursor() as cur:
+                    for key, record in records.items():
+                        self._upsert(cur, key, record)
+                    for key in deleted_keys:
+                        cur.execute(f'EXECUTE {self.table}_delete (%s)', (key,))
+            return True
+        except psycopg2.Error as e:
+            print(f"Error al guardar en PostgreSQL: {e}")
+            return False
+
+    def replace_all(self, data: Dict) -> bool:
+        """Reemplazar todo el contenido de la tabla en una transacción"""
+        try:
+            with self._connection() as conn:
+                with conn, conn.cursor() as cur:
+                    cur.execute(f'DELETE FROM {self.table}')
+                    for key, record in data.items():
+                        self._upsert(cur, key, record)
+            return True
+        except psycopg2.Error as e:
+            print(f"Error al guardar en PostgreSQL: {e}")
+            return False
+
+    @contextmanager
+    def locked(self, key: str):
+        """Bloquear un registro durante una mutación de lectura-modificación-escritura.
+
+        Devuelve un objeto con ``record`` (la versión actual, o None si no existe)
+        y ``save(record)`` / ``delete()`` que escriben en la misma transacción.
+        El commit se hace al salir del bloque; si hay una excepción, rollback.
+        """
+        with self._connection() as conn:
+            with conn, conn.cursor() as cur:
+                cur.execute(f'EXECUTE {self.table}_lock (%s)', (key,))
+                row = cur.fetchone()
+                if row is None:
+                    # Sin fila que bloquear: serializar la creación con un lock consultivo
+                    cur.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', (f'{self.table}:{key}',))
+                    cur.execute(f'EXECUTE {self.table}_lock (%s)', (key,))
+                    row = cur.fetchone()
+                yield _LockedRecord(self, cur, key, row[0] if row else None)
+
+    def select(self, where: str, params: tuple = ()) -> Dict:
+        """Consultar registros filtrando por las columnas indexadas"""
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(f'SELECT user_id, record FROM {self.table} WHERE {where}', params)
+            rows = cur.fetchall()
+            conn.commit()
+        return {user_id: record for user_id, record in rows}
+
+    def close(self):
+        self._pool.closeall()
+
+class _LockedRecord:
+    """Registro bloqueado dentro de una transacción de PostgresStore.locked()"""
+
+    def __init__(self, store: PostgresStore, cur, key: str, record: Optional[Dict]):
+        self._store = store
+        self._cur = cur
+        self.key = key
+        self.record = record
+
+    def save(self, record: Dict):
+        self._store._upsert(self._cur, self.key, record)
+        self.record = record
+
+    def delete(self):
+        self._cur.execute(f'EXECUTE {self._store.table}_delete (%s)', (self.key,))
+        self.record = None
@@ -0,0 +1,72 @@
+from typing import Dict, Iterable, Set, Tuple
+
+class RoleIndex:
+    """Índice de rol → IDs de miembros, construido una vez desde la caché del servidor.
+
+    Se mantiene al día con los eventos de miembros (``on_member_update``,
+    ``on_member_join``, ``on_member_remove``) para que comprobar si un miembro
+    tiene un rol sea una búsqueda en un set en lugar de recorrer ``member.roles``.
+    Hasta que se construye el índice de un servidor, ``is_built`` devuelve False
+    y quien lo use debe recurrir a ``member.roles``.
+    """
+
+    def __init__(self):
+        self._members: Dict[int, Set[int]] = {}
+        # Roles actuales de cada (servidor, miembro), para aplicar cambios sin el estado anterior
+        self._member_roles: Dict[Tuple[int, int], Set[int]] = {}
+        self._guilds: Set[int] = set()
+
+    def build(self, guild):
+        """Indexar todos los miembros en caché de un servidor"""
+        self.forget_guild(guild.id)
+        for member in guild.members:
+            self.set_member_roles(guild.id, member.id, (role.id for role in member.roles))
+        self._guilds.add(guild.id)
+
+    def is_built(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    def set_member_roles(self, guild_id: int, member_id: int, role_ids: Iterable[int]):
+        """Reemplazar los roles indexados de un miembro"""
+        key = (guild_id, member_id)
+        new_roles = set(role_ids)
+        old_roles = self._member_roles.get(key, set())
+        for role_id in old_roles - new_roles:
+            members = self._members.get(role_id)
+            if members is not None:
+                members.discard(member_id)
+                if not members:
+                    del self._members[role_id]
+        for role_id in new_roles - old_roles:
+            self._members.setdefault(role_id, set()).add(member_id)
+        if new_roles:
+            self._member_roles[key] = new_roles
+        else:
+            self._member_roles.pop(key, None)
+
+    def update_member(self, member):
+        """Registrar los roles actuales de un miembro (alta o cambio de roles)"""
+        self.set_member_roles(member.guild.id, member.id, (role.id for role in member.roles))
+
+    def remove_member(self, guild_id: int, member_id: int):
+        """Olvidar a un miembro que salió del servidor"""
+        self.set_member_roles(guild_id, member_id, ())
+
+    def remove_role(self, role_id: int):
+        """Olvidar un rol eliminado"""
+        self._members.pop(role_id, None)
+        for roles in self._member_roles.values():
+            roles.discard(role_id)
+
+    def forget_guild(self, guild_id: int):
+        """Quitar del índice todos los miembros de un servidor"""
+        for (indexed_guild, member_id) in [key for key in self._member_roles if key[0] == guild_id]:
+            self.remove_member(indexed_guild, member_id)
+        self._guilds.discard(guild_id)
+
+    def has_role(self, member_id: int, role_id: int) -> bool:
+        return member_id in self._members.get(role_id, ())
+
+    def members_with_role(self, role_id: int) -> Set[int]:
+        """IDs de los miembros que tienen el rol"""
+        return set(self._members.get(role_id, ()))
@@ -0,0 +1,81 @@
+import os
+from typing import Dict, List, Mapping, Optional
+
+def shard_for_guild(guild_id: int, shard_count: int) -> int:
+    """Shard de Discord que recibe los eventos de un servidor"""
+    return (guild_id >> 22) % shard_count
+
+def parse_shard_ids(value) -> Optional[List[int]]:
+    """Leer una lista de shards de config.json (lista) o de una variable de entorno ("0,1,2")"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    return sorted(int(shard_id) for shard_id in value)
+
+
+class ShardOwnership:
+    """Qué shards (y por tanto qué servidores) atiende este proceso.
+
+    Con ``shard_ids`` None el proceso atiende todos los shards (un solo
+    proceso, con o sin AutoShardedBot). Si se reparten los shards entre varios
+    procesos, cada uno arranca con su lista en ``SHARD_IDS`` y el total en
+    ``SHARD_COUNT``, y solo programa milestones y expiraciones Gold de sus
+    servidores. Para eso todos los procesos deben leer y escribir el mismo
+    almacenamiento (PostgreSQL) y tener el mismo servidor principal en
+    ``primary_guild_id`` (ver ``split_config_error``).
+    """
+
+    def __init__(self, shard_count: Optional[int] = None, shard_ids: Optional[List[int]] = None):
+        if shard_ids is not None and shard_count is None:
+            print("⚠️ shard_ids requiere shard_count; se atenderán todos los shards")
+            shard_ids = None
+        self.shard_count = shard_count
+        self.shard_ids = shard_ids
+
+    @classmethod
+    def from_config(cls, sharding_config: Dict, environ: Optional[Mapping[str, str]] = None) -> 'ShardOwnership':
+        """Leer la sección ``sharding``; SHARD_COUNT y SHARD_IDS la sobrescriben (uno por proceso)"""
+        environ = os.environ if environ is None else environ
+        shard_count = environ.get('SHARD_COUNT') or sharding_config.get('shard_count')
+        shard_ids = parse_shard_ids(environ.get('SHARD_IDS') or sharding_config.get('shard_ids'))
+        return cls(int(shard_count) if shard_count else None, shard_ids)
+
+    @property
+    def is_split(self) -> bool:
+        """True si otros procesos atienden parte de los shards"""
+        return self.shard_ids is not None and len(self.shard_ids) < self.shard_count
+
+    def split_config_error(self, storage_mode: str, primary_guild_id: Optional[int]) -> Optional[str]:
+        """Motivo por el que la configuración no permite repartir los shards entre procesos (None si lo permite).
+
+        Solo PostgreSQL relee los registros de otros procesos: JSON y SQLite
+        cargan todo en memoria una vez y al reescribir borrarían lo que otro
+        proceso guardó. Y si cada proceso eligiera como principal su primer
+        servidor, varios servidores compartirían los archivos/tablas heredados.
+        """
+        if not self.is_split:
+            return None
+        if storage_mode != 'postgres':
+            return f"Con los shards repartidos entre procesos el almacenamiento debe ser 'postgres' (configurado: '{storage_mode}')"
+        if primary_guild_id is None:
+            return "Con los shards repartidos entre procesos hay que indicar primary_guild_id en config.json"
+        return None
+
+    def owns_shard(self, shard_id: int) -> bool:
+        return self.shard_ids is None or shard_id in self.shard_ids
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """True si los eventos del servidor llegan a este proceso"""
+        if self.shard_ids is None:
+            return True
+        return self.owns_shard(shard_for_guild(guild_id, self.shard_count))
+
+    def bot_options(self) -> Dict:
+        """Argumentos de ``AutoShardedBot`` (sin shard_count, discord.py pide el recomendado)"""
+        options = {}
+        if self.shard_count is not None:
+            options['shard_count'] = self.shard_count
+        if self.shard_ids is not None:
+            options['shard_ids'] = self.shard_ids
+        return options
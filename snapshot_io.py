@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+def _checksum_file(path: str) -> str:
+    return f"{path}.sha256"
+
+def _generation_file(path: str, generation: int) -> str:
+    """Nombre del archivo de una generación (0 es el snapshot actual)"""
+    return path if generation == 0 else f"{path}.{generation}"
+
+def _fsync_directory(path: str):
+    """Asegurar que los renombrados del directorio lleguen a disco (solo POSIX)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _write_file(path: str, content: bytes):
+    with open(path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+
+def _shift_generation(src: str, dst: str):
+    """Mover un snapshot y su checksum a la siguiente generación"""
+    if os.path.exists(src):
+        os.replace(src, dst)
+        if os.path.exists(_checksum_file(src)):
+            os.replace(_checksum_file(src), _checksum_file(dst))
+        elif os.path.exists(_checksum_file(dst)):
+            os.remove(_checksum_file(dst))
+    elif os.path.exists(_checksum_file(src)):
+        # Checksum huérfano de una escritura interrumpida
+        os.remove(_checksum_file(src))
+
+def write_atomic(path: str, payload: str):
+    """Reemplazar un archivo de forma atómica (temporal con fsync + renombrado), sin generaciones"""
+    temp_file = f"{path}.tmp"
+    _write_file(temp_file, payload.encode('utf-8'))
+    os.replace(temp_file, path)
+    _fsync_directory(path)
+
+def write_snapshot(path: str, payload: str, generations: int = 3):
+    """Escribir un snapshot de forma atómica conservando generaciones anteriores.
+
+    El contenido se escribe en un archivo temporal con fsync junto a su checksum
+    SHA-256 y luego se renombra sobre el snapshot actual, desplazando los
+    anteriores a ``<archivo>.1`` ... ``<archivo>.N``. Un corte a mitad de la
+    escritura nunca deja el snapshot actual truncado. Lanza OSError si falla.
+    """
+    content = payload.encode('utf-8')
+    temp_file = f"{path}.tmp"
+    _write_file(temp_file, content)
+    _write_file(_checksum_file(temp_file), hashlib.sha256(content).hexdigest().encode('ascii'))
+
+    # Desplazar generaciones: la más antigua se descarta
+    for generation in range(generations, 0, -1):
+        _shift_generation(_generation_file(path, generation - 1), _generation_file(path, generation))
+
+    os.replace(_checksum_file(temp_file), _checksum_file(path))
+    os.replace(temp_file, path)
+    _fsync_directory(path)
+
+def _read_valid(path: str):
+    """Leer un snapshot si existe y su checksum coincide; devuelve None si no es válido"""
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    checksum_path = _checksum_file(path)
+    if os.path.exists(checksum_path):
+        with open(checksum_path, 'r', encoding='ascii') as f:
+            expected = f.read().strip()
+        if hashlib.sha256(content).hexdigest() != expected:
+            print(f"⚠️ Checksum inválido en {path}")
+            return None
+
+    # Los archivos anteriores a los checksums solo se validan como JSON
+    try:
+        return json.loads(content.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        print(f"⚠️ Snapshot ilegible en {path}: {e}")
+        return None
+
+def snapshot_candidates(path: str, generations: int = 3) -> List[str]:
+    """Archivos de snapshot existentes, del más reciente al más antiguo"""
+    return [
+        _generation_file(path, generation)
+        for generation in range(generations + 1)
+        if os.path.exists(_generation_file(path, generation))
+    ]
+
+def load_snapshot(path: str, generations: int = 3) -> Dict:
+    """Cargar la generación válida más reciente de un snapshot.
+
+    Si el snapshot actual está truncado o corrupto se usa automáticamente la
+    generación anterior. Devuelve {} solo si no existe ninguna válida.
+    """
+    candidates = snapshot_candidates(path, generations)
+    for candidate in candidates:
+        try:
+            data = _read_valid(candidate)
+        except IOError as e:
+            print(f"⚠️ No se pudo leer {candidate}: {e}")
+            continue
+        if data is not None:
+            if candidate != path:
+                print(f"♻️ Datos recuperados desde la generación anterior {candidate}")
+            return data
+
+    if candidates:
+        print(f"❌ Ninguna generación válida de {path}; se inicia sin datos")
+    return {}
@@ -0,0 +1,88 @@
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+class SQLiteStore:
+    """Almacenamiento de registros en una tabla SQLite (modo WAL).
+
+    Cada registro ocupa una fila con el registro completo en JSON y columnas
+    indexadas (por ejemplo ``is_active``, ``is_paused``, ``last_start``) para
+    que las consultas por estado no tengan que recorrer todos los registros.
+    """
+
+    def __init__(self, db_path: str, table: str, columns: Dict[str, str]):
+        self.db_path = db_path
+        self.table = table
+        self.columns = columns
+        self._lock = threading.Lock()
+        # La conexión se comparte con el hilo de escritura; el lock serializa su uso
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+        names = ', '.join(['user_id'] + list(columns) + ['record'])
+        placeholders = ', '.join(['?'] * (len(columns) + 2))
+        self._insert_sql = f'INSERT OR REPLACE INTO {table} ({names}) VALUES ({placeholders})'
+
+    def _create_schema(self):
+        column_defs = ''.join(f', {name} {sql_type}' for name, sql_type in self.columns.items())
+        with self._lock, self._conn:
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} '
+                               f'(user_id TEXT PRIMARY KEY{column_defs}, record TEXT NOT NULL)')
+            for name in self.columns:
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_{name} ON {self.table} ({name})')
+
+    def make_row(self, key: str, record: Dict) -> Tuple:
+        """Convertir un registro en la fila a guardar"""
+        return (
+            (key,)
+            + tuple(record.get(name) for name in self.columns)
+            + (json.dumps(record, ensure_ascii=False, separators=(',', ':')),)
+        )
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute(f'SELECT 1 FROM {self.table} LIMIT 1').fetchone() is None
+
+    def load(self) -> Dict:
+        """Cargar todos los registros"""
+        with self._lock:
+            rows = self._conn.execute(f'SELECT user_id, record FROM {self.table}').fetchall()
+        return {user_id: json.loads(record) for user_id, record in rows}
+
+    def write_rows(self, rows: List[Tuple], deleted_keys: Iterable[str]) -> bool:
+        """Aplicar filas y eliminaciones en una única transacción"""
+        try:
+            with self._lock, self._conn:
+                if rows:
+                    self._conn.executemany(self._insert_sql, rows)
+                deleted = [(key,) for key in deleted_keys]
+                if deleted:
+                    self._conn.executemany(f'DELETE FROM {self.table} WHERE user_id = ?', deleted)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error al guardar en SQLite: {e}")
+            return False
+
+    def replace_all(self, rows: List[Tuple]) -> bool:
+        """Reemplazar todo el contenido de la tabla por las filas indicadas"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(f'DELETE FROM {self.table}')
+                self._conn.executemany(self._insert_sql, rows)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error al guardar en SQLite: {e}")
+            return False
+
+    def select_ids(self, where: str, params: Tuple = ()) -> List[str]:
+        """Consultar claves filtrando por las columnas indexadas"""
+        with self._lock:
+            rows = self._conn.execute(f'SELECT user_id FROM {self.table} WHERE {where}', params).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
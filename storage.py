@@ -0,0 +1,443 @@
+import json
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from journal_store import JournalStore
+from postgres_store import PostgresStore
+from snapshot_io import load_snapshot, write_snapshot
+from sqlite_store import SQLiteStore
+
+# Operadores admitidos en los filtros por índice de scan()
+INDEX_OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+
+Writer = Callable[[], bool]
+
+class RecordMap(dict):
+    """dict de registros que convierte los valores asignados como dict a la clase de registro"""
+
+    def __init__(self, record_class, *args, **kwargs):
+        super().__init__()
+        self.record_class = record_class
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        if isinstance(value, dict):
+            value = self.record_class.from_dict(value)
+        super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def copy(self) -> 'RecordMap':
+        return RecordMap(self.record_class, self)
+
+def encode_record(record) -> Dict:
+    """Forma JSON de un registro (los dict se guardan tal cual)"""
+    to_dict = getattr(record, 'to_dict', None)
+    return to_dict() if to_dict is not None else record
+
+class Repository:
+    """Interfaz común de persistencia para TimeTracker y GoldTracker.
+
+    Mantiene los registros en memoria (``data``, clave -> dict) y decide cuándo
+    y cómo escribirlos. Las subclases implementan ``_load`` y ``_prepare_write``;
+    esta última serializa en el hilo del llamador y devuelve una función que
+    hace la E/S y puede ejecutarse en un hilo de trabajo.
+
+    En modo write-behind ``put``/``delete``/``batch_update`` solo marcan las
+    claves como pendientes y ``flush`` las escribe juntas.
+    """
+
+    # True si otros procesos pueden modificar los mismos datos
+    shared = False
+    # Clase de los registros en memoria (con from_dict/to_dict); None guarda los dict tal cual
+    record_class = None
+
+    def __init__(self, write_behind: bool = False):
+        self.write_behind = write_behind and not self.shared
+        self._data: Dict = {}
+        self._dirty_keys = set()
+        self._dirty_all = False
+
+    @property
+    def data(self) -> Dict:
+        return self._data
+
+    @data.setter
+    def data(self, value: Dict):
+        if self.record_class is not None and not isinstance(value, RecordMap):
+            value = RecordMap(self.record_class, value)
+        self._data = value
+
+    def _encoded_data(self) -> Dict:
+        """Todos los registros en su forma JSON"""
+        return {key: encode_record(record) for key, record in self.data.items()}
+
+    # --- Lectura ---
+
+    def load(self) -> Dict:
+        """Cargar todos los registros desde el backend"""
+        self.data = self._load()
+        return self.data
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Obtener un registro"""
+        return self.data.get(key)
+
+    def get_all(self) -> Dict:
+        """Obtener todos los registros (en memoria)"""
+        return self.data
+
+    def scan(self, predicate: Callable[[Dict], bool], index: Optional[Dict] = None) -> Dict:
+        """Obtener los registros que cumplen ``predicate``.
+
+        ``index`` describe el mismo filtro sobre columnas indexadas, por ejemplo
+        ``{'is_active': True, 'last_start': ('<=', fecha)}``. Los backends con
+        índices lo usan para no recorrer todos los registros; el predicado se
+        aplica siempre sobre el resultado.
+        """
+        keys = self._candidate_keys(index) if index else None
+        if keys is None:
+            return {key: record for key, record in self.data.items() if predicate(record)}
+        return {key: self.data[key] for key in keys if key in self.data and predicate(self.data[key])}
+
+    def _candidate_keys(self, index: Dict) -> Optional[Iterable[str]]:
+        """Claves candidatas según el índice, o None para recorrer todo"""
+        return None
+
+    # --- Escritura ---
+
+    def put(self, key: str, record: Dict) -> bool:
+        """Guardar un registro"""
+        self.data[key] = record
+        return self._persist([key])
+
+    def delete(self, key: str) -> bool:
+        """Eliminar un registro"""
+        self.data.pop(key, None)
+        return self._persist([key])
+
+    def batch_update(self, keys: Iterable[str]) -> bool:
+        """Persistir en una sola escritura el estado actual de varias claves.
+
+        Las claves que ya no están en ``data`` se eliminan del backend.
+        """
+        keys = list(keys)
+        if not keys:
+            return True
+        return self._persist(keys)
+
+    def save_all(self) -> bool:
+        """Reescribir todos los registros"""
+        if self.write_behind:
+            self._dirty_all = True
+            return True
+        return self._prepare_write(None)()
+
+    def _persist(self, keys: List[str]) -> bool:
+        if self.write_behind:
+            self._dirty_keys.update(keys)
+            return True
+        return self._prepare_write(keys)()
+
+    def _prepare_write(self, keys: Optional[List[str]]) -> Writer:
+        """Serializar las claves indicadas (o todo si es None) y devolver la escritura"""
+        raise NotImplementedError
+
+    # --- Escritura diferida ---
+
+    def is_dirty(self) -> bool:
+        """Indicar si hay cambios pendientes de escribir"""
+        return self._dirty_all or bool(self._dirty_keys)
+
+    def prepare_flush(self) -> Optional[Writer]:
+        """Tomar los cambios pendientes y serializarlos.
+
+        Debe llamarse desde el hilo que modifica los datos (el event loop).
+        Devuelve la función que escribe a disco, o None si no hay nada pendiente.
+        """
+        if not self.is_dirty():
+            return None
+
+        keys = None if self._dirty_all else list(self._dirty_keys)
+        self._dirty_keys, self._dirty_all = set(), False
+        write = self._prepare_write(keys)
+
+        def flush_writer() -> bool:
+            if write():
+                return True
+            # Si la escritura falla, volver a marcar todo como pendiente para el próximo flush
+            self._dirty_all = True
+            return False
+
+        return flush_writer
+
+    def flush(self) -> bool:
+        """Escribir de inmediato los cambios pendientes"""
+        writer = self.prepare_flush()
+        if writer is None:
+            return True
+        return writer()
+
+    # --- Mantenimiento ---
+
+    @contextmanager
+    def locked(self, key: str):
+        """Serializar una mutación de lectura-modificación-escritura sobre una clave"""
+        yield
+
+    def prepare_maintenance(self) -> Optional[Writer]:
+        """Preparar tareas periódicas del backend (por ejemplo compactación), si hacen falta"""
+        return None
+
+    def close(self):
+        """Liberar archivos o conexiones abiertas"""
+        pass
+
+    def _import_json(self, json_path: str, snapshot_generations: int) -> Dict:
+        """Importar un archivo JSON existente al crear un backend nuevo"""
+        data = load_snapshot(json_path, snapshot_generations)
+        if data:
+            self.data = data
+            self._prepare_write(None)()
+            print(f"📦 {len(data)} registro(s) importados de {json_path}")
+        return data
+
+class JsonRepository(Repository):
+    """Archivo JSON completo, escrito de forma atómica con generaciones de respaldo"""
+
+    def __init__(self, path: str, snapshot_generations: int = 3, write_behind: bool = False):
+        super().__init__(write_behind)
+        self.path = path
+        self.snapshot_generations = snapshot_generations
+
+    def _load(self) -> Dict:
+        # Si el archivo está truncado o corrupto se usa la generación válida más reciente
+        return load_snapshot(self.path, self.snapshot_generations)
+
+    def _prepare_write(self, keys: Optional[List[str]]) -> Writer:
+        # Un archivo JSON solo puede reescribirse completo
+        payload = json.dumps(self._encoded_data(), indent=2, ensure_ascii=False)
+
+        def write() -> bool:
+            try:
+                write_snapshot(self.path, payload, self.snapshot_generations)
+                return True
+            except IOError as e:
+                print(f"Error al guardar datos en {self.path}: {e}")
+                return False
+
+        return write
+
+class JournalRepository(Repository):
+    """Snapshot JSON + registro de eventos de solo-anexado"""
+
+    def __init__(self, path: str, compact_threshold: int = 500, snapshot_generations: int = 3,
+                 write_behind: bool = False):
+        super().__init__(write_behind)
+        self.journal = JournalStore(path, compact_threshold, snapshot_generations)
+
+    def _load(self) -> Dict:
+        return self.journal.load()
+
+    def _prepare_write(self, keys: Optional[List[str]]) -> Writer:
+        if keys is None:
+            # Guardar todo se anexa como un borrado completo más el estado de cada registro: la
+            # compactación solo ocurre en prepare_maintenance, para que dos nunca se solapen
+            events = [{'op': 'clear'}]
+            events.extend({'op': 'put', 'id': key, 'data': record} for key, record in self._encoded_data().items())
+        else:
+            events = []
+            for key in keys:
+                if key in self.data:
+                    events.append({'op': 'put', 'id': key, 'data': encode_record(self.data[key])})
+                else:
+                    events.append({'op': 'del', 'id': key})
+        lines = [self.journal.encode_event(event) for event in events]
+        return lambda: self.journal.append_lines(lines)
+
+    def prepare_maintenance(self) -> Optional[Writer]:
+        """Compactar el registro cuando supera el umbral configurado.
+
+        Es la única vía que compacta; quien la llama debe serializarla con los
+        flush (el bot usa ``persistence_lock``).
+        """
+        if not self.journal.needs_compaction():
+            return None
+        payload = self.journal.prepare_compaction(self._encoded_data())
+        return lambda: payload is not None and self.journal.write_compaction(payload)
+
+    def close(self):
+        self.journal.close()
+
+def _where_clause(index: Dict, placeholder: str) -> Tuple[str, Tuple]:
+    """Traducir un filtro de índice a SQL"""
+    conditions, params = [], []
+    for column, condition in index.items():
+        op, value = condition if isinstance(condition, tuple) else ('=', condition)
+        if op not in INDEX_OPERATORS:
+            raise ValueError(f"Operador no soportado en el índice: {op}")
+        if value is None:
+            conditions.append(f'{column} IS NULL' if op == '=' else f'{column} IS NOT NULL')
+        else:
+            conditions.append(f'{column} {op} {placeholder}')
+            params.append(value)
+    return ' AND '.join(conditions), tuple(params)
+
+class SQLiteRepository(Repository):
+    """Una fila por registro en SQLite, con columnas indexadas para scan()"""
+
+    def __init__(self, db_path: str, table: str, columns: Dict[str, str], json_path: Optional[str] = None,
+                 snapshot_generations: int = 3, write_behind: bool = False):
+        super().__init__(write_behind)
+        self.store = SQLiteStore(db_path, table, columns)
+        self.json_path = json_path
+        self.snapshot_generations = snapshot_generations
+
+    def _load(self) -> Dict:
+        if self.store.is_empty() and self.json_path and os.path.exists(self.json_path):
+            return self._import_json(self.json_path, self.snapshot_generations)
+        return self.store.load()
+
+    def _prepare_write(self, keys: Optional[List[str]]) -> Writer:
+        if keys is None:
+            rows = [self.store.make_row(key, record) for key, record in self._encoded_data().items()]
+            return lambda: self.store.replace_all(rows)
+
+        rows = [self.store.make_row(key, encode_record(self.data[key])) for key in keys if key in self.data]
+        deleted = [key for key in keys if key not in self.data]
+        return lambda: self.store.write_rows(rows, deleted)
+
+    def _candidate_keys(self, index: Dict) -> Optional[Iterable[str]]:
+        if self._dirty_all:
+            # Hay cambios sin escribir en cualquier fila: el índice no es fiable
+            return None
+        where, params = _where_clause(index, '?')
+        keys = set(self.store.select_ids(where, params))
+        # Las filas con cambios pendientes se evalúan en memoria
+        keys.update(self._dirty_keys)
+        return keys
+
+    def close(self):
+        self.store.close()
+
+class PostgresRepository(Repository):
+    """Registros compartidos entre procesos en PostgreSQL"""
+
+    shared = True
+
+    def __init__(self, dsn: str, table: str, columns: Dict[str, str], pool_size: int = 5,
+                 json_path: Optional[str] = None, snapshot_generations: int = 3):
+        super().__init__()
+        self.store = PostgresStore(dsn, table, columns, max_connections=pool_size)
+        self.json_path = json_path
+        self.snapshot_generations = snapshot_generations
+        self._locked_row = None
+
+    def _load(self) -> Dict:
+        if self.store.is_empty() and self.json_path and os.path.exists(self.json_path):
+            return self._import_json(self.json_path, self.snapshot_generations)
+        return self.store.load()
+
+    def get(self, key: str) -> Optional[Dict]:
+        # Leer siempre la versión compartida más reciente (salvo dentro de una mutación bloqueada)
+        if self._locked_row is None:
+            record = self.store.get(key)
+            if record is None:
+                self.data.pop(key, None)
+            else:
+                self.data[key] = record
+        return self.data.get(key)
+
+    def get_all(self) -> Dict:
+        self.data = self.store.load()
+        return self.data
+
+    def scan(self, predicate: Callable[[Dict], bool], index: Optional[Dict] = None) -> Dict:
+        if index:
+            where, params = _where_clause(index, '%s')
+            records = self.store.select(where, params)
+            self.data.update(records)
+        else:
+            records = self.get_all()
+        # Devolver los registros ya convertidos a la clase de registro
+        return {key: self.data[key] for key in records if predicate(self.data[key])}
+
+    def _prepare_write(self, keys: Optional[List[str]]) -> Writer:
+        if keys is None:
+            data = self._encoded_data()
+            return lambda: self.store.replace_all(data)
+
+        row = self._locked_row
+        if row is not None and keys == [row.key]:
+            # Dentro de una mutación bloqueada: escribir en la misma transacción
+            def write_locked() -> bool:
+                if row.key in self.data:
+                    row.save(encode_record(self.data[row.key]))
+                else:
+                    row.delete()
+                return True
+            return write_locked
+
+        records = {key: encode_record(self.data[key]) for key in keys if key in self.data}
+        deleted = [key for key in keys if key not in self.data]
+        return lambda: self.store.write_rows(records, deleted)
+
+    @contextmanager
+    def locked(self, key: str):
+        """Bloquear la fila, partir de su versión compartida y escribir en la misma transacción"""
+        if self._locked_row is not None:
+            yield
+            return
+
+        with self.store.locked(key) as row:
+            if row.record is None:
+                self.data.pop(key, None)
+            else:
+                self.data[key] = row.record
+            self._locked_row = row
+            try:
+                yield
+            finally:
+                self._locked_row = None
+
+    def close(self):
+        self.store.close()
+
+def create_repository(mode: str, data_file: str, table: str, columns: Dict[str, str],
+                      write_behind: bool = False, snapshot_generations: int = 3,
+                      journal_compact_threshold: int = 500, sqlite_path: Optional[str] = None,
+                      postgres_dsn: Optional[str] = None, postgres_pool_size: int = 5) -> Repository:
+    """Crear el repositorio del modo indicado ('json', 'journal', 'sqlite' o 'postgres')"""
+    if mode == 'journal':
+        return JournalRepository(data_file, journal_compact_threshold, snapshot_generations, write_behind)
+    if mode == 'sqlite':
+        db_path = sqlite_path or os.path.splitext(data_file)[0] + '.db'
+        return SQLiteRepository(db_path, table, columns, data_file, snapshot_generations, write_behind)
+    if mode == 'postgres':
+        return PostgresRepository(postgres_dsn, table, columns, postgres_pool_size, data_file, snapshot_generations)
+    if mode != 'json':
+        print(f"⚠️ Modo de almacenamiento desconocido '{mode}', se usa JSON")
+    return JsonRepository(data_file, snapshot_generations, write_behind)
+
+def repository_from_config(storage_config: Dict, data_file: str, table: str, columns: Dict[str, str]) -> Repository:
+    """Crear un repositorio a partir de la sección ``storage`` de config.json"""
+    return create_repository(
+        storage_config.get('mode', 'json'),
+        data_file,
+        table,
+        columns,
+        write_behind=storage_config.get('write_behind', False),
+        snapshot_generations=storage_config.get('snapshot_generations', 3),
+        journal_compact_threshold=storage_config.get('journal_compact_records', 500),
+        sqlite_path=storage_config.get('sqlite_path'),
+        # El DSN de PostgreSQL puede venir de config.json o de la variable de entorno DATABASE_URL
+        postgres_dsn=storage_config.get('postgres_dsn') or os.getenv('DATABASE_URL'),
+        postgres_pool_size=storage_config.get('postgres_pool_size', 5)
+    )
@@ -0,0 +1,45 @@
+"""
+Test de los índices de usuarios activos y pausados de TimeTracker
+"""
+import os
+import tempfile
+from time_tracker import TimeTracker
+
+def test_active_index_follows_state():
+    """Los índices se mantienen al iniciar, pausar, reanudar, detener y cancelar"""
+    print("=== Test de índices de activos ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file)
+
+        tracker.start_tracking(111, "Usuario1")
+        tracker.start_tracking(222, "Usuario2")
+        tracker.add_minutes(333, "Usuario3", 10)
+        assert {user_id for user_id, _ in tracker.iter_active()} == {'111', '222'}
+        assert list(tracker.iter_paused()) == []
+
+        tracker.pause_tracking(222)
+        assert {user_id for user_id, _ in tracker.iter_active()} == {'111'}
+        assert [user_id for user_id, _ in tracker.iter_paused()] == ['222']
+
+        tracker.resume_tracking(222)
+        tracker.stop_tracking(111)
+        assert set(tracker.get_active_users()) == {'222'}
+
+        tracker.cancel_user_tracking(222)
+        assert list(tracker.iter_active()) == []
+
+        tracker.start_tracking(333, "Usuario3")
+        tracker.pause_tracking(333)
+        reloaded = TimeTracker(data_file)
+        assert [user_id for user_id, _ in reloaded.iter_paused()] == ['333']
+
+        reloaded.reset_all_user_times()
+        assert list(reloaded.iter_paused()) == []
+
+    print("✅ Índices correctos")
+
+if __name__ == "__main__":
+    test_active_index_follows_state()
+    print("\n🎉 Todos los tests de índices completados")
@@ -0,0 +1,71 @@
+"""
+Test de la fachada async de TimeTracker con locks por usuario
+"""
+import asyncio
+import os
+import tempfile
+from unittest import mock
+from async_time_tracker import AsyncTimeTracker
+from time_tracker import TimeTracker
+
+def test_pause_and_enforce_limit_is_atomic():
+    """Pausar y cancelar al llegar a 3 pausas ocurre en una sola operación y escritura"""
+    print("=== Test de la fachada async ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        facade = AsyncTimeTracker(tracker)
+
+        async def scenario():
+            tracker.start_tracking(111, "Usuario1")
+            for expected_count in (1, 2):
+                result = await facade.pause_and_enforce_limit(111)
+                assert result['pause_count'] == expected_count and not result['cancelled']
+                assert await facade.resume_tracking(111) is not None
+
+            with mock.patch.object(tracker.repository, '_prepare_write', wraps=tracker.repository._prepare_write) as write:
+                result = await facade.pause_and_enforce_limit(111)
+                assert write.call_count == 1, "Pausa y cancelación en una sola escritura"
+            assert result['pause_count'] == 3 and result['cancelled']
+            assert tracker.get_user_data(111) is None
+
+            assert await facade.pause_and_enforce_limit(111) is None, "Sin tiempo activo no hay pausa"
+            assert await facade.resume_tracking(111) is None
+
+        asyncio.run(scenario())
+    print("✅ Pausa con cancelación automática atómica")
+
+def test_same_user_is_serialized_and_others_run_in_parallel():
+    """Las operaciones de un usuario esperan su lock; las de otros usuarios no"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        facade = AsyncTimeTracker(tracker, stripes=8)
+
+        async def scenario():
+            tracker.start_tracking(1, "Usuario1")
+            tracker.start_tracking(2, "Usuario2")
+
+            async with facade.user_lock(1):
+                assert facade.is_locked(1) and facade.is_locked(9), "Mismo lock para 1 y 9 con 8 stripes"
+                pause_same = asyncio.create_task(facade.pause_and_enforce_limit(1))
+                pause_other = asyncio.create_task(facade.pause_and_enforce_limit(2))
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+                assert pause_other.done(), "Otro usuario no espera"
+                assert not pause_same.done(), "El mismo usuario espera al lock"
+                assert not tracker.get_user_data(1).is_paused
+            assert (await pause_same)['pause_count'] == 1
+            assert not facade.is_locked(1)
+
+            # Dos pausas simultáneas del mismo usuario: solo una cuenta
+            tracker.resume_tracking(1)
+            results = await asyncio.gather(facade.pause_and_enforce_limit(1), facade.pause_and_enforce_limit(1))
+            assert sorted(result is None for result in results) == [False, True]
+            assert tracker.get_pause_count(1) == 2
+
+        asyncio.run(scenario())
+
+if __name__ == "__main__":
+    test_pause_and_enforce_limit_is_atomic()
+    test_same_user_is_serialized_and_others_run_in_parallel()
+    print("\n🎉 Todos los tests de la fachada async completados")
@@ -0,0 +1,63 @@
+"""
+Test de la configuración cacheada con recarga por fecha de modificación
+"""
+import json
+import os
+import tempfile
+from unittest import mock
+from bot_config import BotConfig
+
+def test_config_is_cached_and_hot_reloaded():
+    """Las lecturas no abren el archivo y los cambios en disco se detectan por mtime"""
+    print("=== Test de configuración cacheada ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump({'command_permission_role_id': 1, 'notification_channels': {'gold': 5}}, f)
+
+        config = BotConfig(path, check_interval=0)
+        with mock.patch('builtins.open', side_effect=AssertionError("no debe leer el archivo")):
+            assert config.command_permission_role_id == 1
+            assert config.channel('gold') == 5
+            assert config.get('mi_tiempo_role_id') is None
+
+        # Edición manual del archivo: se recarga al cambiar la fecha de modificación
+        with open(path, 'w') as f:
+            json.dump({'command_permission_role_id': 2}, f)
+        os.utime(path, ns=(1, 1))
+        assert config.command_permission_role_id == 2
+
+        # Un archivo inválido no reemplaza la configuración vigente
+        with open(path, 'w') as f:
+            f.write("{roto")
+        assert not config.reload()
+        assert config.command_permission_role_id == 2
+
+    print("✅ Configuración cacheada correcta")
+
+def test_config_updates_are_atomic():
+    """update/set_channel escriben el archivo completo sin dejar temporales"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump({'storage': {'mode': 'json'}}, f)
+
+        config = BotConfig(path, check_interval=0)
+        assert config.update(mi_tiempo_role_id=7)
+        assert config.set_channel('unpause', 9)
+
+        with open(path) as f:
+            saved = json.load(f)
+        assert saved == {'storage': {'mode': 'json'}, 'mi_tiempo_role_id': 7,
+                         'notification_channels': {'unpause': 9}}
+        assert os.listdir(tmp) == ['config.json']
+
+        with mock.patch.object(config, 'reload', wraps=config.reload) as reload:
+            assert config.mi_tiempo_role_id == 7
+            assert reload.call_count == 0, "Guardar no provoca una recarga"
+
+if __name__ == "__main__":
+    test_config_is_cached_and_hot_reloaded()
+    test_config_updates_are_atomic()
+    print("\n🎉 Todos los tests de configuración completados")
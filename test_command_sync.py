@@ -0,0 +1,52 @@
+"""
+Test de la sincronización de comandos slash por hash del árbol
+"""
+import asyncio
+import os
+import tempfile
+from unittest import mock
+import discord
+from discord.ext import commands
+from command_sync import command_tree_hash, sync_command_tree
+
+def _make_bot(description="Ver el tiempo"):
+    bot = commands.Bot(command_prefix='!', intents=discord.Intents.default())
+
+    @bot.tree.command(name="mi_tiempo", description=description)
+    async def mi_tiempo(interaction: discord.Interaction):
+        pass
+
+    return bot
+
+def test_sync_only_when_tree_changes():
+    """Un reinicio o reconexión con los mismos comandos no vuelve a sincronizar"""
+    print("=== Test de sincronización de comandos ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        hash_file = os.path.join(tmp, 'command_tree_hash.json')
+
+        async def sync_count(bot, **kwargs):
+            with mock.patch.object(bot.tree, 'sync', mock.AsyncMock(return_value=[])) as sync:
+                await sync_command_tree(bot.tree, hash_file, **kwargs)
+                return sync.await_count
+
+        async def scenario():
+            assert command_tree_hash(_make_bot().tree) == command_tree_hash(_make_bot().tree)
+            assert await sync_count(_make_bot()) == 1, "Primera vez: sincronizar"
+            assert await sync_count(_make_bot()) == 0, "Mismo árbol: omitir"
+            assert await sync_count(_make_bot("Ver mi tiempo")) == 1, "Árbol modificado: sincronizar"
+            assert await sync_count(_make_bot("Ver mi tiempo"), force=True) == 1
+
+            # El servidor de desarrollo tiene su propio hash
+            guild = discord.Object(id=123)
+            assert await sync_count(_make_bot("Ver mi tiempo"), guild=guild) == 1
+            assert await sync_count(_make_bot("Ver mi tiempo"), guild=guild) == 0
+            assert await sync_count(_make_bot("Ver mi tiempo")) == 0
+
+        asyncio.run(scenario())
+
+    print("✅ Sincronización por hash correcta")
+
+if __name__ == "__main__":
+    test_sync_only_when_tree_changes()
+    print("\n🎉 Todos los tests de sincronización completados")
@@ -0,0 +1,161 @@
+"""
+Test del motor de expiración de membresías Gold
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from gold_expiry import EXPIRY, WARNING, WARNING_DIGEST, GoldExpiryEngine
+from gold_tracker import GoldTracker
+
+async def _noop(*args):
+    pass
+
+def _set_expiry(tracker, user_id, expiry):
+    tracker.data[str(user_id)]['expiry_date'] = expiry.isoformat()
+    tracker.save_user(user_id)
+
+def test_expiry_events_fire_once():
+    """Cada membresía recibe un aviso y una expiración, una sola vez"""
+    print("=== Test de expiración Gold ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = GoldTracker(os.path.join(tmp, 'gold.json'))
+        tracker.grant_gold(111, "Usuario1", 1, "Gold", 999)
+        tracker.grant_gold(222, "Usuario2", 1, "Gold", 999)
+
+        async def scenario():
+            engine = GoldExpiryEngine(tracker, notify=_noop, remove_role=_noop, warning_days=3)
+            now = time.time()
+            assert engine.process_due(now) == [], "Nada vence todavía"
+
+            # 111 entra en la ventana de aviso, 222 ya expiró
+            _set_expiry(tracker, 111, datetime.fromtimestamp(now) + timedelta(days=2))
+            _set_expiry(tracker, 222, datetime.fromtimestamp(now) - timedelta(minutes=1))
+
+            events = engine.process_due(now)
+            kinds = sorted((kind, membership['user_id']) for kind, membership in events)
+            assert kinds == [(EXPIRY, 222), (WARNING, 111)], kinds
+            assert engine.process_due(now) == [], "No se repiten notificaciones"
+            assert engine._removals.qsize() == 1
+
+            # Al llegar la expiración de 111 se desactiva
+            expiry_111 = datetime.fromisoformat(tracker.data['111']['expiry_date']).timestamp()
+            events = engine.process_due(expiry_111 + 1)
+            assert [(kind, m['user_id']) for kind, m in events] == [(EXPIRY, 111)]
+            assert engine.next_due() is None
+
+        asyncio.run(scenario())
+
+        assert tracker.data['111']['notified_expiry'] is True
+        assert not tracker.is_gold_active(111)
+        assert not tracker.is_gold_active(222)
+
+        reloaded = GoldTracker(tracker.data_file)
+        assert not reloaded.data['222']['is_active'], "El estado expirado debe persistir"
+
+    print("✅ Expiración Gold correcta")
+
+def test_engine_removes_roles_in_background():
+    """run() espera al vencimiento, notifica y quita el rol por la cola"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = GoldTracker(os.path.join(tmp, 'gold.json'))
+        notified, removed = [], []
+
+        async def notify(kind, membership):
+            notified.append((kind, membership['user_id']))
+
+        async def remove_role(user_id, role_id):
+            removed.append((user_id, role_id))
+
+        async def scenario():
+            engine = GoldExpiryEngine(tracker, notify=notify, remove_role=remove_role,
+                                      warning_days=0, removals_per_second=100)
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(0.01)
+            tracker.grant_gold(333, "Usuario3", 7, "Gold", 999)
+            _set_expiry(tracker, 333, datetime.now() + timedelta(seconds=0.2))
+            await asyncio.sleep(0.5)
+            task.cancel()
+
+        asyncio.run(scenario())
+        assert (EXPIRY, 333) in notified
+        assert removed == [(333, 7)]
+
+def test_pending_role_removals_survive_restart():
+    """Un rol que quedó en la cola al reiniciar se quita al arrancar de nuevo"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = GoldTracker(os.path.join(tmp, 'gold.json'))
+        tracker.grant_gold(444, "Usuario4", 7, "Gold", 999)
+        _set_expiry(tracker, 444, datetime.now() - timedelta(minutes=1))
+        removed = []
+
+        async def failing_remove(user_id, role_id):
+            raise RuntimeError("sin conexión")
+
+        async def remove_role(user_id, role_id):
+            removed.append((user_id, role_id))
+
+        async def run_engine(gold_tracker, remove):
+            engine = GoldExpiryEngine(gold_tracker, notify=_noop, remove_role=remove, removals_per_second=100)
+            task = asyncio.create_task(engine.run())
+            await asyncio.sleep(0.05)
+            task.cancel()
+            return engine
+
+        # Expira, pero quitar el rol falla antes de que el proceso se detenga
+        asyncio.run(run_engine(tracker, failing_remove))
+        assert not tracker.data['444']['is_active']
+        reloaded = GoldTracker(tracker.data_file)
+        assert list(reloaded.get_pending_role_removals()) == ['444'], "El rol sigue pendiente tras el fallo"
+
+        engine = asyncio.run(run_engine(reloaded, remove_role))
+        assert removed == [(444, 7)]
+        assert engine.gold_tracker.get_pending_role_removals() == {}
+        assert GoldTracker(tracker.data_file).data['444']['role_removed'] is True
+
+def test_digest_groups_warnings_in_one_write():
+    """En modo resumen los avisos del día salen juntos y se marcan con una sola escritura"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = GoldTracker(os.path.join(tmp, 'gold.json'))
+        for user_id in (111, 222, 333):
+            tracker.grant_gold(user_id, f"Usuario{user_id}", 1, "Gold", 999)
+
+        async def scenario():
+            engine = GoldExpiryEngine(tracker, notify=_noop, remove_role=_noop,
+                                      warning_days=3, digest_hour=9)
+            # Ambos entran en la ventana de aviso antes de la próxima hora de resumen
+            next_digest = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+            if next_digest < datetime.now():
+                next_digest += timedelta(days=1)
+            _set_expiry(tracker, 111, next_digest + timedelta(days=3, hours=-3))
+            _set_expiry(tracker, 222, next_digest + timedelta(days=3, hours=-1))
+            _set_expiry(tracker, 333, next_digest + timedelta(days=20))
+
+            # Los avisos vencen a la hora del resumen, no al entrar en la ventana
+            digest_at = engine.next_due()
+            assert digest_at == next_digest.timestamp()
+            assert engine.process_due(digest_at - 1) == []
+
+            writes = []
+            original = tracker.repository.batch_update
+            tracker.repository.batch_update = lambda keys: writes.append(list(keys)) or original(keys)
+            events = engine.process_due(digest_at)
+            tracker.repository.batch_update = original
+
+            assert len(events) == 1 and events[0][0] == WARNING_DIGEST
+            assert [m['user_id'] for m in events[0][1]] == [111, 222], "Ordenadas por expiración"
+            assert writes == [['111', '222']], "Una sola escritura para todo el resumen"
+            assert engine.process_due(digest_at) == []
+
+        asyncio.run(scenario())
+        assert tracker.data['111']['notified_expiry'] and tracker.data['222']['notified_expiry']
+        assert not tracker.data['333'].get('notified_expiry', False)
+
+if __name__ == "__main__":
+    test_expiry_events_fire_once()
+    test_engine_removes_roles_in_background()
+    test_pending_role_removals_survive_restart()
+    test_digest_groups_warnings_in_one_write()
+    print("\n🎉 Todos los tests de expiración Gold completados")
@@ -0,0 +1,82 @@
+"""
+Test del estado de seguimiento particionado por servidor
+"""
+import json
+import os
+import tempfile
+from bot_config import BotConfig
+from guild_partitions import GuildPartition, GuildPartitions, partition_storage_names
+from milestone_scheduler import MilestoneScheduler
+from time_tracker import TimeTracker
+
+def test_partitions_are_lazy_and_isolated():
+    """Cada servidor tiene su propio archivo y solo se carga al usarse"""
+    print("=== Test de particiones por servidor ===")
+    assert partition_storage_names(1, 1) == ('user_times.json', 'user_times')
+    assert partition_storage_names(2, 1) == ('user_times.2.json', 'user_times_2')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        created = []
+        started = []
+
+        def factory(guild_id):
+            created.append(guild_id)
+            data_file, _ = partition_storage_names(guild_id, 1, os.path.join(tmp, 'user_times.json'))
+            tracker = TimeTracker(data_file)
+            return GuildPartition(guild_id, tracker, MilestoneScheduler(tracker), None)
+
+        partitions = GuildPartitions(factory, on_load=started.append)
+        assert len(partitions) == 0 and created == [], "Nada se carga al crear el registro"
+
+        first = partitions.get(1)
+        second = partitions.get(2)
+        assert partitions.get(1) is first and created == [1, 2], "Cada partición se carga una sola vez"
+        assert [partition.guild_id for partition in started] == [1, 2]
+
+        # El mismo usuario puede tener tiempos distintos en cada servidor
+        first.time_tracker.add_minutes(111, "Usuario1", 30)
+        second.time_tracker.add_minutes(111, "Usuario1", 90)
+        assert first.time_tracker.get_total_time(111) == 1800
+        assert second.time_tracker.get_total_time(111) == 5400
+        assert os.path.exists(os.path.join(tmp, 'user_times.json'))
+        assert os.path.exists(os.path.join(tmp, 'user_times.2.json'))
+
+        assert partitions.unload(2) is second
+        assert partitions.unload(2) is None, "Ya no estaba cargada"
+        assert [partition.guild_id for partition in partitions] == [1]
+
+        # Al volver a usarse se recarga desde su archivo
+        assert partitions.get(2).time_tracker.get_total_time(111) == 5400
+
+    print("✅ Particiones independientes y cargadas bajo demanda")
+
+def test_guild_config_overrides_global():
+    """La configuración del servidor sobrescribe la global solo en las claves que define"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'unlimited_time_role_id': 10,
+                'notification_channels': {'milestones': 100, 'pauses': 200},
+                'guilds': {'2': {'unlimited_time_role_id': 20, 'time_limits': {'default_hours': 3}}}
+            }, f)
+
+        config = BotConfig(path, check_interval=0)
+        main, other = config.for_guild(1), config.for_guild(2)
+        assert main.unlimited_time_role_id == 10 and other.unlimited_time_role_id == 20
+        assert main.time_limit_hours(False) == 2 and other.time_limit_hours(False) == 3
+        assert other.time_limit_hours(True) == 4
+
+        assert other.set_channel('milestones', 300)
+        assert other.channel('milestones') == 300 and other.channel('pauses') == 200
+        assert main.channel('milestones') == 100, "Los otros servidores no cambian"
+
+        with open(path) as f:
+            saved = json.load(f)
+        assert saved['guilds']['2']['notification_channels'] == {'milestones': 300}
+        assert saved['notification_channels']['milestones'] == 100
+
+if __name__ == "__main__":
+    test_partitions_are_lazy_and_isolated()
+    test_guild_config_overrides_global()
+    print("\n🎉 Todos los tests de particiones por servidor completados")
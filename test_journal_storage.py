@@ -0,0 +1,118 @@
+"""
+Test del modo de almacenamiento por diario (snapshot + registro de eventos)
+"""
+import json
+import os
+import tempfile
+from time_tracker import TimeTracker
+
+def test_journal_replay():
+    """Las mutaciones se anexan al registro y se reproducen al recargar"""
+    print("=== Test de reproducción del diario ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='journal')
+
+        tracker.add_minutes(111, "Usuario1", 30)
+        tracker.start_tracking(222, "Usuario2")
+        tracker.pause_tracking(222)
+        tracker.add_minutes(333, "Usuario3", 10)
+        tracker.cancel_user_tracking(333)
+        tracker.repository.close()
+
+        # Sin compactar no debe existir snapshot: todo está en el registro
+        assert not os.path.exists(data_file), "No debería haberse reescrito el snapshot"
+        with open(data_file + '.log', 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        print(f"   Eventos en el registro: {len(lines)}")
+        assert len(lines) == 5, f"Se esperaban 5 eventos, hay {len(lines)}"
+
+        reloaded = TimeTracker(data_file, storage_mode='journal')
+        assert reloaded.get_user_data(111)['total_seconds'] == 1800
+        assert reloaded.get_user_data(222)['is_paused'] is True
+        assert reloaded.get_pause_count(222) == 1
+        assert reloaded.get_user_data(333) is None
+        reloaded.repository.close()
+
+    print("✅ Reproducción del diario correcta")
+
+def test_journal_compaction():
+    """La compactación vuelca el registro a un snapshot nuevo"""
+    print("=== Test de compactación del diario ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='journal', journal_compact_threshold=3)
+
+        for i in range(3):
+            tracker.add_minutes(100 + i, f"Usuario{i}", 5)
+        assert tracker.repository.journal.needs_compaction(), "Debería requerir compactación"
+        assert tracker.compact_storage(), "La compactación debería completarse"
+
+        with open(data_file, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        assert len(snapshot) == 3
+        assert not os.path.exists(data_file + '.log.old')
+
+        # Eventos posteriores a la compactación van a un registro nuevo
+        tracker.add_minutes(100, "Usuario0", 5)
+        tracker.repository.close()
+
+        reloaded = TimeTracker(data_file, storage_mode='journal')
+        assert reloaded.get_user_data(100)['total_seconds'] == 600
+        reloaded.repository.close()
+
+    print("✅ Compactación correcta")
+
+def test_journal_save_all_appends_instead_of_compacting():
+    """Reiniciar todo o limpiar la base se anexa al registro; solo el mantenimiento compacta"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='journal')
+        tracker.add_minutes(111, "Usuario1", 30)
+        tracker.add_minutes(222, "Usuario2", 10)
+
+        assert tracker.reset_all_user_times() == 2
+        assert tracker.clear_all_data()
+        tracker.add_minutes(333, "Usuario3", 5)
+        tracker.repository.close()
+        assert not os.path.exists(data_file), "save_all no debe escribir el snapshot fuera del mantenimiento"
+
+        reloaded = TimeTracker(data_file, storage_mode='journal')
+        assert set(reloaded.data) == {'333'}
+        assert reloaded.get_total_time(333) == 300
+        reloaded.repository.close()
+
+def test_journal_truncated_line():
+    """Una línea truncada al final del registro se ignora sin perder el resto"""
+    print("=== Test de línea truncada en el diario ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='journal')
+        tracker.add_minutes(111, "Usuario1", 30)
+        tracker.repository.close()
+
+        with open(data_file + '.log', 'a', encoding='utf-8') as f:
+            f.write('{"op":"put","id":"222","da')
+
+        reloaded = TimeTracker(data_file, storage_mode='journal')
+        assert reloaded.get_user_data(111)['total_seconds'] == 1800
+        assert reloaded.get_user_data(222) is None
+
+        # Los eventos nuevos no deben quedar pegados a la línea truncada
+        reloaded.add_minutes(333, "Usuario3", 10)
+        reloaded.repository.close()
+        again = TimeTracker(data_file, storage_mode='journal')
+        assert again.get_user_data(333)['total_seconds'] == 600
+        again.repository.close()
+
+    print("✅ Línea truncada ignorada correctamente")
+
+if __name__ == "__main__":
+    test_journal_replay()
+    test_journal_compaction()
+    test_journal_save_all_appends_instead_of_compacting()
+    test_journal_truncated_line()
+    print("\n🎉 Todos los tests del diario completados")
@@ -0,0 +1,77 @@
+"""
+Test de la caché de miembros pedidos bajo demanda
+"""
+import asyncio
+from member_cache import MemberCache
+
+class FakeMember:
+    def __init__(self, member_id, guild):
+        self.id = member_id
+        self.guild = guild
+
+class FakeGuild:
+    def __init__(self, guild_id, member_ids, cached=(), chunked=False):
+        self.id = guild_id
+        self.member_ids = set(member_ids)
+        self.cached = {member_id: FakeMember(member_id, self) for member_id in cached}
+        self.chunked = chunked
+        self.queries = []
+
+    def get_member(self, member_id):
+        return self.cached.get(member_id)
+
+    async def query_members(self, user_ids, limit, presences, cache):
+        self.queries.append(list(user_ids))
+        return [FakeMember(member_id, self) for member_id in user_ids if member_id in self.member_ids]
+
+def test_members_are_fetched_in_batches_and_cached():
+    """Los miembros que faltan se piden en lotes y no se vuelven a pedir"""
+    print("=== Test de la caché de miembros ===")
+    guild = FakeGuild(1, member_ids=range(1, 6), cached=[1])
+    cache = MemberCache(batch_size=2)
+
+    async def scenario():
+        members = await cache.fetch_many(guild, [1, 2, 3, 4, 99])
+        assert members[1] is guild.cached[1], "Los de la caché de discord.py no se piden"
+        assert [member_id for member_id, member in members.items() if member is not None] == [1, 2, 3, 4]
+        assert members[99] is None, "Los que no están en el servidor se resuelven como None"
+        assert guild.queries == [[2, 3], [4, 99]]
+
+        assert (await cache.fetch(guild, 99)) is None and (await cache.fetch(guild, 3)) is not None
+        assert len(guild.queries) == 2, "Los ya pedidos (incluso ausentes) salen de la caché"
+
+    asyncio.run(scenario())
+    print("✅ Miembros pedidos en lotes")
+
+def test_cache_is_bounded_and_trusts_chunked_guilds():
+    """La LRU no crece sin límite y un servidor completo en caché nunca consulta la API"""
+    guild = FakeGuild(1, member_ids=range(1, 10))
+    cache = MemberCache(max_size=3)
+
+    async def scenario():
+        await cache.fetch_many(guild, [1, 2, 3, 4])
+        assert len(cache) == 3
+        await cache.fetch(guild, 1)
+        assert guild.queries[-1] == [1], "Se descarta el menos usado"
+
+        cache.remove(1, 4)
+        await cache.fetch(guild, 4)
+        assert guild.queries[-1] == [4]
+
+        chunked = FakeGuild(2, member_ids=[7], cached=[7], chunked=True)
+        members = await cache.fetch_many(chunked, [7, 8])
+        assert members[7] is chunked.cached[7] and members[8] is None
+        assert chunked.queries == []
+
+        # Con ttl 0 las entradas caducan y se vuelven a pedir
+        expiring = MemberCache(ttl=0)
+        await expiring.fetch(guild, 5)
+        await expiring.fetch(guild, 5)
+        assert guild.queries[-2:] == [[5], [5]]
+
+    asyncio.run(scenario())
+
+if __name__ == "__main__":
+    test_members_are_fetched_in_batches_and_cached()
+    test_cache_is_bounded_and_trusts_chunked_guilds()
+    print("\n🎉 Todos los tests de la caché de miembros completados")
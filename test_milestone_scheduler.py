@@ -0,0 +1,91 @@
+"""
+Test del programador de milestones por fecha límite
+"""
+import asyncio
+import os
+import tempfile
+import time
+from milestone_scheduler import MilestoneScheduler
+from time_tracker import TimeTracker
+
+def test_scheduler_rearms_on_changes():
+    """Los vencimientos siguen al inicio, la pausa y la reanudación"""
+    print("=== Test de programación de milestones ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        scheduler = MilestoneScheduler(tracker, session_limit=3600)
+        assert scheduler.next_deadline() is None
+
+        tracker.start_tracking(111, "Usuario1")
+        first_due = scheduler.next_deadline()
+        assert abs(first_due - (tracker.get_user_data(111).last_start + 3600)) < 1e-6
+
+        tracker.pause_tracking(111)
+        assert scheduler.next_deadline() is None, "Un usuario pausado no tiene vencimiento"
+
+        tracker.resume_tracking(111)
+        assert scheduler.next_deadline() >= first_due
+        assert scheduler.pop_due(time.time()) == []
+        assert scheduler.pop_due(time.time() + 3601) == ['111']
+
+    print("✅ Programación correcta")
+
+def test_scheduler_fires_on_deadline():
+    """run() despierta en el vencimiento sin sondear y tolera re-programaciones"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        fired = []
+
+        async def scenario():
+            scheduler = MilestoneScheduler(tracker, session_limit=0.2)
+
+            async def on_due(user_id):
+                fired.append((user_id, time.time()))
+                tracker.stop_tracking(user_id)
+
+            task = asyncio.create_task(scheduler.run(on_due))
+            await asyncio.sleep(0.05)
+            started = time.time()
+            tracker.start_tracking(222, "Usuario2")
+            await asyncio.sleep(0.5)
+            task.cancel()
+            return started
+
+        started = asyncio.run(scenario())
+        assert [user_id for user_id, _ in fired] == [222]
+        assert 0.15 <= fired[0][1] - started < 0.4
+        assert not tracker.get_user_data(222).is_active
+
+def test_failing_callback_does_not_drop_users():
+    """Si la verificación de un usuario falla, él y los demás del mismo lote se vuelven a programar"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        calls = []
+
+        async def scenario():
+            tracker.start_tracking(111, "Usuario1")
+            tracker.start_tracking(222, "Usuario2")
+            scheduler = MilestoneScheduler(tracker, session_limit=0.05, retry_interval=0.05)
+
+            async def on_due(user_id):
+                calls.append(user_id)
+                if calls.count(user_id) == 1:
+                    raise RuntimeError("503 Service Unavailable")
+                tracker.stop_tracking(user_id)
+
+            task = asyncio.create_task(scheduler.run(on_due))
+            await asyncio.sleep(0.4)
+            task.cancel()
+            return scheduler
+
+        scheduler = asyncio.run(scenario())
+        assert sorted(calls) == [111, 111, 222, 222], "Cada usuario se reintenta tras el error"
+        assert not tracker.get_user_data(111).is_active and not tracker.get_user_data(222).is_active
+        assert scheduler.next_deadline() is None
+
+if __name__ == "__main__":
+    test_scheduler_rearms_on_changes()
+    test_scheduler_fires_on_deadline()
+    test_failing_callback_does_not_drop_users()
+    print("\n🎉 Todos los tests del programador completados")
@@ -0,0 +1,54 @@
+"""
+Test de la revisión incremental de milestones perdidos
+"""
+import os
+import tempfile
+from unittest import mock
+from time_tracker import TimeTracker
+
+def test_changed_totals_are_tracked():
+    """Solo los usuarios cuyo total cambió quedan pendientes de revisión"""
+    print("=== Test de usuarios con total modificado ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file)
+        tracker.add_minutes(111, "Usuario1", 30)
+        tracker.add_minutes(222, "Usuario2", 30)
+
+        # Al cargar se revisan todos una vez
+        reloaded = TimeTracker(data_file)
+        assert reloaded.take_changed_totals() == {'111', '222'}
+        assert reloaded.take_changed_totals() == set()
+
+        reloaded.start_tracking(111, "Usuario1")
+        assert reloaded.take_changed_totals() == set(), "Iniciar no cambia el total"
+        reloaded.stop_tracking(111)
+        reloaded.add_minutes(222, "Usuario2", 5)
+        assert reloaded.take_changed_totals() == {'111', '222'}
+
+    print("✅ Usuarios modificados correctos")
+
+def test_batch_saves_write_once():
+    """Los guardados dentro de batch() se escriben juntos al salir"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        tracker.add_minutes(111, "Usuario1", 30)
+
+        with mock.patch.object(tracker.repository, '_prepare_write', wraps=tracker.repository._prepare_write) as write:
+            with tracker.batch():
+                tracker.add_minutes(111, "Usuario1", 5)
+                tracker.add_minutes(222, "Usuario2", 5)
+                tracker.mark_10_seconds_notified(111)
+                assert write.call_count == 0
+            assert write.call_count == 1
+            assert sorted(write.call_args[0][0]) == ['111', '222']
+
+        reloaded = TimeTracker(tracker.data_file)
+        assert reloaded.get_total_time(222) == 300
+        assert reloaded.has_notified_10_seconds(111)
+
+if __name__ == "__main__":
+    test_changed_totals_are_tracked()
+    test_batch_saves_write_once()
+    print("\n🎉 Todos los tests de revisión incremental completados")
@@ -0,0 +1,137 @@
+"""
+Test de la cola de notificaciones por canal
+"""
+import asyncio
+import os
+import tempfile
+import time
+from notification_outbox import NotificationOutbox, PersistentOutbox
+from time_tracker import TimeTracker
+
+class FakeChannel:
+    def __init__(self, fail_first=False):
+        self.sent = []
+        self.fail_first = fail_first
+
+    async def send(self, content):
+        if self.fail_first:
+            self.fail_first = False
+            raise RuntimeError("429 Too Many Requests")
+        self.sent.append((time.monotonic(), content))
+
+def test_outbox_coalesces_messages_per_channel():
+    """Los mensajes de una ráfaga salen juntos y enqueue nunca espera a Discord"""
+    print("=== Test de la cola de notificaciones ===")
+    channels = {1: FakeChannel(), 2: FakeChannel()}
+
+    async def scenario():
+        outbox = NotificationOutbox(channels.get, window=0.05, min_interval=0)
+        started = time.monotonic()
+        for i in range(10):
+            outbox.enqueue(1, f"milestone {i}")
+        outbox.enqueue(2, "pausa")
+        assert time.monotonic() - started < 0.01, "Encolar no bloquea"
+        await outbox.drain()
+        outbox.close()
+
+    asyncio.run(scenario())
+    assert len(channels[1].sent) == 1, "La ráfaga se agrupa en un solo mensaje"
+    assert channels[1].sent[0][1].split("\n\n") == [f"milestone {i}" for i in range(10)]
+    assert [content for _, content in channels[2].sent] == ["pausa"]
+
+    print("✅ Agrupación correcta")
+
+def test_outbox_splits_and_paces_sends():
+    """Los bloques respetan el límite de caracteres y el intervalo mínimo entre envíos"""
+    chunks = NotificationOutbox.coalesce(["a" * 1500, "b" * 600, "c" * 100])
+    assert [len(chunk) for chunk in chunks] == [1500, 702]
+
+    channel = FakeChannel(fail_first=True)
+
+    async def scenario():
+        outbox = NotificationOutbox({1: channel}.get, window=0, min_interval=0.1)
+        outbox.enqueue(1, "primero")
+        await outbox.drain()
+        outbox.enqueue(1, "segundo")
+        await outbox.drain()
+        outbox.enqueue(1, "tercero")
+        await outbox.drain()
+        outbox.close()
+
+    asyncio.run(scenario())
+    assert [content for _, content in channel.sent] == ["segundo", "tercero"], "Un error no detiene al worker"
+    assert channel.sent[1][0] - channel.sent[0][0] >= 0.09
+
+def test_persistent_outbox_retries_and_replays():
+    """Las notificaciones guardadas sobreviven a un fallo de envío y a un reinicio"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file)
+        tracker.add_minutes(111, "Usuario1", 60)
+        record = tracker.get_user_data(111)
+        record.mark_milestones_through(1)
+        tracker.queue_notification(111, 1, "🎉 Usuario1 ha completado 1 Hora!")
+        tracker.save_user(111)
+
+        # El envío falla: la entrada sigue guardada con el siguiente intento programado
+        failing = FakeChannel(fail_first=True)
+
+        async def first_attempt():
+            delivery = PersistentOutbox(tracker, {1: failing}.get, base_delay=30, min_interval=0)
+            assert await delivery.deliver_due() == 0
+            return delivery.next_attempt()
+
+        retry_at = asyncio.run(first_attempt())
+        assert retry_at >= time.time() + 25, "Reintento con espera"
+
+        # Tras reiniciar, la entrada pendiente y su marca de milestone se recargan juntas
+        reloaded = TimeTracker(data_file)
+        assert reloaded.get_user_data(111).is_milestone_notified(1)
+        pending = [entry for _, entry in reloaded.iter_pending_notifications()]
+        assert len(pending) == 1 and pending[0]['attempts'] == 1
+
+        channel = FakeChannel()
+
+        async def replay():
+            delivery = PersistentOutbox(reloaded, {1: channel}.get, min_interval=0)
+            assert await delivery.deliver_due(now=retry_at) == 1
+            assert await delivery.deliver_due(now=retry_at) == 0, "No se entrega dos veces"
+
+        asyncio.run(replay())
+        assert [content for _, content in channel.sent] == ["🎉 Usuario1 ha completado 1 Hora!"]
+        assert list(TimeTracker(data_file).iter_pending_notifications()) == []
+
+def test_persistent_outbox_drops_undeliverable_entries():
+    """Sin canal configurado no se guarda nada; sin canal o tras max_attempts la entrada se descarta"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        tracker.add_minutes(111, "Usuario1", 60)
+        assert tracker.queue_notification(111, None, "sin canal") is None
+        assert list(tracker.iter_pending_notifications()) == []
+
+        tracker.queue_notification(111, 1, "canal borrado")
+        tracker.queue_notification(111, 2, "siempre falla")
+        tracker.save_user(111)
+
+        class BrokenChannel:
+            async def send(self, content):
+                raise RuntimeError("403 Forbidden")
+
+        async def scenario():
+            delivery = PersistentOutbox(tracker, {2: BrokenChannel()}.get, base_delay=0, min_interval=0,
+                                        max_attempts=2)
+            await delivery.deliver_due()
+            pending = [entry['message'] for _, entry in tracker.iter_pending_notifications()]
+            assert pending == ["siempre falla"], "El canal que no existe se descarta en la primera pasada"
+            await delivery.deliver_due(now=time.time() + 1)
+            assert list(tracker.iter_pending_notifications()) == [], "Se descarta tras max_attempts"
+
+        asyncio.run(scenario())
+        assert 'outbox' not in TimeTracker(tracker.data_file).get_user_data(111)
+
+if __name__ == "__main__":
+    test_outbox_coalesces_messages_per_channel()
+    test_outbox_splits_and_paces_sends()
+    test_persistent_outbox_retries_and_replays()
+    test_persistent_outbox_drops_undeliverable_entries()
+    print("\n🎉 Todos los tests de la cola de notificaciones completados")
@@ -0,0 +1,70 @@
+"""
+Test de la vista paginada de listados
+"""
+import asyncio
+import discord
+from paginator import PaginatedView
+
+def test_pages_render_lazily_and_are_cached():
+    """Solo se renderiza la página pedida y se reutiliza mientras siga en caché"""
+    print("=== Test de paginación ===")
+    rendered = []
+
+    async def render_page(start, end):
+        rendered.append((start, end))
+        return discord.Embed(description="\n".join(str(i) for i in range(start, end)))
+
+    async def scenario():
+        view = PaginatedView(45, render_page, page_size=20, cache_ttl=60)
+        assert view.page_count == 3
+
+        first = await view.get_page(0)
+        assert rendered == [(0, 20)], "La primera respuesta solo renderiza su página"
+        assert first.footer.text.startswith("Página 1/3")
+
+        assert await view.get_page(0) is first, "Las páginas recientes salen de la caché"
+        last = await view.get_page(2)
+        assert rendered == [(0, 20), (40, 45)]
+        assert len(last.description.split("\n")) == 5
+
+        view._update_buttons()
+        assert view.previous_page.disabled and not view.next_page.disabled
+
+        view.cache_ttl = 0
+        view._pages.clear()
+        await view.get_page(1)
+        await view.get_page(1)
+        assert rendered[-2:] == [(20, 40), (20, 40)], "Una página caducada se vuelve a renderizar"
+
+    asyncio.run(scenario())
+    print("✅ Paginación correcta")
+
+def test_button_click_defers_before_rendering():
+    """Al cambiar de página se responde a la interacción antes de renderizar"""
+    events = []
+
+    async def render_page(start, end):
+        events.append('render')
+        return discord.Embed(description=f"{start}-{end}")
+
+    class FakeResponse:
+        async def defer(self):
+            events.append('defer')
+
+    class FakeInteraction:
+        response = FakeResponse()
+
+        async def edit_original_response(self, embed, view):
+            events.append(('edit', embed.description))
+
+    async def scenario():
+        view = PaginatedView(45, render_page, page_size=20)
+        await view._show(FakeInteraction(), 1)
+
+    asyncio.run(scenario())
+    assert events == ['defer', 'render', ('edit', "20-40")]
+
+if __name__ == "__main__":
+    test_pages_render_lazily_and_are_cached()
+    test_button_click_defers_before_rendering()
+    print("\n🎉 Todos los tests de paginación completados")
@@ -0,0 +1,71 @@
+"""
+Test del índice de roles por miembro
+"""
+from role_index import RoleIndex
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+
+class FakeMember:
+    def __init__(self, member_id, guild, role_ids):
+        self.id = member_id
+        self.guild = guild
+        self.roles = [FakeRole(role_id) for role_id in role_ids]
+
+class FakeGuild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+        self.members = []
+
+def test_index_follows_member_events():
+    """El índice se construye desde la caché y sigue altas, cambios y bajas"""
+    print("=== Test del índice de roles ===")
+
+    guild = FakeGuild(1)
+    guild.members = [FakeMember(10, guild, [100, 200]), FakeMember(11, guild, [200]), FakeMember(12, guild, [])]
+    index = RoleIndex()
+    assert not index.is_built(1)
+
+    index.build(guild)
+    assert index.is_built(1)
+    assert index.has_role(10, 100) and not index.has_role(11, 100)
+    assert index.members_with_role(200) == {10, 11}
+
+    # Cambio de roles (on_member_update)
+    index.update_member(FakeMember(11, guild, [100]))
+    assert index.members_with_role(100) == {10, 11}
+    assert index.members_with_role(200) == {10}
+
+    # Alta y baja de miembros
+    index.update_member(FakeMember(13, guild, [200]))
+    index.remove_member(1, 10)
+    assert index.members_with_role(100) == {11}
+    assert index.members_with_role(200) == {13}
+
+    # Rol eliminado
+    index.remove_role(100)
+    assert not index.has_role(11, 100)
+    index.update_member(FakeMember(11, guild, [200]))
+    assert index.members_with_role(200) == {11, 13}
+
+    print("✅ Índice de roles correcto")
+
+def test_forget_guild_keeps_other_guilds():
+    """Quitar un servidor no afecta a los roles de otro"""
+    first, second = FakeGuild(1), FakeGuild(2)
+    first.members = [FakeMember(10, first, [100])]
+    second.members = [FakeMember(10, second, [300])]
+    index = RoleIndex()
+    index.build(first)
+    index.build(second)
+
+    index.forget_guild(1)
+    assert not index.is_built(1) and index.is_built(2)
+    assert not index.has_role(10, 100)
+    assert index.has_role(10, 300)
+
+if __name__ == "__main__":
+    test_index_follows_member_events()
+    test_forget_guild_keeps_other_guilds()
+    print("\n🎉 Todos los tests del índice de roles completados")
@@ -0,0 +1,70 @@
+"""
+Test del reparto de servidores entre shards y procesos
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from gold_expiry import EXPIRY, GoldExpiryEngine
+from gold_tracker import GoldTracker
+from sharding import ShardOwnership, parse_shard_ids, shard_for_guild
+
+async def _noop(*args):
+    pass
+
+def test_shard_ownership_from_config_and_environment():
+    """SHARD_COUNT/SHARD_IDS sobrescriben config.json y deciden qué servidores atiende el proceso"""
+    print("=== Test de sharding ===")
+    assert parse_shard_ids("2, 0") == [0, 2]
+    assert parse_shard_ids(None) is None
+    assert shard_for_guild(5 << 22, 4) == 1
+
+    everything = ShardOwnership.from_config({'enabled': True}, environ={})
+    assert everything.bot_options() == {} and not everything.is_split
+    assert everything.owns_guild(123 << 22)
+
+    ownership = ShardOwnership.from_config({'shard_count': 2}, environ={'SHARD_IDS': '1', 'SHARD_COUNT': '4'})
+    assert ownership.bot_options() == {'shard_count': 4, 'shard_ids': [1]}
+    assert ownership.is_split
+    assert ownership.owns_guild(5 << 22) and not ownership.owns_guild(6 << 22)
+
+    print("✅ Reparto de shards correcto")
+
+def test_split_processes_require_postgres_and_primary_guild():
+    """Repartir shards entre procesos exige almacenamiento compartido y servidor principal fijo"""
+    split = ShardOwnership(4, [1])
+    assert split.split_config_error('sqlite', 123) is not None, "SQLite no relee lo que guardan otros procesos"
+    assert split.split_config_error('json', 123) is not None
+    assert split.split_config_error('postgres', None) is not None, "Cada proceso elegiría otro principal"
+    assert split.split_config_error('postgres', 123) is None
+    assert ShardOwnership(4, [0, 1, 2, 3]).split_config_error('json', None) is None
+    assert ShardOwnership().split_config_error('json', None) is None
+
+def test_gold_engine_only_schedules_owned_memberships():
+    """Cada proceso solo expira las membresías Gold de sus servidores"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = GoldTracker(os.path.join(tmp, 'gold.json'))
+        tracker.grant_gold(111, "Usuario1", 1, "Gold", 999, guild_id=5 << 22)
+        tracker.grant_gold(222, "Usuario2", 1, "Gold", 999, guild_id=6 << 22)
+        expired = (datetime.now() - timedelta(minutes=1)).isoformat()
+        for user_id in (111, 222):
+            tracker.data[str(user_id)]['expiry_date'] = expired
+            tracker.save_user(user_id)
+
+        ownership = ShardOwnership(4, [1])
+
+        async def scenario():
+            engine = GoldExpiryEngine(tracker, notify=_noop, remove_role=_noop,
+                                      owns=lambda membership: ownership.owns_guild(membership['guild_id']))
+            return engine.process_due(time.time())
+
+        events = asyncio.run(scenario())
+        assert [(kind, membership['user_id']) for kind, membership in events] == [(EXPIRY, 111)]
+        assert tracker.get_user_gold_data(222)['is_active'], "La membresía de otro proceso no se toca"
+
+if __name__ == "__main__":
+    test_shard_ownership_from_config_and_environment()
+    test_split_processes_require_postgres_and_primary_guild()
+    test_gold_engine_only_schedules_owned_memberships()
+    print("\n🎉 Todos los tests de sharding completados")
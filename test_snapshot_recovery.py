@@ -0,0 +1,84 @@
+"""
+Test de escritura atómica de snapshots y recuperación desde generaciones anteriores
+"""
+import os
+import tempfile
+from time_tracker import TimeTracker
+from gold_tracker import GoldTracker
+
+def test_generations_rotate():
+    """Cada guardado desplaza el snapshot anterior y conserva N generaciones"""
+    print("=== Test de rotación de generaciones ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, snapshot_generations=2)
+
+        for minutes in (10, 20, 30, 40):
+            tracker.add_minutes(111, "Usuario1", minutes)
+
+        existing = sorted(name for name in os.listdir(tmp))
+        print(f"   Archivos: {existing}")
+        assert existing == [
+            'user_times.json', 'user_times.json.1', 'user_times.json.1.sha256',
+            'user_times.json.2', 'user_times.json.2.sha256', 'user_times.json.sha256'
+        ]
+
+    print("✅ Rotación correcta")
+
+def test_truncated_snapshot_falls_back():
+    """Un snapshot truncado por un corte no borra los datos: se usa la generación anterior"""
+    print("=== Test de recuperación tras snapshot truncado ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file)
+        tracker.add_minutes(111, "Usuario1", 60)
+        tracker.add_minutes(222, "Usuario2", 30)
+
+        # Simular un corte a mitad de escritura del snapshot actual
+        with open(data_file, 'r+', encoding='utf-8') as f:
+            f.truncate(20)
+
+        recovered = TimeTracker(data_file)
+        assert recovered.get_user_data(111)['total_seconds'] == 3600, "Debería recuperar la generación anterior"
+        assert recovered.get_user_data(222) is None, "La generación anterior no incluye el último cambio"
+
+    print("✅ Recuperación correcta")
+
+def test_checksum_mismatch_falls_back():
+    """Un snapshot que es JSON válido pero no coincide con su checksum se descarta"""
+    print("=== Test de checksum inválido ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'gold_memberships.json')
+        tracker = GoldTracker(data_file)
+        tracker.grant_gold(111, "Usuario1", 999, "Gold", 1)
+        tracker.grant_gold(222, "Usuario2", 999, "Gold", 1)
+
+        with open(data_file, 'w', encoding='utf-8') as f:
+            f.write('{}')
+
+        recovered = GoldTracker(data_file)
+        assert recovered.get_user_gold_data(111) is not None
+        assert recovered.get_user_gold_data(222) is None
+
+    print("✅ Checksum inválido detectado")
+
+def test_legacy_file_without_checksum():
+    """Los archivos escritos antes de los checksums se siguen cargando"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        with open(data_file, 'w', encoding='utf-8') as f:
+            f.write('{"111": {"name": "Usuario1", "total_seconds": 5, "is_active": false, '
+                    '"is_paused": false, "last_start": null, "pause_start": null}}')
+
+        tracker = TimeTracker(data_file)
+        assert tracker.get_total_time(111) == 5
+
+if __name__ == "__main__":
+    test_generations_rotate()
+    test_truncated_snapshot_falls_back()
+    test_checksum_mismatch_falls_back()
+    test_legacy_file_without_checksum()
+    print("\n🎉 Todos los tests de recuperación completados")
@@ -0,0 +1,112 @@
+"""
+Test del almacenamiento SQLite de TimeTracker
+"""
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from gold_tracker import GoldTracker
+from time_tracker import TimeTracker
+
+def test_sqlite_roundtrip():
+    """Las mutaciones actualizan filas individuales y se recuperan al reabrir"""
+    print("=== Test de SQLite ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='sqlite')
+
+        tracker.start_tracking(111, "Usuario1")
+        tracker.start_tracking(222, "Usuario2")
+        tracker.pause_tracking(222)
+        tracker.add_minutes(333, "Usuario3", 20)
+        tracker.cancel_user_tracking(333)
+
+        assert not os.path.exists(data_file), "El modo SQLite no debe escribir JSON"
+        assert set(tracker.get_active_users()) == {'111'}
+        tracker.repository.close()
+
+        reloaded = TimeTracker(data_file, storage_mode='sqlite')
+        assert reloaded.get_user_data(111)['is_active'] is True
+        assert reloaded.get_pause_count(222) == 1
+        assert reloaded.get_user_data(333) is None
+        assert sorted(reloaded.repository.store.select_ids('is_paused = 1')) == ['222']
+        reloaded.repository.close()
+
+    print("✅ SQLite correcto")
+
+def test_sqlite_imports_existing_json():
+    """La primera vez se importa el archivo JSON existente"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        TimeTracker(data_file).add_minutes(111, "Usuario1", 45)
+
+        tracker = TimeTracker(data_file, storage_mode='sqlite')
+        assert tracker.get_total_time(111) == 2700
+        assert not tracker.repository.store.is_empty()
+        tracker.repository.close()
+
+def test_sqlite_cleanup_uses_index():
+    """La limpieza de inactivos elimina solo usuarios detenidos hace más del umbral"""
+    print("=== Test de limpieza de inactivos con SQLite ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='sqlite')
+
+        old_start = (datetime.now() - timedelta(days=45)).isoformat()
+        recent_start = (datetime.now() - timedelta(days=2)).isoformat()
+        for user_id, last_start in ((111, old_start), (222, recent_start)):
+            tracker.add_minutes(user_id, f"Usuario{user_id}", 10)
+            tracker.data[str(user_id)]['last_start'] = last_start
+            tracker.save_user(user_id)
+
+        removed = tracker.cleanup_inactive_users(30)
+        print(f"   Usuarios eliminados: {removed}")
+        assert removed == 1
+        assert tracker.get_user_data(111) is None
+        assert tracker.get_user_data(222) is not None
+
+        conn = sqlite3.connect(tracker.repository.store.db_path)
+        remaining = [row[0] for row in conn.execute('SELECT user_id FROM user_times')]
+        conn.close()
+        assert remaining == ['222']
+        tracker.repository.close()
+
+    print("✅ Limpieza por índice correcta")
+
+def test_sqlite_write_behind_queries_see_pending_changes():
+    """Con write-behind las consultas por índice incluyen los cambios aún no escritos"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='sqlite', write_behind=True)
+
+        tracker.start_tracking(111, "Usuario1")
+        assert set(tracker.get_active_users()) == {'111'}
+        assert tracker.repository.store.select_ids('is_active = 1 AND is_paused = 0') == []
+
+        tracker.flush()
+        assert tracker.repository.store.select_ids('is_active = 1 AND is_paused = 0') == ['111']
+        tracker.repository.close()
+
+def test_gold_tracker_selects_storage_mode():
+    """GoldTracker elige el almacenamiento igual que TimeTracker"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'gold_memberships.json')
+        for mode in ('sqlite', 'journal'):
+            tracker = GoldTracker(data_file, storage_mode=mode)
+            tracker.grant_gold(111, "Usuario1", 1, "Gold", 999)
+            tracker.repository.close()
+            reloaded = GoldTracker(data_file, storage_mode=mode)
+            assert reloaded.is_gold_active(111), mode
+            reloaded.repository.close()
+        assert os.path.exists(os.path.join(tmp, 'gold_memberships.db'))
+        assert not os.path.exists(data_file), "Ni SQLite ni el diario sin compactar escriben el JSON"
+
+if __name__ == "__main__":
+    test_sqlite_roundtrip()
+    test_sqlite_imports_existing_json()
+    test_sqlite_cleanup_uses_index()
+    test_sqlite_write_behind_queries_see_pending_changes()
+    test_gold_tracker_selects_storage_mode()
+    print("\n🎉 Todos los tests de SQLite completados")
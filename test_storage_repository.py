@@ -0,0 +1,79 @@
+"""
+Test de la interfaz común de repositorios (JSON, diario y SQLite)
+"""
+import os
+import tempfile
+from gold_tracker import GoldTracker
+from storage import JournalRepository, JsonRepository, SQLiteRepository, repository_from_config
+from time_tracker import TimeTracker
+
+def _repositories(tmp):
+    """Un repositorio de cada tipo sobre archivos temporales"""
+    return [
+        JsonRepository(os.path.join(tmp, 'json.json')),
+        JournalRepository(os.path.join(tmp, 'journal.json')),
+        SQLiteRepository(os.path.join(tmp, 'data.db'), 'records', {'is_active': 'BOOLEAN'}),
+    ]
+
+def _reopen(repository, tmp):
+    if isinstance(repository, JsonRepository):
+        return JsonRepository(repository.path)
+    if isinstance(repository, JournalRepository):
+        return JournalRepository(repository.journal.snapshot_file)
+    return SQLiteRepository(os.path.join(tmp, 'data.db'), 'records', {'is_active': 'BOOLEAN'})
+
+def test_repository_roundtrip():
+    """put, delete, batch_update y scan se comportan igual en todos los backends"""
+    print("=== Test de repositorios ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for repository in _repositories(tmp):
+            name = type(repository).__name__
+            repository.load()
+            repository.put('1', {'is_active': True})
+            repository.put('2', {'is_active': False})
+            repository.put('3', {'is_active': True})
+            repository.delete('3')
+
+            repository.data['2']['is_active'] = True
+            repository.data['4'] = {'is_active': False}
+            assert repository.batch_update(['2', '4']), name
+
+            active = repository.scan(lambda record: record['is_active'], index={'is_active': True})
+            assert set(active) == {'1', '2'}, f"{name}: {sorted(active)}"
+            repository.close()
+
+            reopened = _reopen(repository, tmp)
+            reopened.load()
+            assert set(reopened.get_all()) == {'1', '2', '4'}, name
+            assert reopened.get('2') == {'is_active': True}, name
+            reopened.close()
+            print(f"   {name}: correcto")
+
+    print("✅ Repositorios correctos")
+
+def test_repository_from_config():
+    """Ambos trackers usan el backend elegido en la sección storage"""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage_config = {'mode': 'sqlite', 'sqlite_path': os.path.join(tmp, 'bot.db')}
+        time_tracker = TimeTracker(repository=repository_from_config(
+            storage_config, os.path.join(tmp, 'user_times.json'), 'user_times', TimeTracker.INDEXED_FIELDS))
+        gold_tracker = GoldTracker(repository=repository_from_config(
+            storage_config, os.path.join(tmp, 'gold.json'), 'gold_memberships', GoldTracker.INDEXED_FIELDS))
+
+        assert isinstance(time_tracker.repository, SQLiteRepository)
+        assert isinstance(gold_tracker.repository, SQLiteRepository)
+
+        time_tracker.start_tracking(111, "Usuario1")
+        gold_tracker.grant_gold(111, "Usuario1", 1, "Gold", 999)
+        assert set(time_tracker.get_active_users()) == {'111'}
+        assert '111' in gold_tracker.get_all_active_memberships()
+        assert not os.path.exists(os.path.join(tmp, 'gold.json'))
+
+        time_tracker.repository.close()
+        gold_tracker.repository.close()
+
+if __name__ == "__main__":
+    test_repository_roundtrip()
+    test_repository_from_config()
+    print("\n🎉 Todos los tests de repositorios completados")
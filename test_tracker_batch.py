@@ -0,0 +1,108 @@
+"""
+Test de las transacciones de TimeTracker (batch)
+"""
+import asyncio
+import os
+import tempfile
+from unittest import mock
+from async_time_tracker import AsyncTimeTracker
+from time_tracker import TimeTracker
+
+def test_batch_writes_once():
+    """Las mutaciones de un batch (y de los batch anidados) se escriben juntas al salir"""
+    print("=== Test de batch() ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        tracker.start_tracking(111, "Usuario1")
+
+        with mock.patch.object(tracker.repository, '_prepare_write', wraps=tracker.repository._prepare_write) as write:
+            with tracker.batch():
+                user_data = tracker.get_user_data(111)
+                user_data.mark_milestones_through(1)
+                tracker.queue_notification(111, 1, "mensaje")
+                tracker.save_user(111)
+                with tracker.batch():
+                    tracker.stop_tracking(111)
+                    tracker.add_minutes(222, "Usuario2", 5)
+                assert write.call_count == 0, "El batch anidado se une al exterior"
+            assert write.call_count == 1
+            assert sorted(write.call_args[0][0]) == ['111', '222']
+
+        reloaded = TimeTracker(tracker.data_file)
+        assert not reloaded.get_user_data(111).is_active
+        assert reloaded.get_user_data(111).is_milestone_notified(1)
+        assert len(list(reloaded.iter_pending_notifications())) == 1
+    print("✅ Una sola escritura por batch")
+
+def test_batch_rolls_back_on_error():
+    """Si el bloque falla no se escribe nada y la memoria vuelve al estado anterior"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        tracker.start_tracking(111, "Usuario1")
+        tracker.add_minutes(333, "Usuario3", 10)
+        tracker.take_changed_totals()
+        notified = []
+        tracker.add_listener(notified.append)
+
+        with mock.patch.object(tracker.repository, '_prepare_write', wraps=tracker.repository._prepare_write) as write:
+            try:
+                with tracker.batch():
+                    tracker.pause_tracking(111)
+                    tracker.get_user_data(111)['milestone_completed'] = True
+                    tracker.add_minutes(222, "Usuario2", 5)
+                    tracker.cancel_user_tracking(333)
+                    raise RuntimeError("fallo a mitad")
+            except RuntimeError:
+                pass
+            assert write.call_count == 0, "Nada se escribe si el batch falla"
+
+        record = tracker.get_user_data(111)
+        assert record.is_active and not record.is_paused and record.pause_count == 0
+        assert 'milestone_completed' not in record, "También se deshacen los cambios directos al registro"
+        assert tracker.get_user_data(222) is None
+        assert tracker.get_total_time(333) == 600
+        assert [user_id for user_id, _ in tracker.iter_active()] == ['111'] and not list(tracker.iter_paused())
+        assert {'111', '222', '333'} <= tracker.take_changed_totals()
+        assert {'111', '222', '333'} <= set(notified)
+
+        # El batch siguiente funciona con normalidad
+        with tracker.batch():
+            tracker.pause_tracking(111)
+        assert TimeTracker(tracker.data_file).get_user_data(111).is_paused
+    print("✅ Batch deshecho ante un error")
+
+def test_async_batch_takes_user_locks():
+    """La versión async toma los locks de los usuarios y aplica la operación como transacción"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        facade = AsyncTimeTracker(tracker)
+
+        def transfer(time_tracker):
+            assert facade.is_locked(1) and facade.is_locked(2)
+            time_tracker.add_minutes(1, "Usuario1", 10)
+            time_tracker.subtract_minutes(2, 10)
+            return time_tracker.get_total_time(1)
+
+        def failing(time_tracker):
+            time_tracker.add_minutes(1, "Usuario1", 10)
+            raise ValueError("fallo")
+
+        async def scenario():
+            await facade.add_minutes(2, "Usuario2", 30)
+            assert await facade.batch([2, 1, 2], transfer) == 600
+            try:
+                await facade.batch([1], failing)
+            except ValueError:
+                pass
+            assert not facade.is_locked(1) and not facade.is_locked(2)
+
+        asyncio.run(scenario())
+        reloaded = TimeTracker(tracker.data_file)
+        assert reloaded.get_total_time(1) == 600 and reloaded.get_total_time(2) == 1200
+        assert tracker.get_total_time(1) == 600
+
+if __name__ == "__main__":
+    test_batch_writes_once()
+    test_batch_rolls_back_on_error()
+    test_async_batch_takes_user_locks()
+    print("\n🎉 Todos los tests de transacciones completados")
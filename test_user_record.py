@@ -0,0 +1,111 @@
+"""
+Test del registro tipado de usuario (UserRecord)
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from time_tracker import TimeTracker
+from user_record import UserRecord
+
+def test_user_record_roundtrip():
+    """La forma JSON se conserva al convertir en ambos sentidos"""
+    print("=== Test de UserRecord ===")
+
+    started = datetime.now().replace(microsecond=0)
+    data = {
+        'name': 'Usuario1',
+        'total_seconds': 120,
+        'is_active': True,
+        'is_paused': False,
+        'last_start': started.isoformat(),
+        'pause_start': None,
+        'notified_10_seconds': False,
+        'pause_count': 2,
+        'milestone_hwm': 1,
+        'milestone_bits': 0,
+        'milestone_completed': True
+    }
+    record = UserRecord.from_dict(data)
+
+    assert isinstance(record.last_start, float)
+    assert record.last_start == started.timestamp()
+    assert record.pause_count == 2
+    assert record['notified_milestones'] == [3600]
+    assert record['milestone_completed'] is True
+    assert record['last_start'] == started.isoformat()
+    assert record.to_dict() == data
+    assert not hasattr(record, '__dict__'), "UserRecord debe usar __slots__"
+
+    print("✅ UserRecord correcto")
+
+def test_milestones_high_water_mark():
+    """Los milestones se guardan como high-water mark + bitset y se migran desde la lista"""
+    print("=== Test de milestones compactos ===")
+
+    record = UserRecord.from_dict({'name': 'Usuario1', 'notified_milestones': [3600, 7200, 18000]})
+    assert 'notified_milestones' not in record.to_dict(), "La lista antigua debe migrarse"
+    assert record.milestone_hwm == 2
+    assert record.is_milestone_notified(5) and not record.is_milestone_notified(3)
+    assert record.highest_pending_milestone(2) is None
+    assert record.highest_pending_milestone(5) == 4
+    assert record.highest_pending_milestone(7) == 7
+
+    record.mark_milestone_notified(3)
+    record.mark_milestone_notified(4)
+    assert (record.milestone_hwm, record.milestone_bits) == (5, 0)
+
+    record.mark_milestones_through(500)
+    assert record.to_dict()['milestone_hwm'] == 500
+    assert record.to_dict()['milestone_bits'] == 0
+    assert record.highest_pending_milestone(500) is None
+
+    print("✅ Milestones compactos correctos")
+
+def test_tracker_persists_json_shape():
+    """El tracker trabaja con epoch en memoria y guarda cadenas ISO"""
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file)
+
+        before = time.time()
+        tracker.start_tracking(111, "Usuario1")
+        record = tracker.get_user_data(111)
+        assert isinstance(record, UserRecord)
+        assert record.last_start >= before
+
+        with open(data_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        assert abs(datetime.fromisoformat(saved['111']['last_start']).timestamp() - record.last_start) < 1e-3
+
+        tracker.pause_tracking(111)
+        assert tracker.get_pause_count(111) == 1
+        assert tracker.get_session_time(111) >= 0
+
+        reloaded = TimeTracker(data_file)
+        assert abs(reloaded.get_user_data(111).pause_start - record.pause_start) < 1e-3
+
+def test_tracker_accepts_plain_dicts():
+    """Los registros asignados como dict se convierten a UserRecord"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tracker = TimeTracker(os.path.join(tmp, 'user_times.json'))
+        tracker.data['222'] = {
+            'name': 'Usuario2',
+            'total_seconds': 60,
+            'is_active': False,
+            'is_paused': False,
+            'last_start': None,
+            'pause_start': None
+        }
+
+        assert isinstance(tracker.data['222'], UserRecord)
+        assert tracker.start_tracking(222, "Usuario2")
+        assert tracker.get_total_time(222) >= 60
+
+if __name__ == "__main__":
+    test_user_record_roundtrip()
+    test_milestones_high_water_mark()
+    test_tracker_persists_json_shape()
+    test_tracker_accepts_plain_dicts()
+    print("\n🎉 Todos los tests de UserRecord completados")
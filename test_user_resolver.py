@@ -0,0 +1,76 @@
+"""
+Test del resolvedor de usuarios con caché
+"""
+import asyncio
+from user_resolver import UserResolver
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.mention = f"<@{user_id}>"
+
+class FakeGuild:
+    def __init__(self, member_ids):
+        self.members = {user_id: FakeUser(user_id) for user_id in member_ids}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+class FakeClient:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.fetched = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get_user(self, user_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        self.fetched.append(user_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if user_id in self.missing:
+            raise LookupError("Unknown User")
+        return FakeUser(user_id)
+
+def test_resolver_uses_caches_before_fetching():
+    """Solo se piden a la API los usuarios fuera de caché, con concurrencia limitada"""
+    print("=== Test del resolvedor de usuarios ===")
+
+    client = FakeClient(missing={99})
+    resolver = UserResolver(client, ttl=600, max_size=100, max_concurrency=3)
+    guild = FakeGuild(member_ids=[1, 2])
+    user_ids = [1, 2] + list(range(10, 20)) + [99]
+
+    users = asyncio.run(resolver.resolve_many(user_ids, guild))
+    assert users[1] is guild.members[1], "Los miembros del servidor no se piden a la API"
+    assert users[10].mention == "<@10>"
+    assert users[99] is None, "Un usuario inexistente se devuelve como None"
+    assert sorted(client.fetched) == list(range(10, 20)) + [99]
+    assert client.max_in_flight <= 3
+
+    # Segunda pasada: todo sale de caché, incluido el usuario inexistente
+    client.fetched.clear()
+    asyncio.run(resolver.resolve_many(user_ids, guild))
+    assert client.fetched == []
+
+    print("✅ Resolución con caché correcta")
+
+def test_resolver_cache_expires_and_evicts():
+    """Las entradas caducan tras el TTL y la caché no supera max_size"""
+    client = FakeClient()
+    resolver = UserResolver(client, ttl=0, max_size=2)
+    asyncio.run(resolver.resolve_many([1, 2, 3]))
+    assert list(resolver._cache) == [2, 3], "Se descarta el menos usado"
+
+    client.fetched.clear()
+    asyncio.run(resolver.resolve_many([3]))
+    assert client.fetched == [3], "Una entrada caducada se vuelve a pedir"
+
+if __name__ == "__main__":
+    test_resolver_uses_caches_before_fetching()
+    test_resolver_cache_expires_and_evicts()
+    print("\n🎉 Todos los tests del resolvedor completados")
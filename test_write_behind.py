@@ -0,0 +1,86 @@
+"""
+Test del modo de escritura diferida (write-behind) de los trackers
+"""
+import json
+import os
+import tempfile
+from time_tracker import TimeTracker
+from gold_tracker import GoldTracker
+
+def test_time_tracker_write_behind():
+    """Las mutaciones solo marcan cambios pendientes hasta el flush"""
+    print("=== Test write-behind de TimeTracker ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, write_behind=True)
+
+        tracker.start_tracking(111, "Usuario1")
+        tracker.pause_tracking(111)
+        tracker.add_minutes(222, "Usuario2", 15)
+
+        assert not os.path.exists(data_file), "No debería escribirse nada antes del flush"
+        assert tracker.is_dirty(), "Deberían existir cambios pendientes"
+
+        assert tracker.flush(), "El flush debería completarse"
+        assert not tracker.is_dirty()
+        with open(data_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        print(f"   Usuarios guardados en un solo flush: {len(saved)}")
+        assert saved['111']['pause_count'] == 1
+        assert saved['222']['total_seconds'] == 900
+
+        # Sin cambios nuevos no hay nada que escribir
+        assert tracker.prepare_flush() is None
+
+    print("✅ Write-behind de TimeTracker correcto")
+
+def test_journal_write_behind():
+    """En modo diario el flush anexa un evento por usuario modificado"""
+    print("=== Test write-behind con diario ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'user_times.json')
+        tracker = TimeTracker(data_file, storage_mode='journal', write_behind=True)
+
+        tracker.add_minutes(111, "Usuario1", 5)
+        tracker.add_minutes(111, "Usuario1", 5)
+        tracker.add_minutes(111, "Usuario1", 5)
+        tracker.add_minutes(222, "Usuario2", 5)
+        tracker.cancel_user_tracking(222)
+        tracker.flush()
+        tracker.repository.close()
+
+        with open(data_file + '.log', 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 2, f"Se esperaban 2 eventos coalescidos, hay {len(lines)}"
+
+        reloaded = TimeTracker(data_file, storage_mode='journal')
+        assert reloaded.get_user_data(111)['total_seconds'] == 900
+        assert reloaded.get_user_data(222) is None
+        reloaded.repository.close()
+
+    print("✅ Write-behind con diario correcto")
+
+def test_gold_tracker_write_behind():
+    """GoldTracker también difiere la escritura hasta el flush"""
+    print("=== Test write-behind de GoldTracker ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, 'gold_memberships.json')
+        tracker = GoldTracker(data_file, write_behind=True)
+
+        tracker.grant_gold(111, "Usuario1", 999, "Gold", 1)
+        assert not os.path.exists(data_file)
+
+        tracker.flush()
+        reloaded = GoldTracker(data_file)
+        assert reloaded.is_gold_active(111)
+
+    print("✅ Write-behind de GoldTracker correcto")
+
+if __name__ == "__main__":
+    test_time_tracker_write_behind()
+    test_journal_write_behind()
+    test_gold_tracker_write_behind()
+    print("\n🎉 Todos los tests de write-behind completados")
@@ -1,196 +1,464 @@
-import json
-import os
+import time
+import uuid
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+from storage import Repository, create_repository
+from user_record import UserRecord
 
 class TimeTracker:
-    def __init__(self, data_file: str = 'user_times.json'):
+    # Campos del registro que los backends con índices (SQLite/PostgreSQL) guardan como columnas
+    INDEXED_FIELDS = {'is_active': 'BOOLEAN', 'is_paused': 'BOOLEAN', 'last_start': 'TEXT'}
+
+    def __init__(self, data_file: str = 'user_times.json', storage_mode: str = 'json',
+                 journal_compact_threshold: int = 500, write_behind: bool = False,
+                 snapshot_generations: int = 3, sqlite_path: Optional[str] = None,
+                 postgres_dsn: Optional[str] = None, postgres_pool_size: int = 5,
+                 repository: Optional[Repository] = None):
         self.data_file = data_file
-        self.data = self.load_data()
+        self.storage_mode = storage_mode
+        if repository is None:
+            repository = create_repository(
+                storage_mode, data_file, 'user_times', self.INDEXED_FIELDS,
+                write_behind=write_behind,
+                snapshot_generations=snapshot_generations,
+                journal_compact_threshold=journal_compact_threshold,
+                sqlite_path=sqlite_path,
+                postgres_dsn=postgres_dsn,
+                postgres_pool_size=postgres_pool_size
+            )
+        # El repositorio decide cómo y cuándo se persisten los registros
+        self.repository = repository
+        # En memoria cada usuario es un UserRecord; el JSON solo existe al persistir
+        self.repository.record_class = UserRecord
+        # Funciones a notificar cuando cambia un usuario (None: cambiaron todos)
+        self._listeners = []
+        # Índices en memoria: usuarios con sesión corriendo y usuarios pausados
+        self._active_ids = set()
+        self._paused_ids = set()
+        # Usuarios con notificaciones pendientes de entrega en su registro
+        self._outbox_ids = set()
+        # Usuarios cuyo total cambió desde la última revisión de milestones perdidos
+        self._totals_changed = set()
+        # Claves cuyo guardado se difiere hasta el final de batch() (y si hay que reescribir todo)
+        self._deferred = None
+        self._deferred_all = False
+        # Estado de cada usuario antes de su primera modificación dentro de batch() (None: no existía)
+        self._batch = None
+        # Usuarios ya escritos dentro de batch() en almacenamiento compartido (no se difieren)
+        self._batch_written = set()
+        self.load_data()
+    
+    @property
+    def data(self) -> Dict:
+        return self.repository.data
+    
+    @data.setter
+    def data(self, value: Dict):
+        self.repository.data = value
+    
+    @property
+    def write_behind(self) -> bool:
+        return self.repository.write_behind
     
     def load_data(self) -> Dict:
-        """Cargar datos desde el archivo JSON"""
-        try:
-            if os.path.exists(self.data_file):
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            return {}
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Error al cargar datos: {e}")
-            return {}
+        """Cargar datos desde el almacenamiento configurado"""
+        data = self.repository.load()
+        self._rebuild_index()
+        self._totals_changed = set(data)
+        return data
+    
+    def _index_user(self, user_id_str: str):
+        """Actualizar los índices de activos/pausados para un usuario"""
+        record = self.data.get(user_id_str)
+        self._active_ids.discard(user_id_str)
+        self._paused_ids.discard(user_id_str)
+        self._outbox_ids.discard(user_id_str)
+        if record is not None and record.is_active:
+            if record.is_paused:
+                self._paused_ids.add(user_id_str)
+            else:
+                self._active_ids.add(user_id_str)
+        if record is not None and record.extra.get('outbox'):
+            self._outbox_ids.add(user_id_str)
+    
+    def _rebuild_index(self):
+        self._active_ids = set()
+        self._paused_ids = set()
+        self._outbox_ids = set()
+        for user_id_str in self.data:
+            self._index_user(user_id_str)
+    
+    def _locked_user(self, user_id_str: str):
+        """Serializar una mutación de un usuario con otros procesos (solo PostgreSQL)"""
+        return self.repository.locked(user_id_str)
+    
+    def add_listener(self, callback: Callable[[Optional[str]], None]):
+        """Registrar una función que recibe el ID del usuario modificado (o None si cambiaron todos)"""
+        self._listeners.append(callback)
+    
+    def _notify(self, user_id_str: Optional[str]):
+        for callback in self._listeners:
+            callback(user_id_str)
     
     def save_data(self) -> bool:
-        """Guardar datos al archivo JSON"""
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+        """Guardar todos los datos"""
+        if self._deferred is not None:
+            self._deferred_all = True
+            success = True
+        else:
+            if self._batch is not None:
+                self._batch_written.update(self._batch)
+                self._batch_written.update(self.data)
+            success = self.repository.save_all()
+        self._rebuild_index()
+        self._totals_changed = set(self.data)
+        self._notify(None)
+        return success
+    
+    def save_user(self, user_id: int) -> bool:
+        """Persistir solo el registro de un usuario (en modo JSON reescribe el archivo)"""
+        user_id_str = str(user_id)
+        self._touch(user_id_str)
+        success = self._persist([user_id_str])
+        self._index_user(user_id_str)
+        self._notify(user_id_str)
+        return success
+    
+    def _persist(self, user_id_strs: Iterable[str]) -> bool:
+        if self._deferred is not None:
+            self._deferred.update(user_id_strs)
             return True
-        except IOError as e:
-            print(f"Error al guardar datos: {e}")
+        if self._batch is not None:
+            self._batch_written.update(user_id_strs)
+        return self.repository.batch_update(user_id_strs)
+    
+    def _touch(self, user_id_str: str):
+        """Dentro de batch(), recordar el estado del usuario antes de modificarlo por primera vez"""
+        if self._batch is not None and user_id_str not in self._batch:
+            record = self.data.get(user_id_str)
+            self._batch[user_id_str] = UserRecord.from_dict(record.to_dict()) if record is not None else None
+    
+    def _touch_all(self):
+        if self._batch is not None:
+            for user_id_str in list(self.data):
+                self._touch(user_id_str)
+    
+    @contextmanager
+    def batch(self):
+        """Aplicar todas las mutaciones del bloque como una transacción.
+        
+        Los guardados se acumulan y se persisten en una sola escritura al salir;
+        si el bloque lanza una excepción no se escribe nada y los usuarios
+        modificados (también los registros obtenidos con get_user_data() y
+        modificados directamente) vuelven a su estado anterior. Un batch()
+        dentro de otro se une al exterior. El bloque no debe hacer ``await``:
+        otras corrutinas quedarían dentro de la misma transacción.
+        
+        En PostgreSQL cada mutación se sigue escribiendo en su propia
+        transacción con el registro bloqueado; al deshacer se reescribe el
+        estado anterior solo de los usuarios que el batch llegó a escribir (no
+        de los que únicamente leyó, que otros procesos pueden haber cambiado).
+        """
+        if self._batch is not None:
+            yield self
+            return
+        
+        self._batch = {}
+        self._batch_written = set()
+        if not self.repository.shared:
+            self._deferred, self._deferred_all = set(), False
+        try:
+            yield self
+        except BaseException:
+            snapshots, written = self._batch, self._batch_written
+            self._batch, self._batch_written, self._deferred, self._deferred_all = None, set(), None, False
+            self._rollback(snapshots, written)
+            raise
+        keys, save_all = self._deferred, self._deferred_all
+        self._batch, self._batch_written, self._deferred, self._deferred_all = None, set(), None, False
+        if save_all:
+            self.repository.save_all()
+        elif keys:
+            self.repository.batch_update(keys)
+    
+    def _rollback(self, snapshots: Dict[str, Optional[UserRecord]], written: Set[str]):
+        """Devolver a su estado anterior los usuarios modificados en un batch() que falló"""
+        for user_id_str, record in snapshots.items():
+            if record is None:
+                self.data.pop(user_id_str, None)
+            else:
+                self.data[user_id_str] = record
+        if written:
+            # En almacenamiento compartido esas mutaciones ya se escribieron: volver a escribir su estado anterior
+            self.repository.batch_update(sorted(written))
+        self._totals_changed.update(snapshots)
+        for user_id_str in snapshots:
+            self._index_user(user_id_str)
+            self._notify(user_id_str)
+    
+    def _mark_total_changed(self, user_id_str: str):
+        self._totals_changed.add(user_id_str)
+    
+    def mark_totals_changed(self, user_id_strs: Iterable[str]):
+        """Volver a marcar usuarios para la próxima llamada a take_changed_totals()"""
+        self._totals_changed.update(user_id_strs)
+    
+    def take_changed_totals(self) -> Set[str]:
+        """Devolver y vaciar los usuarios cuyo total cambió desde la llamada anterior"""
+        if self.repository.shared:
+            # Otros procesos también modifican totales: revisar todos
+            changed = set(self.get_all_tracked_users())
+        else:
+            changed = self._totals_changed
+        self._totals_changed = set()
+        return changed
+    
+    def is_dirty(self) -> bool:
+        """Indicar si hay cambios pendientes de escribir"""
+        return self.repository.is_dirty()
+    
+    def prepare_flush(self) -> Optional[Callable[[], bool]]:
+        """Tomar los cambios pendientes; devuelve la escritura a ejecutar fuera del event loop"""
+        return self.repository.prepare_flush()
+    
+    def flush(self) -> bool:
+        """Escribir de inmediato los cambios pendientes (por ejemplo al apagar el bot)"""
+        return self.repository.flush()
+    
+    def compact_storage(self) -> bool:
+        """Ejecutar el mantenimiento del almacenamiento (compactar el diario) si hace falta"""
+        writer = self.repository.prepare_maintenance()
+        if writer is None:
             return False
+        return writer()
     
-    def start_tracking(self, user_id: int, user_name: str) -> bool:
-        """Iniciar el seguimiento de tiempo para un usuario"""
+    def queue_notification(self, user_id: int, channel_id: Optional[int], message: str) -> Optional[str]:
+        """Agregar una notificación pendiente al registro del usuario.
+        
+        No guarda: se persiste con el siguiente save_user(), en la misma escritura
+        que el cambio de estado que la produjo. Devuelve el ID de la entrada (None
+        si no hay canal configurado o el usuario no existe).
+        """
+        if channel_id is None:
+            print(f"❌ Canal de notificaciones no configurado, notificación para {user_id} descartada")
+            return None
         user_id_str = str(user_id)
-        current_time = datetime.now().isoformat()
-        
-        if user_id_str not in self.data:
-            self.data[user_id_str] = {
-                'name': user_name,
-                'total_seconds': 0,
-                'is_active': False,
-                'is_paused': False,
-                'last_start': None,
-                'pause_start': None,
-                'notified_10_seconds': False,
-                'pause_count': 0
-            }
-        
-        # Si ya está activo, no hacer nada
-        if self.data[user_id_str]['is_active'] and not self.data[user_id_str]['is_paused']:
+        self._touch(user_id_str)
+        record = self.data.get(user_id_str)
+        if record is None:
+            return None
+        
+        entry_id = uuid.uuid4().hex
+        record.extra.setdefault('outbox', []).append({
+            'id': entry_id,
+            'channel_id': channel_id,
+            'message': message,
+            'attempts': 0,
+            'next_attempt': time.time()
+        })
+        self._outbox_ids.add(user_id_str)
+        return entry_id
+    
+    def iter_pending_notifications(self) -> Iterator[Tuple[str, Dict]]:
+        """Recorrer las notificaciones pendientes como ``(user_id, entrada)``"""
+        if self.repository.shared:
+            records = self.repository.scan(lambda record: bool(record.get('outbox'))).items()
+        else:
+            records = ((user_id_str, self.data.get(user_id_str)) for user_id_str in list(self._outbox_ids))
+        for user_id_str, record in records:
+            if record is None:
+                continue
+            for entry in list(record.get('outbox') or []):
+                yield user_id_str, entry
+    
+    def complete_notification(self, user_id_str: str, entry_id: str) -> bool:
+        """Quitar una notificación entregada del registro"""
+        with self._locked_user(user_id_str):
+            self._touch(user_id_str)
+            record = self.data.get(user_id_str)
+            if record is None or not record.extra.get('outbox'):
+                return False
+            
+            record.extra['outbox'] = [entry for entry in record.extra['outbox'] if entry['id'] != entry_id]
+            if not record.extra['outbox']:
+                del record.extra['outbox']
+            return self.save_user(int(user_id_str))
+    
+    def retry_notification(self, user_id_str: str, entry_id: str, next_attempt: float) -> bool:
+        """Registrar un intento fallido y programar el siguiente"""
+        with self._locked_user(user_id_str):
+            self._touch(user_id_str)
+            record = self.data.get(user_id_str)
+            if record is None:
+                return False
+            
+            for entry in record.extra.get('outbox', []):
+                if entry['id'] == entry_id:
+                    entry['attempts'] += 1
+                    entry['next_attempt'] = next_attempt
+                    return self.save_user(int(user_id_str))
             return False
-        
-        # Si estaba pausado, reanudar
-        if self.data[user_id_str]['is_paused']:
-            return self.resume_tracking(user_id)
-        
-        # Iniciar nuevo seguimiento
-        self.data[user_id_str]['is_active'] = True
-        self.data[user_id_str]['is_paused'] = False
-        self.data[user_id_str]['last_start'] = current_time
-        self.data[user_id_str]['name'] = user_name  # Actualizar nombre por si cambió
-        
-        return self.save_data()
+    
+    def start_tracking(self, user_id: int, user_name: str) -> bool:
+        """Iniciar el seguimiento de tiempo para un usuario"""
+        with self._locked_user(str(user_id)):
+            user_id_str = str(user_id)
+            self._touch(user_id_str)
+            
+            if user_id_str not in self.data:
+                self.data[user_id_str] = UserRecord(name=user_name)
+            record = self.data[user_id_str]
+            
+            # Si ya está activo, no hacer nada
+            if record.is_active and not record.is_paused:
+                return False
+            
+            # Si estaba pausado, reanudar
+            if record.is_paused:
+                return self.resume_tracking(user_id)
+            
+            # Iniciar nuevo seguimiento
+            record.is_active = True
+            record.is_paused = False
+            record.last_start = time.time()
+            record.name = user_name  # Actualizar nombre por si cambió
+            
+            return self.save_user(user_id)
     
     def pause_tracking(self, user_id: int) -> bool:
         """Pausar el seguimiento de tiempo para un usuario"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data or not self.data[user_id_str]['is_active']:
-            return False
-        
-        if self.data[user_id_str]['is_paused']:
-            return False
-        
-        # Calcular tiempo transcurrido y agregarlo al total
-        if self.data[user_id_str]['last_start']:
-            start_time = datetime.fromisoformat(self.data[user_id_str]['last_start'])
-            elapsed_seconds = (datetime.now() - start_time).total_seconds()
-            self.data[user_id_str]['total_seconds'] += elapsed_seconds
-        
-        # Marcar como pausado e incrementar contador de pausas
-        self.data[user_id_str]['is_paused'] = True
-        self.data[user_id_str]['pause_start'] = datetime.now().isoformat()
-        
-        # Incrementar contador de pausas
-        self.data[user_id_str]['pause_count'] = self.data[user_id_str].get('pause_count', 0) + 1
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            self._touch(str(user_id))
+            record = self.data.get(str(user_id))
+            
+            if record is None or not record.is_active:
+                return False
+            
+            if record.is_paused:
+                return False
+            
+            # Calcular tiempo transcurrido y agregarlo al total
+            now = time.time()
+            if record.last_start is not None:
+                record.total_seconds += now - record.last_start
+            
+            # Marcar como pausado e incrementar contador de pausas
+            record.is_paused = True
+            record.pause_start = now
+            record.pause_count += 1
+            
+            self._mark_total_changed(str(user_id))
+            return self.save_user(user_id)
     
     def get_paused_duration(self, user_id: int) -> float:
         """Obtener la duración que el usuario ha estado pausado en segundos"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data or not self.data[user_id_str]['is_paused']:
-            return 0.0
+        record = self.data.get(str(user_id))
         
-        pause_start_str = self.data[user_id_str].get('pause_start')
-        if not pause_start_str:
+        if record is None or not record.is_paused or record.pause_start is None:
             return 0.0
         
-        pause_start = datetime.fromisoformat(pause_start_str)
-        return (datetime.now() - pause_start).total_seconds()
+        return time.time() - record.pause_start
 
     def resume_tracking(self, user_id: int) -> bool:
         """Reanudar el seguimiento de tiempo para un usuario"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data or not self.data[user_id_str]['is_active']:
-            return False
-        
-        if not self.data[user_id_str]['is_paused']:
-            return False
-        
-        # Reanudar seguimiento
-        self.data[user_id_str]['is_paused'] = False
-        self.data[user_id_str]['last_start'] = datetime.now().isoformat()
-        self.data[user_id_str]['pause_start'] = None
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            self._touch(str(user_id))
+            record = self.data.get(str(user_id))
+            
+            if record is None or not record.is_active:
+                return False
+            
+            if not record.is_paused:
+                return False
+            
+            # Reanudar seguimiento
+            record.is_paused = False
+            record.last_start = time.time()
+            record.pause_start = None
+            
+            self._mark_total_changed(str(user_id))
+            return self.save_user(user_id)
     
     def stop_tracking(self, user_id: int) -> bool:
         """Detener completamente el seguimiento de tiempo para un usuario"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data or not self.data[user_id_str]['is_active']:
-            return False
-        
-        # Si no está pausado, calcular tiempo transcurrido
-        if not self.data[user_id_str]['is_paused'] and self.data[user_id_str]['last_start']:
-            start_time = datetime.fromisoformat(self.data[user_id_str]['last_start'])
-            elapsed_seconds = (datetime.now() - start_time).total_seconds()
-            self.data[user_id_str]['total_seconds'] += elapsed_seconds
-        
-        # Detener seguimiento
-        self.data[user_id_str]['is_active'] = False
-        self.data[user_id_str]['is_paused'] = False
-        self.data[user_id_str]['last_start'] = None
-        self.data[user_id_str]['pause_start'] = None
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            self._touch(str(user_id))
+            record = self.data.get(str(user_id))
+            
+            if record is None or not record.is_active:
+                return False
+            
+            # Si no está pausado, calcular tiempo transcurrido
+            if not record.is_paused and record.last_start is not None:
+                record.total_seconds += time.time() - record.last_start
+            
+            # Detener seguimiento
+            record.is_active = False
+            record.is_paused = False
+            record.last_start = None
+            record.pause_start = None
+            
+            self._mark_total_changed(str(user_id))
+            return self.save_user(user_id)
     
     def add_minutes(self, user_id: int, user_name: str, minutes: int) -> bool:
         """Agregar minutos al tiempo total de un usuario"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data:
-            self.data[user_id_str] = {
-                'name': user_name,
-                'total_seconds': 0,
-                'is_active': False,
-                'is_paused': False,
-                'last_start': None,
-                'pause_start': None,
-                'notified_10_seconds': False
-            }
-        
-        self.data[user_id_str]['total_seconds'] += minutes * 60
-        self.data[user_id_str]['name'] = user_name  # Actualizar nombre
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            user_id_str = str(user_id)
+            self._touch(user_id_str)
+            
+            if user_id_str not in self.data:
+                self.data[user_id_str] = UserRecord(name=user_name)
+            
+            record = self.data[user_id_str]
+            record.total_seconds += minutes * 60
+            record.name = user_name  # Actualizar nombre
+            
+            self._mark_total_changed(str(user_id))
+            return self.save_user(user_id)
     
     def subtract_minutes(self, user_id: int, minutes: int) -> bool:
         """Restar minutos del tiempo total de un usuario"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data:
-            return False
-        
-        seconds_to_subtract = minutes * 60
-        self.data[user_id_str]['total_seconds'] = max(0, self.data[user_id_str]['total_seconds'] - seconds_to_subtract)
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            self._touch(str(user_id))
+            record = self.data.get(str(user_id))
+            
+            if record is None:
+                return False
+            
+            seconds_to_subtract = minutes * 60
+            record.total_seconds = max(0, record.total_seconds - seconds_to_subtract)
+            
+            self._mark_total_changed(str(user_id))
+            return self.save_user(user_id)
     
     def get_total_time(self, user_id: int) -> float:
         """Obtener el tiempo total (en segundos) para un usuario, incluyendo sesión actual si está activa"""
-        user_id_str = str(user_id)
+        record = self.data.get(str(user_id))
         
-        if user_id_str not in self.data:
+        if record is None:
             return 0.0
         
-        total_seconds = self.data[user_id_str]['total_seconds']
+        total_seconds = record.total_seconds
         
         # Si está activo y no pausado, agregar tiempo de la sesión actual
-        if (self.data[user_id_str]['is_active'] and 
-            not self.data[user_id_str]['is_paused'] and 
-            self.data[user_id_str]['last_start']):
-            
-            start_time = datetime.fromisoformat(self.data[user_id_str]['last_start'])
-            current_session_seconds = (datetime.now() - start_time).total_seconds()
-            total_seconds += current_session_seconds
+        if record.is_active and not record.is_paused and record.last_start is not None:
+            total_seconds += time.time() - record.last_start
         
         return total_seconds
     
+    def get_session_time(self, user_id: int) -> float:
+        """Obtener la duración (en segundos) de la sesión actual, hasta la pausa si está pausado"""
+        record = self.data.get(str(user_id))
+        
+        if record is None or not record.is_active or record.last_start is None:
+            return 0.0
+        
+        if record.is_paused and record.pause_start is not None:
+            return record.pause_start - record.last_start
+        return time.time() - record.last_start
+    
     def format_time_display(self, total_seconds: float) -> str:
         """Formatear segundos en formato legible (HH:MM:SS)"""
         if total_seconds < 0:
@@ -258,52 +526,70 @@ class TimeTracker:
     
     def get_all_tracked_users(self) -> Dict:
         """Obtener todos los usuarios con seguimiento"""
-        return self.data.copy()
+        return self.repository.get_all().copy()
+    
+    def get_active_users(self) -> Dict:
+        """Obtener los usuarios con seguimiento activo y no pausado"""
+        return dict(self.iter_active())
+    
+    def iter_active(self) -> Iterator[Tuple[str, UserRecord]]:
+        """Recorrer solo los usuarios con sesión corriendo (activos y no pausados)"""
+        if self.repository.shared:
+            # Otros procesos pueden cambiar el estado: consultar el índice de la base de datos
+            yield from self.repository.scan(
+                lambda record: record.is_active and not record.is_paused,
+                index={'is_active': True, 'is_paused': False}
+            ).items()
+            return
+        for user_id_str in list(self._active_ids):
+            record = self.data.get(user_id_str)
+            if record is not None:
+                yield user_id_str, record
+    
+    def iter_paused(self) -> Iterator[Tuple[str, UserRecord]]:
+        """Recorrer solo los usuarios con sesión pausada"""
+        if self.repository.shared:
+            yield from self.repository.scan(
+                lambda record: record.is_active and record.is_paused,
+                index={'is_active': True, 'is_paused': True}
+            ).items()
+            return
+        for user_id_str in list(self._paused_ids):
+            record = self.data.get(user_id_str)
+            if record is not None:
+                yield user_id_str, record
     
     def get_user_data(self, user_id: int) -> Optional[Dict]:
         """Obtener datos específicos de un usuario"""
-        user_id_str = str(user_id)
-        return self.data.get(user_id_str)
+        record = self.repository.get(str(user_id))
+        # Quien llama puede modificar el registro directamente y después llamar a save_user()
+        self._touch(str(user_id))
+        return record
     
     def reset_user_time(self, user_id: int) -> bool:
         """Reiniciar el tiempo de un usuario a cero"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data:
-            return False
-        
-        # Mantener info del usuario pero reiniciar tiempos
-        user_name = self.data[user_id_str]['name']
-        self.data[user_id_str] = {
-            'name': user_name,
-            'total_seconds': 0,
-            'is_active': False,
-            'is_paused': False,
-            'last_start': None,
-            'pause_start': None,
-            'notified_10_seconds': False,
-            'pause_count': 0
-        }
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            user_id_str = str(user_id)
+            self._touch(user_id_str)
+            
+            if user_id_str not in self.data:
+                return False
+            
+            # Mantener info del usuario pero reiniciar tiempos
+            self.data[user_id_str] = UserRecord(name=self.data[user_id_str].name)
+            
+            self._mark_total_changed(str(user_id))
+            return self.save_user(user_id)
     
     def reset_all_user_times(self) -> int:
         """Reiniciar todos los tiempos de todos los usuarios a cero"""
         count = 0
+        self._touch_all()
         
-        for user_id_str, data in self.data.items():
+        for user_id_str, record in self.data.items():
             # Mantener info del usuario pero reiniciar tiempos y notificaciones
-            user_name = data.get('name', f'Usuario {user_id_str}')
-            self.data[user_id_str] = {
-                'name': user_name,
-                'total_seconds': 0,
-                'is_active': False,
-                'is_paused': False,
-                'last_start': None,
-                'pause_start': None,
-                'notified_10_seconds': False,
-                'pause_count': 0
-            }
+            user_name = record.name or f'Usuario {user_id_str}'
+            self.data[user_id_str] = UserRecord(name=user_name)
             count += 1
         
         if count > 0:
@@ -313,73 +599,89 @@ class TimeTracker:
     
     def cancel_user_tracking(self, user_id: int) -> bool:
         """Cancelar completamente el seguimiento de un usuario eliminando su registro"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data:
-            return False
-        
-        # Eliminar completamente el registro del usuario
-        del self.data[user_id_str]
-        
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            user_id_str = str(user_id)
+            self._touch(user_id_str)
+            
+            if user_id_str not in self.data:
+                return False
+            
+            # Eliminar completamente el registro del usuario
+            del self.data[user_id_str]
+            
+            return self.save_user(user_id)
     
     def cleanup_inactive_users(self, days_threshold: int = 30) -> int:
         """Limpiar usuarios inactivos después de X días (opcional)"""
         current_time = datetime.now()
-        users_to_remove = []
+        threshold = timedelta(days=days_threshold + 1).total_seconds()
+        now = time.time()
+        
+        def is_stale(record: UserRecord) -> bool:
+            if record.is_active or record.last_start is None:
+                return False
+            return now - record.last_start >= threshold
         
-        for user_id, data in self.data.items():
-            if not data['is_active'] and data.get('last_start'):
-                last_activity = datetime.fromisoformat(data['last_start'])
-                if (current_time - last_activity).days > days_threshold:
-                    users_to_remove.append(user_id)
+        # El índice sobre last_start evita recorrer todos los usuarios en SQLite/PostgreSQL
+        cutoff = (current_time - timedelta(days=days_threshold + 1)).isoformat()
+        stale = self.repository.scan(is_stale, index={'is_active': False, 'last_start': ('<=', cutoff)})
+        users_to_remove = list(stale)
         
         for user_id in users_to_remove:
-            del self.data[user_id]
+            self._touch(user_id)
+            self.data.pop(user_id, None)
         
         if users_to_remove:
-            self.save_data()
+            self._persist(users_to_remove)
+            for user_id in users_to_remove:
+                self._index_user(user_id)
+                self._notify(user_id)
         
         return len(users_to_remove)
     
     def has_notified_10_seconds(self, user_id: int) -> bool:
         """Verificar si ya se notificó los 10 segundos para este usuario"""
-        user_id_str = str(user_id)
-        if user_id_str not in self.data:
+        record = self.data.get(str(user_id))
+        if record is None:
             return False
-        return self.data[user_id_str].get('notified_10_seconds', False)
+        return record.notified_10_seconds
     
     def mark_10_seconds_notified(self, user_id: int) -> bool:
         """Marcar que ya se notificaron los 10 segundos para este usuario"""
-        user_id_str = str(user_id)
-        if user_id_str not in self.data:
-            return False
-        self.data[user_id_str]['notified_10_seconds'] = True
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            self._touch(str(user_id))
+            record = self.data.get(str(user_id))
+            if record is None:
+                return False
+            record.notified_10_seconds = True
+            return self.save_user(user_id)
     
     def get_pause_count(self, user_id: int) -> int:
         """Obtener el número de pausas para un usuario"""
-        user_id_str = str(user_id)
+        record = self.data.get(str(user_id))
         
-        if user_id_str not in self.data:
+        if record is None:
             return 0
         
-        return self.data[user_id_str].get('pause_count', 0)
+        return record.pause_count
     
     def reset_pause_count(self, user_id: int) -> bool:
         """Resetear el contador de pausas a cero"""
-        user_id_str = str(user_id)
-        
-        if user_id_str not in self.data:
-            return False
-        
-        self.data[user_id_str]['pause_count'] = 0
-        return self.save_data()
+        with self._locked_user(str(user_id)):
+            self._touch(str(user_id))
+            record = self.data.get(str(user_id))
+            
+            if record is None:
+                return False
+            
+            record.pause_count = 0
+            return self.save_user(user_id)
     
     def clear_all_data(self) -> bool:
         """Limpiar completamente todos los datos de usuarios de la base de datos"""
         try:
             # Resetear los datos en memoria
+            self._touch_all()
             self.data = {}
             
             # Guardar archivo vacío
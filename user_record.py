@@ -0,0 +1,185 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+# Campos con marca de tiempo: en memoria son segundos epoch, en JSON cadenas ISO
+TIMESTAMP_FIELDS = ('last_start', 'pause_start')
+
+def _to_epoch(value) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(value).timestamp()
+
+def _to_iso(value: Optional[float]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value).isoformat()
+
+class UserRecord:
+    """Registro de tiempo de un usuario.
+
+    Los instantes (``last_start``, ``pause_start``) se guardan como segundos
+    epoch para no analizar cadenas en cada cálculo; solo se convierten a ISO al
+    persistir (``to_dict``/``from_dict``). Los campos no tipados se conservan
+    en ``extra`` para no perder información del JSON.
+
+    Admite acceso tipo dict (``record['total_seconds']``, ``record.get(...)``)
+    con la misma forma que el JSON guardado, para el código que aún lo usa.
+    """
+
+    __slots__ = ('name', 'total_seconds', 'is_active', 'is_paused', 'last_start', 'pause_start',
+                 'pause_count', 'notified_10_seconds', 'milestone_hwm', 'milestone_bits', 'extra')
+
+    FIELDS = ('name', 'total_seconds', 'is_active', 'is_paused', 'last_start', 'pause_start',
+              'notified_10_seconds', 'pause_count', 'milestone_hwm', 'milestone_bits')
+
+    def __init__(self, name: str, total_seconds: float = 0.0, is_active: bool = False,
+                 is_paused: bool = False, last_start: Optional[float] = None,
+                 pause_start: Optional[float] = None, pause_count: int = 0,
+                 notified_10_seconds: bool = False, milestone_hwm: int = 0, milestone_bits: int = 0,
+                 extra: Optional[Dict] = None):
+        self.name = name
+        self.total_seconds = total_seconds
+        self.is_active = is_active
+        self.is_paused = is_paused
+        self.last_start = last_start
+        self.pause_start = pause_start
+        self.pause_count = pause_count
+        self.notified_10_seconds = notified_10_seconds
+        # Milestones notificados: todas las horas 1..milestone_hwm, más las marcadas en
+        # milestone_bits (bit i = hora milestone_hwm + 1 + i) notificadas fuera de orden
+        self.milestone_hwm = milestone_hwm
+        self.milestone_bits = milestone_bits
+        self.extra = extra if extra is not None else {}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'UserRecord':
+        """Crear un registro a partir de su forma JSON"""
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        # Formato anterior: lista con el segundo de cada milestone notificado
+        legacy_milestones = extra.pop('notified_milestones', None)
+        record = cls(
+            name=data.get('name', ''),
+            total_seconds=float(data.get('total_seconds', 0)),
+            is_active=bool(data.get('is_active', False)),
+            is_paused=bool(data.get('is_paused', False)),
+            last_start=_to_epoch(data.get('last_start')),
+            pause_start=_to_epoch(data.get('pause_start')),
+            pause_count=int(data.get('pause_count', 0)),
+            notified_10_seconds=bool(data.get('notified_10_seconds', False)),
+            milestone_hwm=int(data.get('milestone_hwm', 0)),
+            milestone_bits=int(data.get('milestone_bits', 0)),
+            extra=extra
+        )
+        if legacy_milestones:
+            record._set_notified_milestones(legacy_milestones)
+        return record
+
+    def to_dict(self) -> Dict:
+        """Convertir el registro a su forma JSON"""
+        data = {
+            'name': self.name,
+            'total_seconds': self.total_seconds,
+            'is_active': self.is_active,
+            'is_paused': self.is_paused,
+            'last_start': _to_iso(self.last_start),
+            'pause_start': _to_iso(self.pause_start),
+            'notified_10_seconds': self.notified_10_seconds,
+            'pause_count': self.pause_count,
+            'milestone_hwm': self.milestone_hwm,
+            'milestone_bits': self.milestone_bits
+        }
+        data.update(self.extra)
+        return data
+
+    # --- Milestones ---
+
+    def _normalize_milestones(self):
+        """Incorporar al high-water mark las horas consecutivas ya marcadas"""
+        trailing = (~self.milestone_bits & (self.milestone_bits + 1)).bit_length() - 1
+        if trailing:
+            self.milestone_bits >>= trailing
+            self.milestone_hwm += trailing
+
+    def is_milestone_notified(self, hour: int) -> bool:
+        """Verificar si se notificó el milestone de ``hour`` horas"""
+        if hour <= self.milestone_hwm:
+            return True
+        return bool(self.milestone_bits >> (hour - self.milestone_hwm - 1) & 1)
+
+    def highest_pending_milestone(self, total_hours: int) -> Optional[int]:
+        """Hora más alta entre 1 y ``total_hours`` aún sin notificar, o None"""
+        span = total_hours - self.milestone_hwm
+        if span <= 0:
+            return None
+        missing = ((1 << span) - 1) & ~self.milestone_bits
+        if not missing:
+            return None
+        return self.milestone_hwm + missing.bit_length()
+
+    def mark_milestone_notified(self, hour: int):
+        """Marcar un milestone individual como notificado"""
+        if hour <= self.milestone_hwm:
+            return
+        self.milestone_bits |= 1 << (hour - self.milestone_hwm - 1)
+        self._normalize_milestones()
+
+    def mark_milestones_through(self, hour: int):
+        """Marcar como notificados todos los milestones de 1 a ``hour`` horas"""
+        if hour <= self.milestone_hwm:
+            return
+        self.milestone_bits >>= hour - self.milestone_hwm
+        self.milestone_hwm = hour
+        self._normalize_milestones()
+
+    def _notified_milestones(self) -> list:
+        """Milestones notificados en el formato anterior (segundos), para compatibilidad"""
+        hours = list(range(1, self.milestone_hwm + 1))
+        bits, hour = self.milestone_bits, self.milestone_hwm + 1
+        while bits:
+            if bits & 1:
+                hours.append(hour)
+            bits >>= 1
+            hour += 1
+        return [hour * 3600 for hour in hours]
+
+    def _set_notified_milestones(self, milestones):
+        self.milestone_hwm = 0
+        self.milestone_bits = 0
+        for milestone in milestones:
+            if milestone > 0 and milestone % 3600 == 0:
+                self.mark_milestone_notified(int(milestone // 3600))
+
+    # --- Acceso tipo dict ---
+
+    def __getitem__(self, key: str):
+        if key == 'notified_milestones':
+            return self._notified_milestones()
+        if key in TIMESTAMP_FIELDS:
+            return _to_iso(getattr(self, key))
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key: str, value):
+        if key == 'notified_milestones':
+            self._set_notified_milestones(value)
+        elif key in TIMESTAMP_FIELDS:
+            setattr(self, key, _to_epoch(value))
+        elif key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS or key == 'notified_milestones' or key in self.extra
+
+    def get(self, key: str, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def copy(self) -> Dict:
+        return self.to_dict()
+
+    def __repr__(self) -> str:
+        return f"UserRecord({self.to_dict()!r})"
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+class UserResolver:
+    """Resuelve IDs de usuario a objetos de Discord con el mínimo de llamadas a la API.
+
+    Busca primero en la caché de miembros del servidor y en la del cliente,
+    después en una caché LRU con caducidad (``ttl``) de usuarios ya pedidos, y
+    solo para los que faltan hace ``fetch_user`` con como mucho
+    ``max_concurrency`` peticiones simultáneas. Los usuarios que no se pudieron
+    obtener también se guardan (como None) para no repetir la petición.
+    """
+
+    def __init__(self, client, ttl: float = 600, max_size: int = 1000, max_concurrency: int = 5):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_concurrency = max_concurrency
+        self._cache: 'OrderedDict[int, tuple]' = OrderedDict()
+
+    def _from_cache(self, user_id: int, guild=None):
+        """Buscar un usuario sin llamar a la API; devuelve ``(encontrado, usuario)``"""
+        member = guild.get_member(user_id) if guild else None
+        if member is not None:
+            return True, member
+
+        user = self.client.get_user(user_id)
+        if user is not None:
+            return True, user
+
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return False, None
+        expires, user = entry
+        if expires <= time.monotonic():
+            del self._cache[user_id]
+            return False, None
+        self._cache.move_to_end(user_id)
+        return True, user
+
+    def _remember(self, user_id: int, user):
+        self._cache[user_id] = (time.monotonic() + self.ttl, user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, user_id: int, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                user = await self.client.fetch_user(user_id)
+            except Exception as e:
+                print(f"⚠️ No se pudo obtener el usuario {user_id}: {e}")
+                user = None
+        self._remember(user_id, user)
+        return user
+
+    async def resolve_many(self, user_ids: Iterable[int], guild=None) -> Dict[int, Optional[object]]:
+        """Resolver varios usuarios en una sola pasada"""
+        resolved = {}
+        missing = []
+        for user_id in user_ids:
+            user_id = int(user_id)
+            if user_id in resolved:
+                continue
+            found, user = self._from_cache(user_id, guild)
+            if found:
+                resolved[user_id] = user
+            else:
+                resolved[user_id] = None
+                missing.append(user_id)
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            users = await asyncio.gather(*(self._fetch(user_id, semaphore) for user_id in missing))
+            resolved.update(zip(missing, users))
+        return resolved